@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark - CupWashingController against the ZKBot emulator
+
+Runs single_cup_cycle_with_program for N cups on a pseudo-terminal
+emulator (no arm, no COM port), then reports cycle times and cups per
+hour. Camera detection is outside the scope of this benchmark and is
+reported as an instant stable detection.
+
+Runs in a scratch copy of config/ and data/programs so wash and error
+logs in the working tree are left alone. Linux/macOS only (pty).
+
+Usage:
+    python benchmark_cycle_throughput.py [program] [--cups 5] [--time-scale 1.0]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from models.zkbot_emulator import ZKBotEmulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cup cycle throughput on the ZKBot emulator")
+    parser.add_argument("program", nargs="?", default="testing", help="Program name in data/programs")
+    parser.add_argument("--cups", type=int, default=5, help="Number of cycles to run")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Emulator duration multiplier")
+    parser.add_argument("--latency", type=float, default=0.002, help="Emulator reply latency (s)")
+    parser.add_argument("--stream-window", type=int, default=None, help="Override robot stream window")
+    parser.add_argument("--verbose", action="store_true", help="Show controller output")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="zkbot_bench_")
+    shutil.copytree(os.path.join(ROOT, "config"), os.path.join(workdir, "config"))
+    shutil.copytree(os.path.join(ROOT, "data", "programs"), os.path.join(workdir, "data", "programs"))
+    os.makedirs(os.path.join(workdir, "data", "logs"), exist_ok=True)
+    os.chdir(workdir)
+
+    emulator = ZKBotEmulator(reply_latency=args.latency, time_scale=args.time_scale)
+    port = emulator.start()
+    print(f"🤖 Emulator on {port} (time scale {args.time_scale}, latency {args.latency * 1000:.1f} ms)")
+
+    output = sys.stdout if args.verbose else io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            from models.controller import CupWashingController
+
+            controller = CupWashingController()
+            controller.robot.port = port
+            if args.stream_window is not None:
+                controller.stream_window = args.stream_window
+            controller.detect_cup_before_pickup = lambda *a, **k: (True, "benchmark: detection skipped")
+
+            ok, msg = controller.robot.connect()
+            if not ok:
+                raise RuntimeError(msg)
+            controller.robot.home()
+
+            cycle_times = []
+            for _ in range(args.cups):
+                start = time.perf_counter()
+                if not controller.single_cup_cycle_with_program(args.program):
+                    raise RuntimeError(f"Cycle failed: {controller.error_log[-1:]}")
+                cycle_times.append(time.perf_counter() - start)
+
+            controller.robot.disconnect()
+    finally:
+        emulator.stop()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    avg = sum(cycle_times) / len(cycle_times)
+    print(f"\nProgram '{args.program}' x {len(cycle_times)} cups")
+    print(f"  cycle time  avg {avg:.3f}s  min {min(cycle_times):.3f}s  max {max(cycle_times):.3f}s")
+    print(f"  throughput  {3600 / avg:.1f} cups/hour")
+    stats = emulator.get_stats()
+    print(f"  arm busy    {stats['busy_time']:.3f}s of {sum(cycle_times):.3f}s "
+          f"({stats['busy_time'] / sum(cycle_times) * 100:.0f}%)")
+    print(f"  commands    {stats['commands']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark - per-command encode+send cost of the robot driver
+
+Compares the old string-building path (f-strings, .upper(), join and a
+print per frame/send) with FrameEncoder + trace buffer. Writes go to a
+null port so only Python-side cost is measured. Prints are redirected
+to an in-memory buffer, which is cheaper than a real console, so the
+"before" numbers are a lower bound.
+
+Usage:
+    python benchmark_robot_frames.py [iterations]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.frame_encoder import FrameEncoder
+from utils.trace import TraceBuffer, TraceLevel
+
+
+class NullPort:
+    """Serial stand-in that swallows writes"""
+    def write(self, data):
+        return len(data)
+
+
+# ═══════════════════════════════════════════════════════════════
+# BEFORE - copy of the original driver code
+# ═══════════════════════════════════════════════════════════════
+
+def legacy_build_xyz_move_command(x, y, z, feedrate=100, speed_override=1.0, move_type="G01"):
+    move_type = move_type.upper()
+    if move_type not in ["G00", "G01"]:
+        move_type = "G01"
+    parts = [move_type]
+    parts.append(f"X{x}")
+    parts.append(f"Y{y}")
+    parts.append(f"Z{z}")
+    effective_speed = int(feedrate * speed_override)
+    effective_speed = max(1, min(500, effective_speed))
+    parts.append(f"F{effective_speed}")
+    gcode = " ".join(parts)
+    frame = f"0x550xAA {gcode} 0xAA0x55"
+    print(f"FRAME: {frame} (Override: {speed_override*100:.0f}%)")
+    return frame
+
+
+def legacy_send(port, command):
+    data = command.encode('utf-8')
+    written = port.write(data)
+    print(f"Sent: {command} | bytes: {written}")
+
+
+def legacy_move(port, x, y, z):
+    legacy_send(port, legacy_build_xyz_move_command(x, y, z, 200, 1.0, "G00"))
+
+
+def legacy_pump_on(port):
+    legacy_send(port, "0x550xAA M03 0xAA0x55")
+
+
+# ═══════════════════════════════════════════════════════════════
+# AFTER - FrameEncoder + level-gated trace
+# ═══════════════════════════════════════════════════════════════
+
+encoder = FrameEncoder()
+trace = TraceBuffer(TraceLevel.ERROR)
+
+
+def new_send(port, data):
+    port.write(data)
+    trace.debug("sent %r", data)
+
+
+def new_move(port, x, y, z):
+    new_send(port, encoder.move("G00", x, y, z, 200))
+
+
+def new_pump_on(port):
+    new_send(port, encoder.fixed("M03"))
+
+
+def bench(label, func, iterations):
+    port = NullPort()
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for i in range(iterations):
+            func(port, i)
+        elapsed = time.perf_counter() - start
+    per_command = elapsed / iterations * 1e6
+    print(f"  {label:34s} {per_command:8.2f} µs/command")
+    return per_command
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    # Same wire bytes from both paths
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_frame = legacy_build_xyz_move_command(12.5, -3.0, 40.25, 200, 1.0, "G00").encode()
+    assert legacy_frame == encoder.move("G00", 12.5, -3.0, 40.25, 200), "frame mismatch"
+
+    print(f"Encode+send cost over {iterations} commands\n")
+
+    print("XYZ move (G00):")
+    before = bench("before (f-string + print)", lambda p, i: legacy_move(p, i * 0.1, -i * 0.2, 5.0), iterations)
+    after = bench("after (encoder + trace)", lambda p, i: new_move(p, i * 0.1, -i * 0.2, 5.0), iterations)
+    print(f"  speedup: {before / after:.1f}x\n")
+
+    print("Fixed command (M03):")
+    before = bench("before (literal + print)", lambda p, i: legacy_pump_on(p), iterations)
+    after = bench("after (cached frame + trace)", lambda p, i: new_pump_on(p), iterations)
+    print(f"  speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """
 System-wide constants and enumerations
 """
+import os
 from enum import Enum
 
 # ============================================================================
@@ -12,19 +13,24 @@ class WashingMode(Enum):
     SINGLE_CYCLE = "single_cycle"
     FIXED_COUNT = "fixed_count"
     INFINITE = "infinite"
+    BATCH = "batch"  # up to K cups per wash/rinse cycle
 
 class SystemState(Enum):
     """Robot state machine states"""
     IDLE = "idle"
+    WAITING_FOR_CUPS = "waiting_for_cups"  # pickup tray empty, polling
     DETECTING = "detecting"
+    INSPECTING = "inspecting"  # estimating soiling before the wash
     MOVING_TO_PICKUP = "moving_to_pickup"
     PICKING_UP = "picking_up"
     MOVING_TO_WASH = "moving_to_wash"
     WASHING = "washing"
     MOVING_TO_RINSE = "moving_to_rinse"
     RINSING = "rinsing"
+    REINSPECTING = "reinspecting"  # checking the rinsed cup at the inspect position
     MOVING_TO_STACK = "moving_to_stack"
     STACKING = "stacking"
+    RUNNING_PROGRAM = "running_program"
     ERROR = "error"
     EMERGENCY_STOP = "emergency_stop"
 
@@ -48,12 +54,52 @@ class UserRole(Enum):
 DEFAULT_PORT = "COM3"
 DEFAULT_BAUDRATE = 9600
 SERIAL_TIMEOUT = 2
+NO_REPLY_WINDOW = 0.2  # seconds a command waits when the controller didn't answer M122 on connect
+
+# Port auto-discovery (most likely baudrate first)
+DISCOVERY_BAUDRATES = [115200, 9600, 57600, 38400, 19200]
+DISCOVERY_TIMEOUT = 1.0  # seconds per baudrate (boards may reset on open)
+DISCOVERY_WORKERS = 8  # ports probed at once
 
 # Movement parameters
 DEFAULT_ARM_SPEED = 100  # 1-500
 MIN_ARM_SPEED = 1
 MAX_ARM_SPEED = 500
 
+# Motion model (used to predict move durations)
+# Unfitted defaults match the ~1 s per move the arm was observed to need (an
+# F200 move of 200 mm takes about 1.4 s); DurationEstimator fits the real values
+FEEDRATE_MM_PER_S = 1.0  # mm/s per F unit (treating F as mm/min would predict 60 s for that move)
+MAX_ACCELERATION = 500.0  # mm/s^2
+MOVE_OVERHEAD = 0.02  # seconds of controller latency per move
+NO_FEEDBACK_MOVE_TIME = 1.0  # seconds waited per move without P01 feedback until the model is fitted
+TOOL_COMMAND_TIME = 0.05  # seconds for a gripper/pump command round trip
+
+# Motion-done polling
+POSITION_TOLERANCE = 0.5  # mm
+MOTION_POLL_MIN = 0.01  # seconds
+MOTION_POLL_MAX = 0.25  # seconds
+POSITION_MAX_AGE = 0.1  # seconds a P01 reading is reused by get_position
+POSITION_MONITOR_RATE = 5.0  # Hz, background position updates for the teach pendant
+
+# Link supervisor
+HEARTBEAT_INTERVAL = 1.0  # seconds of silence before an M122 heartbeat
+HEARTBEAT_TIMEOUT = 0.5  # seconds to wait for the heartbeat reply
+HEARTBEAT_MISSES = 2  # missed heartbeats before the link counts as dead
+RECONNECT_BACKOFF_MIN = 0.5  # seconds
+RECONNECT_BACKOFF_MAX = 8.0  # seconds
+RECONNECT_WAIT = 30.0  # seconds a command waits for the link to come back
+
+# Program compiler
+COLLINEAR_TOLERANCE = 0.05  # mm off-line allowed when merging G01 segments
+
+# Feedrate optimizer (F units, firmware clamps to 1-500)
+FEED_LIMIT_EMPTY = 400  # nothing on the suction cup
+FEED_LIMIT_LOADED = 250  # cup held (pump on)
+FEED_LIMIT_APPROACH = 150  # vertical travel next to a station
+STATION_APPROACH_RADIUS = 30.0  # mm (XY) around a calibrated position
+WORKSPACE_MARGIN = 20.0  # mm; feedrate is halved this close to a workspace limit
+
 # Workspace limits (like your old project)
 WORKSPACE_LIMITS = {
     "X": {"min": -400, "max": 400},
@@ -61,6 +107,34 @@ WORKSPACE_LIMITS = {
     "Z": {"min": -300, "max": 300}
 }
 
+# Program validation
+CALIBRATED_REACH_MARGIN = 50.0  # mm outside the taught positions' bounding box before a move is flagged
+
+# Batch mode: slots next to the calibrated wash_station / rinse_station
+BATCH_SLOTS = 4  # cups per station cycle
+BATCH_SLOT_OFFSET = {"x": 0.0, "y": 60.0, "z": 0.0}  # mm from one slot to the next
+
+# Path planner geometry (mm, measured from the calibrated cup position; override with "station_geometry")
+STATION_HALF_WIDTH = 50.0  # station footprint half-width around the cup position
+STATION_RIM_HEIGHT = 40.0  # station rim above the cup position
+CUP_HEIGHT = 90.0          # cup hanging below the tool while the pump holds it
+CUP_RADIUS = 40.0
+TOOL_RADIUS = 15.0
+PATH_CLEARANCE = 10.0      # extra height above a rim when travelling over it
+
+# Cup detection
+DETECTION_LATENCY = 0.3  # seconds for a stable detection (8 frames + inference), used by the cell simulator
+CAMERA_DEAD_FRAMES = 10  # consecutive empty frames before the camera counts as failed
+QUICK_DETECT_FRAMES = 20  # brief pickup check while cups are in the stations (no miss logged)
+PICKUP_WATCH_INTERVAL = 0.01  # seconds between frames evaluated by the background pickup watcher
+YOLO_MODEL_PATH = os.path.join("runs", "detect", "runs", "detect", "yolov8n_areas_with_background",
+                               "weights", "best.pt")  # latest trained model
+
+# Multi-cell orchestrator (shared inference service)
+INFERENCE_MAX_BATCH = 8  # frames from different cells run through the model together
+INFERENCE_TIMEOUT = 2.0  # seconds a cell waits for its detections
+INFERENCE_JPEG_QUALITY = 90  # frames are JPEG-compressed between processes
+
 # Home position
 HOME_POSITION = {"x": 0, "y": 0, "z": 0}
 
@@ -78,6 +152,11 @@ DEFAULT_BRUSH_SPEED = 150  # 0-255 PWM
 MIN_BRUSH_SPEED = 50
 MAX_BRUSH_SPEED = 255
 
+# Dirt-adaptive wash: (dirt %, wash seconds, brush PWM) points, interpolated and clamped to the ranges above
+DIRT_WASH_CURVE = [(0.0, 3, 120), (5.0, 6, 150), (15.0, 15, 200), (40.0, 30, 255)]
+DIRT_CLEAN_THRESHOLD = 5.0  # dirt % at or below which a rinsed cup counts as clean
+MAX_WASH_PASSES = 2  # washes per cup, re-washes after a failed re-inspection included
+
 # Water pump
 DEFAULT_WATER_FLOW = 100  # 0-255 PWM
 MIN_WATER_FLOW = 30
@@ -116,6 +195,8 @@ CALIBRATION_FILE = "config/calibration.json"
 
 WASH_LOG_FILE = "data/logs/wash_log.json"
 ERROR_LOG_FILE = "data/logs/error_log.json"
+FEEDRATE_PROFILE_FILE = "data/logs/feedrate_profile.json"
+MOTION_FIT_FILE = "data/logs/motion_fit.json"
 
 DEFAULT_PROGRAM_FILE = "data/programs/default_program.json"
 
@@ -9,6 +9,18 @@ from typing import Dict, Any, List, Optional
 class DataStorage:
     """Manages JSON file operations for settings, programs, and logs"""
     
+    # Washing cell this process drives (set by the cell orchestrator); its
+    # logs, learned profiles and - if present - calibration get their own files
+    cell: Optional[str] = None
+    
+    @staticmethod
+    def cell_path(filepath: str) -> str:
+        """`filepath` for the current cell: data/logs/wash_log.json -> data/logs/wash_log_<cell>.json"""
+        if not DataStorage.cell:
+            return filepath
+        root, ext = os.path.splitext(filepath)
+        return f"{root}_{DataStorage.cell}{ext}"
+    
     @staticmethod
     def load_json(filepath: str, default: Dict = None) -> Dict:
         """Load JSON file with error handling"""
@@ -94,6 +106,10 @@ class DataStorage:
             "notes": "Use Developer Mode to teach and save positions"
         }
     
+        # A cell without its own calibration file uses the shared one
+        cell_file = DataStorage.cell_path(CALIBRATION_FILE)
+        if os.path.exists(cell_file):
+            return DataStorage.load_json(cell_file, default_calibration)
         return DataStorage.load_json(CALIBRATION_FILE, default_calibration)
 
     
@@ -104,18 +120,21 @@ class DataStorage:
         calibration["calibration_date"] = datetime.now().isoformat()
         return DataStorage.save_json(CALIBRATION_FILE, calibration)
     
+    @staticmethod
+    def program_path(program_name: str) -> str:
+        """File a program is stored in"""
+        from config.constants import PROGRAMS_DIR
+        return os.path.join(PROGRAMS_DIR, f"{program_name}.json")
+    
     @staticmethod
     def load_program(program_name: str) -> Optional[Dict]:
         """Load a specific program"""
-        from config.constants import PROGRAMS_DIR
-        filepath = os.path.join(PROGRAMS_DIR, f"{program_name}.json")
-        return DataStorage.load_json(filepath)
+        return DataStorage.load_json(DataStorage.program_path(program_name))
     
     @staticmethod
     def save_program(program_name: str, program_data: Dict) -> bool:
         """Save a program"""
-        from config.constants import PROGRAMS_DIR
-        filepath = os.path.join(PROGRAMS_DIR, f"{program_name}.json")
+        filepath = DataStorage.program_path(program_name)
         program_data["last_modified"] = datetime.now().isoformat()
         return DataStorage.save_json(filepath, program_data)
     
@@ -137,8 +156,7 @@ class DataStorage:
     @staticmethod
     def delete_program(program_name: str) -> bool:
         """Delete a program"""
-        from config.constants import PROGRAMS_DIR
-        filepath = os.path.join(PROGRAMS_DIR, f"{program_name}.json")
+        filepath = DataStorage.program_path(program_name)
         try:
             if os.path.exists(filepath):
                 os.remove(filepath)
@@ -154,7 +172,8 @@ class DataStorage:
         from config.constants import WASH_LOG_FILE
         
         # Load existing logs
-        logs = DataStorage.load_json(WASH_LOG_FILE, {"cycles": []})
+        log_file = DataStorage.cell_path(WASH_LOG_FILE)
+        logs = DataStorage.load_json(log_file, {"cycles": []})
         
         # Add timestamp
         cycle_data["timestamp"] = datetime.now().isoformat()
@@ -166,14 +185,15 @@ class DataStorage:
         if len(logs["cycles"]) > 1000:
             logs["cycles"] = logs["cycles"][-1000:]
         
-        return DataStorage.save_json(WASH_LOG_FILE, logs)
+        return DataStorage.save_json(log_file, logs)
     
     @staticmethod
     def log_error(error_data: Dict) -> bool:
         """Log an error"""
         from config.constants import ERROR_LOG_FILE
         
-        errors = DataStorage.load_json(ERROR_LOG_FILE, {"errors": []})
+        log_file = DataStorage.cell_path(ERROR_LOG_FILE)
+        errors = DataStorage.load_json(log_file, {"errors": []})
         error_data["timestamp"] = datetime.now().isoformat()
         errors["errors"].append(error_data)
         
@@ -181,4 +201,4 @@ class DataStorage:
         if len(errors["errors"]) > 500:
             errors["errors"] = errors["errors"][-500:]
         
-        return DataStorage.save_json(ERROR_LOG_FILE, errors)
+        return DataStorage.save_json(log_file, errors)
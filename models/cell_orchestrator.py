@@ -0,0 +1,253 @@
+"""
+cell_orchestrator.py
+Headless host for several washing cells
+
+Each cell (robot + camera) gets its own process with its own
+CupWashingController, so a slow serial link or camera in one cell never
+stalls another. Cup detection for all cells goes through one shared
+InferenceService in this process. Cells report status after every cup;
+the orchestrator keeps the latest status of each and the totals.
+
+Cells are configured in config/settings.json, each entry overriding the
+"robot" settings:
+
+    "cells": [
+        {"name": "cell1", "port": "COM3", "camera_id": 0},
+        {"name": "cell2", "port": "COM4", "camera_id": 1, "pipelined": true}
+    ]
+
+A cell's logs and learned profiles go to files suffixed with its name;
+config/calibration_<name>.json is used if present, else the shared one.
+
+Usage:
+    python -m models.cell_orchestrator --mode infinite
+    python -m models.cell_orchestrator --mode fixed_count --cups 50
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+from config.constants import WashingMode, YOLO_MODEL_PATH
+from models.inference_service import InferenceService
+
+STATUS_INTERVAL = 10.0  # seconds between printed status tables
+
+
+def run_cell(cell: Dict, detector, commands, status, mode: str, target_cups: int):
+    """
+    Cell process: initialize the cell's controller and wash until done or stopped.
+
+    Args:
+        cell: Cell settings ("name" plus robot setting overrides)
+        detector: InferenceClient, or None for a model of its own
+        commands: Queue of commands from the orchestrator ("stop")
+        status: Queue the cell's (name, status) updates go to
+        mode: WashingMode value
+        target_cups: Cups for FIXED_COUNT
+    """
+    from data.storage import DataStorage
+    from models.controller import CupWashingController
+
+    name = cell["name"]
+    DataStorage.cell = name
+    controller = CupWashingController(cell, detector)
+
+    def report(**extra):
+        status.put((name, dict(controller.get_status(), **extra)))
+
+    def listen():
+        while True:
+            if commands.get() == "stop":
+                controller.stop_washing()
+                return
+
+    if not controller.initialize():
+        report(finished=True, error=controller.error_log[-1] if controller.error_log else "Init failed")
+        return
+    threading.Thread(target=listen, name="CellCommands", daemon=True).start()
+
+    washing_mode = WashingMode(mode)
+    controller.start_washing(washing_mode, target_cups)
+    report()
+    max_cups = {WashingMode.SINGLE_CYCLE: 1, WashingMode.FIXED_COUNT: target_cups,
+                WashingMode.BATCH: target_cups}.get(washing_mode)
+
+    try:
+        if controller.pipelined and washing_mode != WashingMode.BATCH:
+            controller.run_pipelined(max_cups, lambda _: report())
+        else:
+            # Same loop as WashingWorker.run, without the Qt signals
+            while controller.is_running:
+                if controller.run_next_cycle():
+                    report()
+                    if max_cups and controller.washed_cups >= max_cups:
+                        break
+                else:
+                    report()
+                    if controller.retry_policy.is_fatal(controller.last_failure):
+                        break
+                    time.sleep(0.5)  # back off after a failed cycle
+    except Exception as e:
+        controller.log_error(f"Cell {name}: {e}")
+    finally:
+        controller.is_running = False
+        controller.shutdown()
+        report(finished=True)
+
+
+class CellOrchestrator:
+    """Runs one washing cell per process with a shared inference service"""
+
+    def __init__(self, cells: List[Dict], model_path: str = YOLO_MODEL_PATH):
+        """
+        Args:
+            cells: Cell settings, each with a unique "name"
+            model_path: YOLOv8 weights for the shared inference service
+        """
+        names = [cell.get("name") for cell in cells]
+        if not cells or None in names or len(set(names)) != len(names):
+            raise ValueError("Every cell needs a unique 'name'")
+
+        self.cells = cells
+        # spawn: same start method on Windows and Linux, and no forked model/camera state
+        self.context = multiprocessing.get_context("spawn")
+        self.inference = InferenceService(model_path, self.context)
+        self.status_queue = self.context.Queue()
+        self.status: Dict[str, Dict] = {name: {} for name in names}
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self.commands: Dict[str, object] = {}
+        self.started_at: Optional[float] = None
+
+    # ═══════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════
+
+    def start(self, mode: WashingMode = WashingMode.INFINITE, target_cups: int = 10):
+        """Start every cell process"""
+        clients = {cell["name"]: self.inference.add_client(cell["name"]) for cell in self.cells}
+        if not self.inference.start():
+            clients = {}  # cells fall back to their own model, if they have one
+
+        print(f"🏭 Starting {len(self.cells)} cells ({mode.value})")
+        self.started_at = time.monotonic()
+        for cell in self.cells:
+            name = cell["name"]
+            self.commands[name] = self.context.Queue()
+            process = self.context.Process(
+                target=run_cell, name=f"Cell-{name}",
+                args=(cell, clients.get(name), self.commands[name], self.status_queue, mode.value, target_cups))
+            process.start()
+            self.processes[name] = process
+
+    def stop(self, timeout: float = 30.0):
+        """Ask every cell to stop, then wait for the processes to exit"""
+        print("🛑 Stopping all cells...")
+        for name, process in self.processes.items():
+            if process.is_alive():
+                self.commands[name].put("stop")
+        # Keep draining status while waiting: a process exits only once its queue is flushed
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(p.is_alive() for p in self.processes.values()):
+            self.collect_status(timeout=0.2)
+        for name, process in self.processes.items():
+            if process.is_alive():
+                print(f"⚠ Cell {name} did not stop - terminating")
+                process.terminate()
+        self.collect_status()
+        self.inference.stop()
+
+    def wait(self, status_interval: float = STATUS_INTERVAL):
+        """Block until every cell has finished, printing status periodically"""
+        next_print = time.monotonic() + status_interval
+        while any(process.is_alive() for process in self.processes.values()):
+            self.collect_status(timeout=0.5)
+            if time.monotonic() >= next_print:
+                self.print_status()
+                next_print += status_interval
+        self.collect_status()
+        self.inference.stop()
+
+    # ═══════════════════════════════════════════════════════════════
+    # STATUS
+    # ═══════════════════════════════════════════════════════════════
+
+    def collect_status(self, timeout: float = 0.0):
+        """Take in the cells' status updates"""
+        try:
+            while True:
+                name, status = self.status_queue.get(timeout=timeout)
+                self.status[name] = status
+                timeout = 0.0
+        except queue.Empty:
+            pass
+
+    def summary(self) -> Dict:
+        """
+        Returns:
+            {"cells": {name: latest status}, "washed_cups", "failed_cups",
+             "cups_per_hour", "running", "inference": InferenceService.stats()}
+        """
+        self.collect_status()
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        washed = sum(s.get("washed_cups", 0) for s in self.status.values())
+        return {
+            "cells": dict(self.status),
+            "washed_cups": washed,
+            "failed_cups": sum(s.get("failed_cups", 0) for s in self.status.values()),
+            "cups_per_hour": washed * 3600.0 / elapsed if elapsed > 0 else 0.0,
+            "running": sum(1 for p in self.processes.values() if p.is_alive()),
+            "inference": self.inference.stats()
+        }
+
+    def print_status(self):
+        summary = self.summary()
+        print(f"\n🏭 {summary['running']}/{len(self.cells)} cells running - {summary['washed_cups']} cups washed, "
+              f"{summary['failed_cups']} failed, {summary['cups_per_hour']:.0f} cups/h")
+        for name, status in summary["cells"].items():
+            if not status:
+                print(f"   {name:10s} starting...")
+                continue
+            note = status.get("error") or ("finished" if status.get("finished") else status.get("state", ""))
+            print(f"   {name:10s} {status.get('washed_cups', 0):5d} washed {status.get('failed_cups', 0):4d} failed "
+                  f"{status.get('avg_cycle_time', 0):6.1f}s/cup  {note}")
+        inference = summary["inference"]
+        if inference["frames"]:
+            print(f"   inference: {inference['frames']} frames, batch {inference['mean_batch']:.1f}, "
+                  f"{inference['ms_per_frame']:.1f} ms/frame")
+
+
+def main():
+    """Run the cells configured in settings until done or Ctrl+C"""
+    import argparse
+    from data.storage import DataStorage
+
+    parser = argparse.ArgumentParser(description="Run several washing cells from one host")
+    parser.add_argument("--mode", choices=[m.value for m in WashingMode], default=WashingMode.INFINITE.value)
+    parser.add_argument("--cups", type=int, default=10, help="Cups per cell in fixed_count mode")
+    parser.add_argument("--status", type=float, default=STATUS_INTERVAL, help="Seconds between status tables")
+    args = parser.parse_args()
+
+    cells = DataStorage.load_settings().get("cells", [])
+    try:
+        orchestrator = CellOrchestrator(cells)
+    except ValueError as e:
+        print(f"❌ {e} - configure \"cells\" in config/settings.json")
+        return
+
+    orchestrator.start(WashingMode(args.mode), args.cups)
+    try:
+        orchestrator.wait(args.status)
+    except KeyboardInterrupt:
+        orchestrator.stop()
+    orchestrator.print_status()
+
+
+if __name__ == "__main__":
+    main()
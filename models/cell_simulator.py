@@ -0,0 +1,431 @@
+"""
+cell_simulator.py
+Discrete-event simulation of the washing cell
+
+Replays the same task sequences as CupWashingController.single_cup_cycle
+(serial) and PipelineScheduler (pipelined) against a virtual clock: arm
+moves are timed with the MotionModel from the calibrated positions and
+feedrates, stations dwell for the wash/rinse times, detection takes a
+jittered latency, and detection misses and dropped cups happen with the
+given probabilities. Thousands of cups simulate in well under a second.
+
+Usage:
+    python -m models.cell_simulator --cups 5000
+    python -m models.cell_simulator --mode pipelined --wash 8 --arrival 12
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import heapq
+import random
+import statistics
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+from config.constants import SystemState, DETECTION_LATENCY, TOOL_COMMAND_TIME
+from models.motion_model import MotionModel
+
+WORKER_CYCLE_DELAY = 0.5  # WashingWorker backs off this long after a failed cycle
+IDLE_STATES = (SystemState.IDLE, SystemState.WAITING_FOR_CUPS,
+               SystemState.WASHING, SystemState.RINSING)  # arm not working
+
+# One step of an arm task: (state, seconds)
+Step = Tuple[SystemState, float]
+
+
+class SimStation:
+    """Occupancy and statistics of one simulated station"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cup: Optional[int] = None
+        self.done_at = 0.0
+        self.busy = 0.0             # seconds dwelling
+        self.blocked: List[float] = []  # seconds each finished cup waited for the arm
+
+    @property
+    def occupied(self) -> bool:
+        return self.cup is not None
+
+    def is_done(self, now: float) -> bool:
+        return self.occupied and now >= self.done_at
+
+
+class CellSimulator:
+    """Event-driven model of arm, camera, wash and rinse stations"""
+
+    def __init__(self, positions: Dict[str, Dict], motion_model: Optional[MotionModel] = None,
+                 wash_time: float = 3.0, rinse_time: float = 2.0, arm_speed: int = 300,
+                 pipelined: bool = False, detection_latency: float = DETECTION_LATENCY,
+                 detection_miss: float = 0.0, pickup_failure: float = 0.0,
+                 arrival_interval: Optional[float] = None, feedrate_optimizer=None,
+                 background_detection: bool = True, seed: Optional[int] = None):
+        """
+        Args:
+            positions: Calibrated positions (pickup, wash_station, rinse_station, stack; optional
+                pickup_lower, safe)
+            motion_model: Move timing (default MotionModel())
+            wash_time, rinse_time: Station dwell in seconds
+            arm_speed: Feedrate of move_to calls without an explicit one
+            pipelined: Simulate PipelineScheduler instead of serial cycles
+            detection_latency: Mean seconds for a stable detection (jittered ±50%)
+            detection_miss: Probability a waiting cup is not detected (cycle fails, retried), below 1
+            pickup_failure: Probability a cup is dropped during pickup (counted failed), below 1
+            arrival_interval: Mean seconds between cups arriving (Poisson); None = always a cup
+            feedrate_optimizer: FeedrateOptimizer to pick feedrates like optimize_feedrates does
+            background_detection: Detection runs while the arm is away (PickupWatcher), so
+                only the part of the latency not yet elapsed delays the cycle
+            seed: Random seed for repeatable runs
+        """
+        required = ["pickup", "wash_station", "rinse_station", "stack"]
+        missing = [p for p in required if p not in positions]
+        if missing:
+            raise ValueError(f"Missing required positions: {', '.join(missing)}")
+        for name, probability in (("detection_miss", detection_miss), ("pickup_failure", pickup_failure)):
+            if not 0.0 <= probability < 1.0:
+                # At 1.0 no cup is ever stacked and run() never finishes
+                raise ValueError(f"{name} must be at least 0 and below 1, got {probability}")
+
+        self.positions = positions
+        self.motion_model = motion_model or MotionModel()
+        self.wash_time = wash_time
+        self.rinse_time = rinse_time
+        self.arm_speed = arm_speed
+        self.pipelined = pipelined
+        self.detection_latency = detection_latency
+        self.detection_miss = detection_miss
+        self.pickup_failure = pickup_failure
+        self.arrival_interval = arrival_interval
+        self.feedrate_optimizer = feedrate_optimizer
+        self.background_detection = background_detection
+        self.rng = random.Random(seed)
+
+    # ═══════════════════════════════════════════════════════════════
+    # ENGINE
+    # ═══════════════════════════════════════════════════════════════
+
+    def run(self, cups: int = 1000, max_time: Optional[float] = None) -> Dict:
+        """
+        Simulate until `cups` are stacked (or `max_time` simulated seconds).
+
+        Returns:
+            Statistics, see results()
+        """
+        self._reset()
+        if self.arrival_interval:
+            self._schedule(self._next_arrival(), "arrival")
+        self._dispatch()
+
+        while self._events and self.completed < cups:
+            time, _, kind = heapq.heappop(self._events)
+            if max_time is not None and time > max_time:
+                self.now = max_time
+                break
+            self.now = time
+
+            if kind == "arrival":
+                self.queue.append(self.now)
+                self._schedule(self.now + self._next_arrival(), "arrival")
+            elif kind == "arm":
+                self._advance_arm()
+            # "station": nothing to do but wake the arm
+
+            if self._task is None:
+                self._dispatch()
+
+        return self.results()
+
+    def _reset(self):
+        self.now = 0.0
+        self._events: List[Tuple[float, int, str]] = []
+        self._sequence = 0
+        self._task: Optional[Iterator[Step]] = None
+
+        self.arm_position = dict(self.positions["stack"])
+        self.cup_held = False
+        self.watch_from = 0.0  # pickup watcher (re)armed: arm left the pickup area
+        self.queue: deque = deque()  # arrival times of waiting cups
+        self.wash = SimStation("wash")
+        self.rinse = SimStation("rinse")
+        self.cup_arrived: Dict[int, float] = {}
+        self.next_cup = 1
+
+        self.completed = 0
+        self.failed = 0
+        self.detection_misses = 0
+        self.dropped = 0
+        self.arm_busy = 0.0
+        self.camera_busy = 0.0
+        self.state_time = {state: 0.0 for state in SystemState}
+        self.pickup_waits: List[float] = []
+        self.cycle_times: List[float] = []
+
+    def _schedule(self, time: float, kind: str):
+        self._sequence += 1
+        heapq.heappush(self._events, (time, self._sequence, kind))
+
+    def _next_arrival(self) -> float:
+        return self.rng.expovariate(1.0 / self.arrival_interval)
+
+    def _cup_waiting(self) -> bool:
+        return self.arrival_interval is None or bool(self.queue)
+
+    def _advance_arm(self):
+        """Run the arm task to its next step and schedule the step's end"""
+        try:
+            state, seconds = next(self._task)
+        except StopIteration:
+            self._task = None
+            return
+        self.state_time[state] += seconds
+        if state not in IDLE_STATES:
+            self.arm_busy += seconds
+        self._schedule(self.now + seconds, "arm")
+
+    def _dispatch(self):
+        """Give the idle arm its next task, like the worker/scheduler would"""
+        now = self.now
+        task = None
+        if not self.pipelined:
+            if self._cup_waiting():
+                task = self._serial_cycle()
+        elif self.rinse.is_done(now):
+            task = self._unload()
+        elif self.wash.is_done(now) and not self.rinse.occupied:
+            task = self._transfer()
+        elif not self.wash.occupied and self._cup_waiting():
+            task = self._load()
+
+        if task is not None:
+            self._task = task
+            self._advance_arm()
+
+    # ═══════════════════════════════════════════════════════════════
+    # ARM PRIMITIVES
+    # ═══════════════════════════════════════════════════════════════
+
+    def _move(self, name: str, feedrate: Optional[int] = None) -> float:
+        """Seconds to move_to(name, feedrate) from where the arm is"""
+        target = self.positions[name]
+        feedrate = feedrate or self.arm_speed
+        if self.feedrate_optimizer:
+            feedrate, _ = self.feedrate_optimizer.feedrate_for(self.arm_position, target, self.cup_held)
+        seconds = self.motion_model.estimate_move_time(self.arm_position, target, feedrate)
+        self.arm_position = dict(target)
+        return seconds
+
+    def _moves(self, *moves: Tuple[str, Optional[int]]) -> float:
+        """Seconds for a sequence of moves, skipping uncalibrated optional ones"""
+        return sum(self._move(name, feedrate) for name, feedrate in moves if name in self.positions)
+
+    def _pump(self, on: bool) -> float:
+        self.cup_held = on
+        return TOOL_COMMAND_TIME
+
+    def _start_station(self, station: SimStation, cup: int, dwell: float):
+        station.cup = cup
+        station.done_at = self.now + dwell
+        station.busy += dwell
+        self._schedule(station.done_at, "station")
+
+    def _take_from(self, station: SimStation) -> int:
+        """Arm picks the cup up; records how long it waited"""
+        station.blocked.append(max(0.0, self.now - station.done_at))
+        cup, station.cup = station.cup, None
+        return cup
+
+    # ═══════════════════════════════════════════════════════════════
+    # TASKS (generators of arm steps)
+    # ═══════════════════════════════════════════════════════════════
+
+    def _pick_new_cup(self) -> Iterator[Step]:
+        """detect_cup_before_pickup + pick_cup; sets self._picked to the cup or None"""
+        self._picked = None
+        arrived = self.queue.popleft() if self.arrival_interval else self.now
+        latency = self.detection_latency * self.rng.uniform(0.5, 1.5)
+        self.camera_busy += latency
+        if self.background_detection:
+            # Latched once the cup had been in view of an armed watcher long enough
+            in_view = max(arrived, self.watch_from) if self.arrival_interval else self.watch_from
+            latency = max(0.0, in_view + latency - self.now)
+        yield SystemState.DETECTING, latency
+
+        if self.rng.random() < self.detection_miss:
+            self.detection_misses += 1
+            self.failed += 1
+            if self.arrival_interval:
+                self.queue.appendleft(arrived)  # still there, retried next cycle
+            yield SystemState.IDLE, WORKER_CYCLE_DELAY
+            return
+
+        self.pickup_waits.append(max(0.0, self.now - arrived - latency))
+        yield SystemState.PICKING_UP, (self._moves(("pickup", 200), ("pickup_lower", 100)) +
+                                       self._pump(True) + self._moves(("pickup", 150)))
+        if self.rng.random() < self.pickup_failure:
+            self.dropped += 1
+            self.failed += 1
+            self._pump(False)
+            self.watch_from = self.now
+            return
+
+        cup = self.next_cup
+        self.next_cup += 1
+        self.cup_arrived[cup] = arrived
+        self._picked = cup
+
+    def _stack(self, cup: int) -> Iterator[Step]:
+        """place_at_stack"""
+        yield SystemState.MOVING_TO_STACK, self._moves(("safe", 200), ("stack", 200)) + self._pump(False)
+        self.completed += 1
+        self.cycle_times.append(self.now - self.cup_arrived.pop(cup))
+
+    def _serial_cycle(self) -> Iterator[Step]:
+        """single_cup_cycle followed by the worker's pause"""
+        yield from self._pick_new_cup()
+        cup = self._picked
+        if cup is None:
+            return
+
+        yield SystemState.MOVING_TO_WASH, self._moves(("wash_station", 200)) + self._pump(False)
+        self.watch_from = self.now
+        self._start_station(self.wash, cup, self.wash_time)
+        yield SystemState.WASHING, self.wash_time
+        self._take_from(self.wash)
+
+        yield SystemState.MOVING_TO_RINSE, (self._pump(True) +
+                                            self._moves(("safe", 200), ("rinse_station", 200)))
+        self._start_station(self.rinse, cup, self.rinse_time)
+        yield SystemState.RINSING, self.rinse_time  # cup stays on the suction cup
+        self._take_from(self.rinse)
+
+        yield from self._stack(cup)
+
+    def _load(self) -> Iterator[Step]:
+        """PipelineScheduler._load"""
+        yield from self._pick_new_cup()
+        if self._picked is None:
+            return
+        yield SystemState.MOVING_TO_WASH, self._moves(("wash_station", 200)) + self._pump(False)
+        self.watch_from = self.now
+        self._start_station(self.wash, self._picked, self.wash_time)
+
+    def _transfer(self) -> Iterator[Step]:
+        """PipelineScheduler._transfer"""
+        seconds = self._moves(("wash_station", None))
+        cup = self._take_from(self.wash)
+        yield SystemState.MOVING_TO_RINSE, (seconds + self._pump(True) +
+                                            self._moves(("safe", 200), ("rinse_station", 200)) +
+                                            self._pump(False))
+        self._start_station(self.rinse, cup, self.rinse_time)
+
+    def _unload(self) -> Iterator[Step]:
+        """PipelineScheduler._unload"""
+        seconds = self._moves(("rinse_station", None))
+        cup = self._take_from(self.rinse)
+        yield SystemState.MOVING_TO_STACK, seconds + self._pump(True)
+        yield from self._stack(cup)
+
+    # ═══════════════════════════════════════════════════════════════
+    # RESULTS
+    # ═══════════════════════════════════════════════════════════════
+
+    def results(self) -> Dict:
+        """
+        Returns:
+            {"cups", "failed", "sim_time", "cups_per_hour", "cycle_time",
+             "utilization": {device: fraction}, "state_time": {state: seconds},
+             "queueing": {"pickup_wait", "wash_blocked", "rinse_blocked": mean seconds,
+                          "pickup_wait_max": seconds}}
+        """
+        total = self.now or 1e-9
+        arm_accounted = sum(self.state_time.values())
+        state_time = {state.value: seconds for state, seconds in self.state_time.items() if seconds}
+        state_time[SystemState.IDLE.value] = state_time.get(SystemState.IDLE.value, 0.0) + \
+            max(0.0, total - arm_accounted)
+
+        def mean(values):
+            return statistics.fmean(values) if values else 0.0
+
+        return {
+            "mode": "pipelined" if self.pipelined else "serial",
+            "cups": self.completed,
+            "failed": self.failed,
+            "detection_misses": self.detection_misses,
+            "dropped": self.dropped,
+            "sim_time": self.now,
+            "cups_per_hour": self.completed * 3600.0 / total,
+            "cycle_time": mean(self.cycle_times),
+            "utilization": {
+                "arm": self.arm_busy / total,
+                "camera": self.camera_busy / total,
+                "wash": self.wash.busy / total,
+                "rinse": self.rinse.busy / total
+            },
+            "state_time": state_time,
+            "queueing": {
+                "pickup_wait": mean(self.pickup_waits),
+                "pickup_wait_max": max(self.pickup_waits, default=0.0),
+                "wash_blocked": mean(self.wash.blocked),
+                "rinse_blocked": mean(self.rinse.blocked)
+            }
+        }
+
+
+def print_results(results: Dict):
+    """Print simulation results"""
+    print(f"🏭 {results['mode']}: {results['cups']} cups in {results['sim_time'] / 3600:.2f} h simulated "
+          f"→ {results['cups_per_hour']:.1f} cups/h, {results['cycle_time']:.1f}s per cup in the cell")
+    print(f"   failed: {results['failed']} (missed detections {results['detection_misses']}, "
+          f"dropped {results['dropped']})")
+    print("   utilization: " + ", ".join(f"{device} {value * 100:.0f}%"
+                                         for device, value in results["utilization"].items()))
+    queueing = results["queueing"]
+    print(f"   queueing: pickup {queueing['pickup_wait']:.1f}s (max {queueing['pickup_wait_max']:.1f}s), "
+          f"wash blocked {queueing['wash_blocked']:.1f}s, rinse blocked {queueing['rinse_blocked']:.1f}s")
+    busiest = sorted(results["state_time"].items(), key=lambda item: -item[1])[:4]
+    print("   arm time: " + ", ".join(f"{state} {seconds / results['sim_time'] * 100:.0f}%"
+                                      for state, seconds in busiest))
+
+
+def main():
+    """Simulate the cell with the saved calibration, settings and motion fit"""
+    import argparse
+    from data.storage import DataStorage
+    from models.duration_estimator import DurationEstimator
+
+    settings = DataStorage.load_settings().get("robot", {})
+    parser = argparse.ArgumentParser(description="Discrete-event simulation of the washing cell")
+    parser.add_argument("--cups", type=int, default=1000)
+    parser.add_argument("--mode", choices=["serial", "pipelined", "both"], default="both")
+    parser.add_argument("--wash", type=float, default=settings.get("wash_time", 3))
+    parser.add_argument("--rinse", type=float, default=settings.get("rinse_time", 2))
+    parser.add_argument("--speed", type=int, default=settings.get("arm_speed", 300), help="Default feedrate")
+    parser.add_argument("--arrival", type=float, default=None, help="Mean seconds between cups (default: always one)")
+    parser.add_argument("--detect", type=float, default=DETECTION_LATENCY, help="Mean detection latency (s)")
+    parser.add_argument("--miss", type=float, default=0.0, help="Detection miss probability")
+    parser.add_argument("--drop", type=float, default=0.0, help="Pickup failure probability")
+    parser.add_argument("--max-time", type=float, default=None, help="Stop after this many simulated seconds")
+    parser.add_argument("--no-background", action="store_true", help="Detect only when the cycle asks")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    positions = DataStorage.load_calibration().get("positions", {})
+    estimator = DurationEstimator()
+    estimator.load()
+
+    modes = [False, True] if args.mode == "both" else [args.mode == "pipelined"]
+    for pipelined in modes:
+        try:
+            simulator = CellSimulator(positions, estimator.motion_model, args.wash, args.rinse, args.speed,
+                                      pipelined, args.detect, args.miss, args.drop, args.arrival,
+                                      background_detection=not args.no_background, seed=args.seed)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        print_results(simulator.run(args.cups, args.max_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,33 +9,69 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import time
 from datetime import datetime
-from typing import Dict, Optional, Tuple
-from config.constants import SystemState, WashingMode
+from typing import Dict, List, Optional, Tuple
+from config.constants import (SystemState, WashingMode, LOGS_DIR, POSITION_MONITOR_RATE,
+                              FEEDRATE_PROFILE_FILE, MOTION_FIT_FILE, YOLO_MODEL_PATH,
+                              BATCH_SLOTS, BATCH_SLOT_OFFSET, WORKSPACE_LIMITS, QUICK_DETECT_FRAMES,
+                              CAMERA_DEAD_FRAMES, POSITION_TOLERANCE, DIRT_CLEAN_THRESHOLD, MAX_WASH_PASSES)
 from models.robot import ZKBotController
 from models.wash_station import WashStationController
 from models.sensors import SensorSystem
 from models.vision import VisionSystem
+from models.feedrate_optimizer import FeedrateOptimizer
+from models.duration_estimator import DurationEstimator
+from models.link_supervisor import LinkSupervisor
+from models.position_monitor import PositionMonitor
+from models.pickup_watcher import PickupWatcher
+from models.state_machine import StateMachine
+from models.program_cache import ProgramCache, CompiledProgram
+from models.retry_policy import RetryPolicy, FailureKind
+from models.path_planner import PathPlanner
+from models.dirt_inspector import DirtInspector, WashRecipe
 from data.storage import DataStorage
 
 
 class CupWashingController:
     """Master controller orchestrating entire system"""
     
-    def __init__(self):
+    def __init__(self, cell: Optional[Dict] = None, detector=None):
+        """
+        Args:
+            cell: Settings of one washing cell, overriding the "robot" settings
+                (port, camera_id, ...) - used by the cell orchestrator
+            detector: Shared inference client for the vision system (default: own YOLO model)
+        """
         # Initialize subsystems
         settings = DataStorage.load_settings()
-        robot_config = settings.get("robot", {})
+        robot_config = dict(settings.get("robot", {}), **(cell or {}))
+        self.cell_name = (cell or {}).get("name")  # None outside the cell orchestrator
         
         self.robot = ZKBotController(
             port=robot_config.get("port", "COM3"),
-            baudrate=robot_config.get("baudrate", 115200)
+            baudrate=robot_config.get("baudrate", 115200),
+            trace_level=robot_config.get("trace_level", "error")
         )
+        # Opt-in serial session recording for offline latency analysis
+        if robot_config.get("record_serial", False):
+            self.robot.start_recording(os.path.join(
+                LOGS_DIR, f"serial_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zkrec"))
+        
+        # Heartbeat + auto-reconnect, started once the robot is connected
+        self.link_supervisor = None
+        if robot_config.get("link_supervisor", True):
+            self.link_supervisor = LinkSupervisor(
+                self.robot, rehome=robot_config.get("rehome_on_reconnect", False))
+        
+        # Live position updates for the teach pendant, started on demand
+        self.position_monitor = PositionMonitor(
+            self.robot, rate_hz=robot_config.get("position_monitor_hz", POSITION_MONITOR_RATE))
+        
         self.wash_station = WashStationController()
         self.sensors = SensorSystem()
         
         # Initialize vision with trained model
-        model_path = "runs\detect\runs\detect\yolov8n_areas_with_background\weights\best.pt"  # Use latest trained model
-        self.vision = VisionSystem(model_path=model_path)
+        self.vision = VisionSystem(model_path=YOLO_MODEL_PATH, detector=detector)
+        self.camera_id = robot_config.get("camera_id")  # None = try 0, 1, 2
         
         # Load calibration
         self.calibration = DataStorage.load_calibration()
@@ -50,8 +86,18 @@ class CupWashingController:
             for name, pos in self.positions.items():
                 print(f"   {name}: X={pos['x']:.1f}, Y={pos['y']:.1f}, Z={pos['z']:.1f}")
         
-        # System state
-        self.state = SystemState.IDLE
+        # Per-segment feedrates (opt-in); learns from confirmed move durations
+        self.optimize_feedrates = robot_config.get("optimize_feedrates", False)
+        self.feedrate_optimizer = FeedrateOptimizer(self.positions, self.robot.motion_model,
+                                                    robot_config.get("feed_limits"))
+        self.feedrate_optimizer.load(DataStorage.cell_path(FEEDRATE_PROFILE_FILE))
+        
+        # Move/program duration model, fitted to measured moves (shares the robot's model)
+        self.duration_estimator = DurationEstimator(self.robot.motion_model)
+        self.duration_estimator.load(DataStorage.cell_path(MOTION_FIT_FILE))
+        
+        # System state - every change is timed by the state machine
+        self.state_machine = StateMachine(SystemState.IDLE)
         self.washing_mode = WashingMode.SINGLE_CYCLE
         self.target_cups = 1
         self.washed_cups = 0
@@ -62,6 +108,32 @@ class CupWashingController:
         self.arm_speed = robot_config.get("arm_speed", 300)  # Increased from 100 for faster movement
         self.wash_duration = robot_config.get("wash_time", 3)  # Reduced from 10 to 3 seconds
         self.rinse_duration = robot_config.get("rinse_time", 2)  # Reduced from 5 to 2 seconds
+        self.auto_discover = robot_config.get("auto_discover", True)  # Probe ports if the saved one fails
+        self.stream_window = robot_config.get("stream_window", 4)  # Moves kept in controller buffer (1 = no streaming)
+        self.compile_programs = robot_config.get("compile_programs", False)  # Run programs through ProgramCompiler
+        self.pipelined = robot_config.get("pipelined", False)  # Built-in sequence with arm moves overlapping wash/rinse (PipelineScheduler)
+        self.background_detection = robot_config.get("background_detection", True)  # Latch the next cup while the arm works
+        self.pickup_watcher = PickupWatcher(self.vision)
+        self.batch_size = robot_config.get("batch_size", BATCH_SLOTS)  # Cups per station cycle in BATCH mode
+        self.slot_offset = robot_config.get("slot_offset", BATCH_SLOT_OFFSET)
+        self.slot_positions = self._derive_slots()
+        self.plan_paths = robot_config.get("plan_paths", False)  # Skip the safe detour where the planner finds a clear route
+        self.path_planner = PathPlanner({**self.positions, **self.slot_positions}, self.robot.motion_model,
+                                        robot_config.get("station_geometry"))
+        self.path_time_saved = 0.0  # predicted seconds saved by planned routes since start
+        self.adaptive_wash = robot_config.get("adaptive_wash", False)  # Wash time/brush speed from the cup's soiling
+        self.reinspect = robot_config.get("reinspect", False)  # Re-wash cups still dirty after the rinse ("inspect" position)
+        self.max_wash_passes = robot_config.get("max_wash_passes", MAX_WASH_PASSES)
+        self.dirt_inspector = DirtInspector(self.vision, robot_config.get("wash_curve"),
+                                            robot_config.get("clean_threshold", DIRT_CLEAN_THRESHOLD))
+        self.wash_recipe: Optional[WashRecipe] = None  # recipe of the cup (or batch) in the wash station
+        self.wash_passes = 0  # washes of the current cup
+        self.initial_dirt: Optional[float] = None  # dirt % at the inspection before the first wash
+        self.final_dirt: Optional[float] = None  # dirt % at the last re-inspection
+        self.retry_policy = RetryPolicy(robot_config.get("retry"))  # Retries/backoff per failure kind
+        self.last_failure: Optional[FailureKind] = None  # Kind of the last failed detection/pickup/move
+        self.scheduler = None
+        self.program_cache = ProgramCache(self)  # programs are compiled once per file version
         
         # Runtime tracking
         self.is_running = False
@@ -69,22 +141,51 @@ class CupWashingController:
         self.start_time = None
         self.cycle_times = []
     
+    @property
+    def state(self) -> SystemState:
+        return self.state_machine.state
+    
+    @state.setter
+    def state(self, value: SystemState):
+        self.state_machine.enter(value)
+    
     def connect_robot(self, port: str = "COM3", baudrate: int = 115200) -> Tuple[bool, str]:
         """Connect to robot"""
         self.robot.port = port
         self.robot.baudrate = baudrate
-        success = self.robot.connect()
+        success, _ = self.robot.connect()
         self.connected = success
         
         if success:
+            if self.link_supervisor:
+                self.link_supervisor.start()
             # Update current position
             self.robot.get_position()
             return True, "Connected successfully"
         else:
             return False, "Connection failed"
     
+    def discover_robot_port(self) -> bool:
+        """Probe all serial ports for the arm, save the result and connect"""
+        from models.port_discovery import PortDiscovery
+        
+        # Never probe another cell's arm; an orchestrated cell saves to its own entry
+        found = PortDiscovery().discover(preferred=(self.robot.port, self.robot.baudrate),
+                                         exclude=PortDiscovery.ports_of_other_cells(self.cell_name))
+        if not found:
+            return False
+        
+        self.robot.port, self.robot.baudrate = found
+        PortDiscovery.save(*found, cell=self.cell_name)
+        success, _ = self.robot.connect()
+        self.connected = success
+        return success
+    
     def disconnect_robot(self) -> bool:
         """Disconnect from robot"""
+        self.position_monitor.stop()
+        if self.link_supervisor:
+            self.link_supervisor.stop()
         success = self.robot.disconnect()
         self.connected = False
         return success
@@ -95,11 +196,15 @@ class CupWashingController:
         
         # Connect robot
         if not self.robot.connected:
-            success = self.robot.connect()
+            success, _ = self.robot.connect()
+            if not success and self.auto_discover:
+                success = self.discover_robot_port()
             if not success:
                 self.log_error("Robot connection failed")
                 return False
             self.connected = True
+        if self.link_supervisor:
+            self.link_supervisor.start()
         
         # Clear any existing errors
         print("🔄 Clearing errors...")
@@ -135,7 +240,7 @@ class CupWashingController:
         try:
             # Try indices: 0 (web cam), 1 (laptop), 2 (USB)
             camera_started = False
-            for camera_id in [0, 1, 2]:
+            for camera_id in ([self.camera_id] if self.camera_id is not None else [0, 1, 2]):
                 if self.vision.start_camera(camera_id=camera_id):
                     camera_started = True
                     break
@@ -151,7 +256,13 @@ class CupWashingController:
         """Safely shutdown system"""
         print("🛑 Shutting down system...")
         self.stop_washing()
+        self.position_monitor.stop()
+        self.pickup_watcher.stop()
+        if self.link_supervisor:
+            self.link_supervisor.stop()
         self.robot.disconnect()
+        self.robot.stop_recording()
+        self.learn_from_moves()
         self.vision.stop_camera()
         print("✓ System shutdown complete")
     
@@ -159,40 +270,197 @@ class CupWashingController:
         """Reload positions from calibration file"""
         self.calibration = DataStorage.load_calibration()
         self.positions = self.calibration.get("positions", {})
+        self.feedrate_optimizer.stations = self.positions
+        self.slot_positions = self._derive_slots()
+        self.path_planner.positions = {**self.positions, **self.slot_positions}
+        self.program_cache.invalidate()  # validation and optimization depend on positions
         print(f"📍 Reloaded {len(self.positions)} positions")
     
+    def learn_from_moves(self, save: bool = True):
+        """
+        Hand confirmed move durations to the feedrate optimizer and the
+        duration model, refit the model and (optionally) persist both.
+        """
+        moves = list(self.robot.move_log)
+        self.robot.move_log.clear()
+        if not moves:
+            return
+        
+        self.feedrate_optimizer.learn(moves)
+        self.duration_estimator.add_move_log(moves)
+        self.duration_estimator.fit()
+        if save:
+            self.feedrate_optimizer.save(DataStorage.cell_path(FEEDRATE_PROFILE_FILE))
+            self.duration_estimator.save(DataStorage.cell_path(MOTION_FIT_FILE))
+    
+    def estimate_cycle_time(self, program_name: str) -> Optional[Dict]:
+        """
+        Predicted duration of one program run (cup detection excluded),
+        without moving the arm.
+        
+        Returns:
+            DurationEstimator.estimate_program() result, or None if the
+            program is missing or empty
+        """
+        program_data = DataStorage.load_program(program_name)
+        steps = program_data.get("steps", []) if program_data else []
+        if not steps:
+            return None
+        
+        self.learn_from_moves(save=False)
+        return self.duration_estimator.estimate_program(steps)
+    
+    def simulate_cell(self, cups: int = 1000, pipelined: Optional[bool] = None, **options) -> Optional[Dict]:
+        """
+        Simulate the cell with the current positions, timings and motion fit.
+        
+        Args:
+            cups: Cups to simulate
+            pipelined: Scheduler to model (default: the configured one)
+            **options: Further CellSimulator arguments (wash_time, detection_miss, ...)
+        
+        Returns:
+            CellSimulator results, or None if positions are missing
+        """
+        from models.cell_simulator import CellSimulator
+        settings = {
+            "wash_time": self.wash_duration,
+            "rinse_time": self.rinse_duration,
+            "arm_speed": self.arm_speed,
+            "pipelined": self.pipelined if pipelined is None else pipelined,
+            "feedrate_optimizer": self.feedrate_optimizer if self.optimize_feedrates else None
+        }
+        settings.update(options)
+        try:
+            simulator = CellSimulator(self.positions, self.robot.motion_model, **settings)
+        except ValueError as e:
+            print(f"❌ Cannot simulate: {e}")
+            return None
+        return simulator.run(cups)
+    
+    def project_cycle_time(self, program_name: str) -> Optional[Dict]:
+        """
+        Dry run: projected duration of a program with its own feedrates and
+        with optimized ones. Nothing is sent to the arm.
+        
+        Returns:
+            {"current": projection, "optimized": projection} or None if the
+            program is missing or leaves the workspace
+        """
+        program_data = DataStorage.load_program(program_name)
+        steps = program_data.get("steps", []) if program_data else []
+        if not steps:
+            return None
+        
+        self.learn_from_moves(save=False)
+        try:
+            optimized = self.feedrate_optimizer.optimize_steps(steps, self.robot.target_position)
+        except ValueError as e:
+            self.log_error(f"Program '{program_name}': {e}")
+            return None
+        
+        return {
+            "current": self.feedrate_optimizer.project_steps(steps, self.robot.target_position),
+            "optimized": self.feedrate_optimizer.project_steps(optimized, self.robot.target_position)
+        }
+    
     # ═══════════════════════════════════════════════════════════════
     # MOVEMENT OPERATIONS
     # ═══════════════════════════════════════════════════════════════
     
     def move_to(self, position_name: str, feedrate: Optional[int] = None) -> bool:
-        """Move arm to named position"""
-        if position_name not in self.positions:
+        """Move arm to named position (calibrated, or a derived batch slot)"""
+        pos = self.positions.get(position_name) or self.slot_positions.get(position_name)
+        if pos is None:
             error_msg = f"Position '{position_name}' not calibrated! Go to Developer Mode to teach it."
             self.log_error(error_msg)
             print(f"❌ {error_msg}")
             return False
         
-        pos = self.positions[position_name]
+        return self._move_point(position_name, pos, feedrate or self.arm_speed)
+    
+    def arm_arrived(self) -> bool:
+        """
+        Wait for the arm to reach its target before a pump change. Only
+        gated when P01 reports positions - without feedback the wait
+        would be a guess, so the pump switches right after the ack as
+        before (no delay).
+        """
+        if self.robot.position_feedback is False:
+            return True
+        return self.robot.wait_motion_done()
+    
+    def _move_point(self, label: str, pos: Dict[str, float], feedrate: int) -> bool:
+        """Move arm to a point (a named position or a planned waypoint)"""
         x, y, z = pos["x"], pos["y"], pos["z"]
-        feedrate = feedrate or self.arm_speed
         
-        print(f"➡️  Moving to '{position_name}': X={x:.1f}, Y={y:.1f}, Z={z:.1f}, F={feedrate}")
+        if self.optimize_feedrates:
+            try:
+                feedrate, _ = self.feedrate_optimizer.feedrate_for(
+                    self.robot.target_position, pos, cup_held=self.robot.pump_active)
+            except ValueError as e:
+                self.log_error(f"Move to {label} refused: {e}")
+                return False
+        
+        print(f"➡️  Moving to '{label}': X={x:.1f}, Y={y:.1f}, Z={z:.1f}, F={feedrate}")
+        
+        responses = []
         
-        success, response = self.robot.move_point_to_point(x, y, z, feedrate)
+        def send() -> bool:
+            success, response = self.robot.move_point_to_point(x, y, z, feedrate)
+            responses.append(response)
+            return success
         
+        # Transient link errors are retried during a run - never after a stop
+        success, _ = self.retry_policy.run(send, lambda: FailureKind.ROBOT,
+                                           lambda: not self.is_running, self._on_retry)
         if not success:
-            self.log_error(f"Move failed to {position_name}: {response}")
+            self.last_failure = FailureKind.ROBOT
+            self.log_error(f"Move failed to {label}: {responses[-1]}")
             self.state = SystemState.ERROR
             return False
         
         return True
     
+    def travel_to(self, position_name: str, feedrate: int = 200) -> bool:
+        """
+        Move between stations. Goes through `safe` (if taught and the arm
+        is not already there) unless plan_paths is on - then along the
+        fastest route the path planner predicts to clear the stations,
+        `safe` included. BATCH mode always plans: the slots sit next to
+        each other, so moves lift clear of the cups in neighbouring slots.
+        """
+        pos = self.positions.get(position_name) or self.slot_positions.get(position_name)
+        safe = self.positions.get("safe")
+        if safe and self._is_at(safe):
+            safe = None  # e.g. pick_from_wash already lifted the cup to safe
+        if not (self.plan_paths or self.washing_mode == WashingMode.BATCH) or pos is None:
+            if safe and not self.move_to("safe", feedrate=feedrate):
+                return False
+            return self.move_to(position_name, feedrate=feedrate)
+        
+        path = self.path_planner.plan(self.robot.target_position, pos, feedrate,
+                                      cup_held=self.robot.pump_active, via=safe)
+        for i, point in enumerate(path.waypoints[:-1]):
+            if not self._move_point(f"{position_name} ({path.route} {i + 1})", point, feedrate):
+                return False
+        if not self.move_to(position_name, feedrate=feedrate):
+            return False
+        if self.plan_paths:
+            self.path_time_saved += path.saved
+        return True
+    
+    def _is_at(self, pos: Dict[str, float]) -> bool:
+        """Last commanded position is `pos` (within POSITION_TOLERANCE)"""
+        target = self.robot.target_position
+        return all(abs(target[axis] - pos[axis]) <= POSITION_TOLERANCE for axis in "xyz")
+    
     # ═══════════════════════════════════════════════════════════════
     # WASHING OPERATIONS
     # ═══════════════════════════════════════════════════════════════
     
-    def detect_cup_before_pickup(self, confidence_threshold: float = 0.8, max_wait_frames: int = 200) -> Tuple[bool, str]:  # Changed default from 0.6 to 0.8
+    def detect_cup_before_pickup(self, confidence_threshold: float = 0.8, max_wait_frames: int = 200,
+                                 log_miss: bool = True) -> Tuple[bool, str]:  # Changed default from 0.6 to 0.8
         """
         Detect if a cup is present in the pickup area before moving arm
         Uses stable frame detection (needs 8 consecutive frames)
@@ -200,22 +468,37 @@ class CupWashingController:
         Args:
             confidence_threshold: Minimum confidence for detection (0-1)
             max_wait_frames: Maximum frames to wait for stable detection
+            log_miss: Report a timeout as an error (off for background checks)
         
         Returns:
             Tuple[bool, str]: (cup_detected, message)
         """
         try:
+            # Fail fast when no detection is possible at all
+            if not self.vision.is_running:
+                return self._detection_failed(FailureKind.CAMERA, "Camera not running", log_miss)
+            if self.vision.model is None and self.vision.detector is None:
+                return self._detection_failed(FailureKind.CAMERA, "No detection model loaded", log_miss)
+            
+            if self.pickup_watcher.is_running:
+                return self._take_latched_cup(confidence_threshold, max_wait_frames, log_miss)
+            
             print("\n🎥 Checking for cup (waiting for stable detection)...")
             self.vision.reset_detection_state()
             
             frame_count = 0
+            empty_frames = 0
             while frame_count < max_wait_frames:
                 # Capture frame from camera
                 frame = self.vision.capture_frame()
                 if frame is None:
+                    empty_frames += 1
+                    if empty_frames >= CAMERA_DEAD_FRAMES:
+                        return self._detection_failed(FailureKind.CAMERA, "Camera returns no frames", log_miss)
                     frame_count += 1
                     time.sleep(0.005)  # Minimal retry delay
                     continue
+                empty_frames = 0
                 
                 # Check for cup with stability counting
                 cup_detected, stable_count = self.vision.detect_cup_stable(frame)
@@ -233,16 +516,80 @@ class CupWashingController:
                 time.sleep(0.01)  # Reduced from 0.05 to 0.01 seconds for faster detection
             
             # No stable detection found
-            error_msg = "No cup detected in pickup area (timeout)"
-            print(f"❌ {error_msg}")
-            self.log_error(error_msg)
-            return False, error_msg
+            return self._detection_failed(FailureKind.NO_CUP, "No cup detected in pickup area (timeout)", log_miss)
             
         except Exception as e:
-            error_msg = f"Cup detection error: {str(e)}"
+            return self._detection_failed(FailureKind.CAMERA, f"Cup detection error: {str(e)}", True)
+    
+    def _detection_failed(self, kind: FailureKind, error_msg: str, log: bool) -> Tuple[bool, str]:
+        """Record why detection failed; log it unless the caller handles misses"""
+        self.last_failure = kind
+        if log:
+            print(f"❌ {error_msg}")
             self.log_error(error_msg)
+        return False, error_msg
+    
+
+    def _take_latched_cup(self, confidence_threshold: float, max_wait_frames: int,
+                          log_miss: bool) -> Tuple[bool, str]:
+        """Detection from the pickup watcher - instant if a cup was latched while the arm was away"""
+        cup_pos = self.vision.take_latched_cup(max_wait_frames * self.pickup_watcher.frame_time,
+                                               confidence_threshold)
+        if cup_pos is None:
+            if self.pickup_watcher.empty_frames >= CAMERA_DEAD_FRAMES:
+                return self._detection_failed(FailureKind.CAMERA, "Camera returns no frames", log_miss)
+            return self._detection_failed(FailureKind.NO_CUP, "No cup detected in pickup area (timeout)", log_miss)
+        
+        confidence = cup_pos.get("confidence", 0)
+        age = time.monotonic() - cup_pos["time"]
+        print(f"\n🎥 Cup detected stably! Confidence: {confidence:.2f} (latched {age:.1f}s ago)")
+        return True, f"Cup detected with {confidence:.2f} confidence ({cup_pos['stable_count']} frames)"
+    
+    def wait_for_cup(self, confidence_threshold: float = 0.5) -> bool:
+        """
+        Detect the next cup under the retry policy. During a run an empty
+        tray is waited out in WAITING_FOR_CUPS with short polls instead of
+        failing the cup; camera faults give up after a few retries.
+        """
+        polls = []
+        
+        def detect() -> bool:
+            frames = QUICK_DETECT_FRAMES if polls else 200
+            polls.append(frames)
+            return self.detect_cup_before_pickup(confidence_threshold, max_wait_frames=frames, log_miss=False)[0]
+        
+        success, kind = self.retry_policy.run(detect, lambda: self.last_failure or FailureKind.UNKNOWN,
+                                              lambda: not self.is_running, self._on_retry)
+        if not success:
+            error_msg = {
+                FailureKind.NO_CUP: "No cup detected in pickup area (timeout)",
+                FailureKind.CAMERA: "Camera failure - no frames or no detection model"
+            }.get(kind, "Cup detection failed")
             print(f"❌ {error_msg}")
-            return False, error_msg
+            self.log_error(error_msg)
+        return success
+    
+    def pick_cup_with_retry(self) -> bool:
+        """pick_cup, tried again after a fumble; robot failures are not retried twice"""
+        def attempt() -> bool:
+            self.last_failure = None
+            if self.pick_cup():
+                return True
+            self.robot.pump_off()  # let go of a half-lifted cup before trying again
+            return False
+        
+        success, _ = self.retry_policy.run(
+            attempt, lambda: self.last_failure or FailureKind.PICKUP,
+            lambda: not self.is_running or self.last_failure == FailureKind.ROBOT, self._on_retry)
+        return success
+    
+    def _on_retry(self, kind: FailureKind, attempt: int, delay: float):
+        if kind == FailureKind.NO_CUP:
+            if attempt == 0:
+                print("⏳ Pickup tray empty - waiting for cups...")
+            self.state = SystemState.WAITING_FOR_CUPS
+        else:
+            print(f"🔁 {kind.value} failure - retry {attempt + 1} in {delay:.1f}s")
     
     def pick_cup(self) -> bool:
         """Execute cup pickup sequence"""
@@ -265,8 +612,10 @@ class CupWashingController:
                 if not self.move_to("pickup_lower", feedrate=100):
                     return False
             
-            # Activate suction
+            # Activate suction once the arm is actually at the cup
             print("  Step 3: Activating suction cup...")
+            if not self.arm_arrived():
+                raise Exception("Arm did not reach pickup position")
             self.robot.pump_on()
             # NO DELAY - move immediately
             
@@ -282,6 +631,65 @@ class CupWashingController:
             self.log_error(f"Pickup failed: {e}")
             return False
     
+    def inspect_cup(self, keep_dirtiest: bool = False) -> bool:
+        """
+        Estimate the soiling of the cup at pickup and choose its wash
+        recipe. Never fails the cycle: without a measurement the cup gets
+        the configured wash time.
+        
+        Args:
+            keep_dirtiest: Keep the current recipe if it is for a dirtier cup (batch)
+        """
+        self.state = SystemState.INSPECTING
+        dirt = self.dirt_inspector.measure()
+        if dirt is None:
+            if not keep_dirtiest:
+                self.wash_recipe = None
+            print("⚠ Dirt inspection failed - using the configured wash time")
+            return True
+        
+        recipe = self.dirt_inspector.recipe_for(dirt)
+        if keep_dirtiest and self.wash_recipe and self.wash_recipe.dirt >= dirt:
+            recipe = self.wash_recipe
+        self.wash_recipe = recipe
+        self.initial_dirt = recipe.dirt
+        print(f"🔍 Dirt {dirt:.1f}% - wash {recipe.wash_time:.1f}s, brush {recipe.brush_speed}")
+        return True
+    
+    def reinspect_cup(self) -> bool:
+        """
+        Show the rinsed cup to the camera at the "inspect" position. A cup
+        that is still dirty gets a recipe for its remaining soiling and is
+        washed again (up to max_wash_passes washes).
+        """
+        self.state = SystemState.REINSPECTING
+        print("\n🔍 Re-inspecting rinsed cup...")
+        self.vision.disarm_latch()  # the held cup is not the next cup at pickup
+        self.final_dirt = None
+        if not self.travel_to("inspect", feedrate=200) or not self.robot.wait_motion_done():
+            return False
+        
+        dirt = self.dirt_inspector.measure()
+        if dirt is None:
+            print("⚠ Re-inspection failed - stacking cup")
+            return True
+        self.final_dirt = dirt
+        
+        if self.dirt_inspector.is_clean(dirt):
+            print(f"✓ Cup clean ({dirt:.1f}% dirt)")
+        elif self.wash_passes < self.max_wash_passes:
+            self.wash_recipe = self.dirt_inspector.recipe_for(dirt)
+            print(f"🔁 Still {dirt:.1f}% dirt - washing again")
+        else:
+            print(f"⚠ Still {dirt:.1f}% dirt after {self.wash_passes} washes - stacking cup")
+        return True
+    
+    @property
+    def needs_rewash(self) -> bool:
+        """Last re-inspection found the cup dirty and it may be washed again"""
+        return (self.final_dirt is not None and not self.dirt_inspector.is_clean(self.final_dirt)
+                and self.wash_passes < self.max_wash_passes)
+    
     def place_at_wash(self) -> bool:
         """Place cup at wash station"""
         try:
@@ -296,7 +704,10 @@ class CupWashingController:
             
             # Release cup
             print("  Releasing cup...")
+            if not self.arm_arrived():
+                raise Exception("Arm did not reach wash station")
             self.robot.pump_off()
+            self.pickup_watcher.resume()  # cup is out of the pickup area
             # NO DELAY - move immediately
             
             print("✓ Cup placed at wash station")
@@ -310,10 +721,16 @@ class CupWashingController:
         """Execute washing cycle"""
         try:
             self.state = SystemState.WASHING
-            duration = duration or self.wash_duration
+            recipe = self.wash_recipe
+            duration = duration or (recipe.wash_time if recipe else self.wash_duration)
+            brush_speed = recipe.brush_speed if recipe else None
+            self.wash_passes += 1
             
             print(f"\n🧼 Washing for {duration} seconds...")
-            self.wash_station.execute_wash_cycle(duration)
+            if not self.wash_station.execute_wash_cycle(duration, brush_speed):
+                print("⚠ Washing stopped early")
+                self.last_failure = FailureKind.STATION
+                return False
             
             print("✓ Washing complete")
             return True
@@ -332,8 +749,8 @@ class CupWashingController:
             self.robot.pump_on()
             # NO DELAY - move immediately
             
-            # Move to safe position if it exists
-            if "safe" in self.positions:
+            # Move to safe position if it exists (the planner routes the next move instead)
+            if "safe" in self.positions and not self.plan_paths:
                 print("  Moving to safe position...")
                 if not self.move_to("safe", feedrate=200):
                     return False
@@ -354,7 +771,7 @@ class CupWashingController:
             if "rinse_station" not in self.positions:
                 raise Exception("Position 'rinse_station' not calibrated")
             
-            if not self.move_to("rinse_station", feedrate=200):
+            if not self.travel_to("rinse_station", feedrate=200):
                 return False
             
             print("✓ Cup placed at rinse station")
@@ -371,7 +788,10 @@ class CupWashingController:
             duration = duration or self.rinse_duration
             
             print(f"\n💦 Rinsing for {duration} seconds...")
-            self.wash_station.execute_rinse_cycle(duration)
+            if not self.wash_station.execute_rinse_cycle(duration):
+                print("⚠ Rinsing stopped early")
+                self.last_failure = FailureKind.STATION
+                return False
             
             print("✓ Rinsing complete")
             return True
@@ -386,19 +806,17 @@ class CupWashingController:
             self.state = SystemState.MOVING_TO_STACK
             print("\n📚 Moving to stack area...")
             
-            # Move to safe position first if it exists
-            if "safe" in self.positions:
-                if not self.move_to("safe", feedrate=200):
-                    return False
-            
             if "stack" not in self.positions:
                 raise Exception("Position 'stack' not calibrated")
             
-            if not self.move_to("stack", feedrate=200):
+            # Through the safe position if it exists, or along a planned route
+            if not self.travel_to("stack", feedrate=200):
                 return False
             
             # Release cup
             print("  Releasing cup...")
+            if not self.arm_arrived():
+                raise Exception("Arm did not reach stack position")
             self.robot.pump_off()
             # NO DELAY - move immediately
             
@@ -416,231 +834,618 @@ class CupWashingController:
     
     def single_cup_cycle(self) -> bool:
         """Complete washing cycle for one cup"""
-        cycle_start = time.time()
+        return self._run_cycle()
+    
+    def single_cup_cycle_with_program(self, program_name: str) -> bool:
+        """Execute washing cycle using a saved program"""
+        return self._run_cycle(program_name)
+    
+    def _cycle_table(self, program_name: Optional[str] = None) -> Dict:
+        """
+        States of one cup cycle. After detection the cycle either runs the
+        saved program or the built-in pick/wash/rinse/stack sequence.
+        """
+        threshold = 0.8 if program_name else 0.5  # programs run with stricter detection
+        return {
+            SystemState.DETECTING: {
+                "action": lambda: self.wait_for_cup(confidence_threshold=threshold),
+                "error": "Cup detection failed",
+                "next": [(SystemState.RUNNING_PROGRAM, lambda: program_name is not None),
+                         (SystemState.INSPECTING, lambda: self.adaptive_wash),
+                         (SystemState.PICKING_UP, None)]
+            },
+            SystemState.INSPECTING: {
+                "action": self.inspect_cup,
+                "next": [(SystemState.PICKING_UP, None)]
+            },
+            SystemState.RUNNING_PROGRAM: {
+                "action": lambda: self.execute_program(program_name),
+                "error": f"Program '{program_name}' failed",
+                "next": [(SystemState.IDLE, None)]
+            },
+            SystemState.PICKING_UP: {
+                "action": self.pick_cup_with_retry,
+                "error": "Pickup failed",
+                "next": [(SystemState.MOVING_TO_WASH, None)]
+            },
+            SystemState.MOVING_TO_WASH: {
+                "action": self.place_at_wash,
+                "error": "Place at wash failed",
+                "next": [(SystemState.WASHING, None)]
+            },
+            SystemState.WASHING: {
+                "action": self.wash_cycle,
+                "error": "Wash cycle failed",
+                "next": [(SystemState.MOVING_TO_RINSE, None)]
+            },
+            SystemState.MOVING_TO_RINSE: {
+                "action": lambda: self.pick_from_wash() and self.place_at_rinse(),
+                "error": "Transfer to rinse failed",
+                "next": [(SystemState.RINSING, None)]
+            },
+            SystemState.RINSING: {
+                "action": self.rinse_cycle,
+                "error": "Rinse cycle failed",
+                "next": [(SystemState.REINSPECTING, lambda: self.reinspect and "inspect" in self.positions),
+                         (SystemState.MOVING_TO_STACK, None)]
+            },
+            SystemState.REINSPECTING: {
+                "action": self.reinspect_cup,
+                "error": "Move to inspect position failed",
+                "next": [(SystemState.MOVING_TO_WASH, lambda: self.needs_rewash),
+                         (SystemState.MOVING_TO_STACK, None)]
+            },
+            SystemState.MOVING_TO_STACK: {
+                "action": self.place_at_stack,
+                "error": "Place at stack failed",
+                "next": [(SystemState.IDLE, None)]
+            }
+        }
+    
+    # ═══════════════════════════════════════════════════════════════
+    # BATCH CYCLE
+    # ═══════════════════════════════════════════════════════════════
+    
+    @staticmethod
+    def slot_name(station: str, slot: int) -> str:
+        """Position name of a batch slot: slot 0 is the station itself, then wash_station_2, ..."""
+        return station if slot == 0 else f"{station}_{slot + 1}"
+    
+    def _derive_slots(self) -> Dict[str, Dict]:
+        """
+        Batch slots 2..K, each `slot_offset` from the previous one. Slots
+        taught in Developer Mode (e.g. "wash_station_2") are used as taught.
+        """
+        slots = {}
+        for station in ("wash_station", "rinse_station"):
+            if station not in self.positions:
+                continue
+            base = self.positions[station]
+            for slot in range(1, self.batch_size):
+                name = self.slot_name(station, slot)
+                if name in self.positions:
+                    continue
+                pos = {axis: base[axis] + slot * self.slot_offset.get(axis, 0.0) for axis in "xyz"}
+                if any(not WORKSPACE_LIMITS[axis.upper()]["min"] <= pos[axis] <= WORKSPACE_LIMITS[axis.upper()]["max"]
+                       for axis in "xyz"):
+                    print(f"⚠ Batch slot '{name}' is outside the workspace - batches limited to {slot} cups")
+                    break
+                slots[name] = pos
+        return slots
+    
+    @property
+    def batch_capacity(self) -> int:
+        """Slots usable at both stations"""
+        def usable(station):
+            return next((slot for slot in range(self.batch_size)
+                         if self.slot_name(station, slot) not in self.positions
+                         and self.slot_name(station, slot) not in self.slot_positions), self.batch_size)
+        return min(usable("wash_station"), usable("rinse_station"))
+    
+    def _move_cup(self, source: str, target: str) -> bool:
+        """Pick the cup sitting at `source` and leave it at `target`"""
+        if not self.travel_to(source, feedrate=200) or not self.robot.wait_motion_done():
+            return False
+        self.robot.pump_on()
+        if not self.travel_to(target, feedrate=200) or not self.robot.wait_motion_done():
+            return False
+        self.robot.pump_off()
+        return True
+    
+    def _batch_table(self, slots: int, loaded: List[int]) -> Dict:
+        """
+        States of one batch: detect/pick/place repeats until `slots` cups
+        are in the wash station or no further cup is waiting, then all of
+        them are washed, moved to the rinse slots, rinsed and stacked.
+        `loaded` collects the filled slot numbers.
+        """
+        found = []
         
+        def detect() -> bool:
+            # The first cup is waited for; later ones only if already there
+            if loaded:
+                found.append(self.detect_cup_before_pickup(
+                    confidence_threshold=0.5, max_wait_frames=QUICK_DETECT_FRAMES, log_miss=False)[0])
+            else:
+                found.append(self.wait_for_cup(confidence_threshold=0.5))
+            if found[-1] and self.adaptive_wash:
+                self.inspect_cup(keep_dirtiest=True)  # the batch washes as long as its dirtiest cup needs
+            return found[-1] or bool(loaded)
+        
+        def pick() -> bool:
+            # Back from a wash slot: lift clear of the cups in the other slots first
+            if loaded and not self.travel_to("pickup", feedrate=200):
+                return False
+            return self.pick_cup_with_retry()
+        
+        def place() -> bool:
+            slot = len(loaded)
+            name = self.slot_name("wash_station", slot)
+            print(f"\n🚿 Placing cup in wash slot {slot + 1}/{slots}...")
+            if not self.travel_to(name, feedrate=200) or not self.robot.wait_motion_done():
+                return False
+            self.robot.pump_off()
+            self.pickup_watcher.resume()
+            loaded.append(slot)
+            return True
+        
+        def transfer() -> bool:
+            print(f"\n🔁 Moving {len(loaded)} cups to the rinse slots...")
+            return all(self._move_cup(self.slot_name("wash_station", slot), self.slot_name("rinse_station", slot))
+                       for slot in loaded)
+        
+        def unload() -> bool:
+            for slot in loaded:
+                print(f"\n📤 Unloading rinse slot {slot + 1}...")
+                if not self.travel_to(self.slot_name("rinse_station", slot), feedrate=200):
+                    return False
+                if not self.robot.wait_motion_done():
+                    return False
+                self.robot.pump_on()
+                if not self.place_at_stack():
+                    return False
+            return True
+        
+        def more_cups() -> bool:
+            return len(loaded) < slots and self.is_running
+        
+        return {
+            SystemState.DETECTING: {
+                "action": detect,
+                "error": "Cup detection failed",
+                "next": [(SystemState.PICKING_UP, lambda: found[-1]),
+                         (SystemState.WASHING, None)]
+            },
+            SystemState.PICKING_UP: {
+                "action": pick,
+                "error": "Pickup failed",
+                "next": [(SystemState.MOVING_TO_WASH, None)]
+            },
+            SystemState.MOVING_TO_WASH: {
+                "action": place,
+                "error": "Place at wash failed",
+                "next": [(SystemState.DETECTING, more_cups),
+                         (SystemState.WASHING, None)]
+            },
+            SystemState.WASHING: {
+                "action": self.wash_cycle,
+                "error": "Wash cycle failed",
+                "next": [(SystemState.MOVING_TO_RINSE, None)]
+            },
+            SystemState.MOVING_TO_RINSE: {
+                "action": transfer,
+                "error": "Transfer to rinse failed",
+                "next": [(SystemState.RINSING, None)]
+            },
+            SystemState.RINSING: {
+                "action": self.rinse_cycle,
+                "error": "Rinse cycle failed",
+                "next": [(SystemState.MOVING_TO_STACK, None)]
+            },
+            SystemState.MOVING_TO_STACK: {
+                "action": unload,
+                "error": "Unload from rinse failed",
+                "next": [(SystemState.IDLE, None)]
+            }
+        }
+    
+    def batch_cycle(self) -> bool:
+        """
+        Wash up to `batch_size` cups together (BATCH mode): the wash and
+        rinse dwell is paid once per batch instead of once per cup.
+        """
+        slots = self.batch_capacity
+        if self.target_cups:
+            slots = min(slots, self.target_cups - self.washed_cups)
+        if slots < 1:
+            self.log_error("No batch slots available")
+            return False
+        
+        cycle_start = time.time()
         print("\n" + "="*60)
-        print(f"🚀 STARTING CUP #{self.washed_cups + 1} CYCLE")
+        print(f"🚀 STARTING BATCH - up to {slots} cups from cup #{self.washed_cups + 1}")
         print("="*60)
         
+        loaded: List[int] = []
+        self.last_failure = None
+        saved_before = self.path_time_saved
+        self._new_wash()
+        record = {"wash_duration": self.wash_duration, "rinse_duration": self.rinse_duration}
+        
         try:
-            # Check required positions
             required_positions = ["pickup", "wash_station", "rinse_station", "stack"]
             missing = [p for p in required_positions if p not in self.positions]
-            
             if missing:
                 raise Exception(f"Missing required positions: {', '.join(missing)}\n"
-                              "Please calibrate all positions in Developer Mode first!")
-            
-            # *** DETECT CUP BEFORE ARM MOVEMENT ***
-            cup_detected, detection_msg = self.detect_cup_before_pickup(confidence_threshold=0.5)
-            if not cup_detected:
-                raise Exception(f"Cup detection failed: {detection_msg}")
-            
-            # 1. Pick cup
-            if not self.pick_cup():
-                raise Exception("Pickup failed")
-            
-            # 2. Place at wash
-            if not self.place_at_wash():
-                raise Exception("Place at wash failed")
+                                "Please calibrate all positions in Developer Mode first!")
             
-            # 3. Wash
-            if not self.wash_cycle():
-                raise Exception("Wash cycle failed")
+            if not self.state_machine.run(self._batch_table(slots, loaded), SystemState.DETECTING):
+                raise Exception(self.state_machine.error)
             
-            # 4. Pick from wash
-            if not self.pick_from_wash():
-                raise Exception("Pick from wash failed")
-            
-            # 5. Place at rinse
-            if not self.place_at_rinse():
-                raise Exception("Place at rinse failed")
-            
-            # 6. Rinse
-            if not self.rinse_cycle():
-                raise Exception("Rinse cycle failed")
-            
-            # 7. Place at stack
-            if not self.place_at_stack():
-                raise Exception("Place at stack failed")
-            
-            # Success
             cycle_time = time.time() - cycle_start
-            self.cycle_times.append(cycle_time)
-            self.washed_cups += 1
-            self.state = SystemState.IDLE
+            self.cycle_times.extend([cycle_time / len(loaded)] * len(loaded))
+            self.washed_cups += len(loaded)
             
             print("\n" + "="*60)
-            print(f"✅ CUP #{self.washed_cups} COMPLETE - Time: {cycle_time:.1f}s")
+            print(f"✅ BATCH OF {len(loaded)} COMPLETE - Time: {cycle_time:.1f}s "
+                  f"({cycle_time / len(loaded):.1f}s per cup)")
+            path_saved = self.path_time_saved - saved_before
+            if self.plan_paths:
+                print(f"   🧭 Planned paths saved ~{path_saved:.1f}s")
             print("="*60)
             
-            # Log cycle
-            DataStorage.log_wash_cycle({
+            DataStorage.log_wash_cycle(dict(record, **self._wash_record(), **{
                 "cup_number": self.washed_cups,
+                "batch": len(loaded),
                 "cycle_time": cycle_time,
-                "wash_duration": self.wash_duration,
-                "rinse_duration": self.rinse_duration,
+                "phase_times": self.state_machine.phase_times(),
+                "path_time_saved": path_saved,
                 "success": True
-            })
-            
+            }))
             return True
             
         except Exception as e:
             cycle_time = time.time() - cycle_start
             self.log_error(str(e))
-            self.failed_cups += 1
+            self.failed_cups += max(1, len(loaded))
             self.state = SystemState.ERROR
+            self.pickup_watcher.resume()
             
             print("\n" + "="*60)
-            print(f"❌ CUP #{self.washed_cups + self.failed_cups} FAILED")
+            print(f"❌ BATCH FAILED ({len(loaded)} cups loaded)")
             print(f"   Error: {e}")
             print("="*60)
             
-            # Log failed cycle
-            DataStorage.log_wash_cycle({
+            DataStorage.log_wash_cycle(dict(record, **{
                 "cup_number": self.washed_cups + self.failed_cups,
+                "batch": len(loaded),
                 "cycle_time": cycle_time,
                 "success": False,
                 "error": str(e)
-            })
-            
+            }))
             return False
-    def execute_program(self, program_name: str) -> bool:
-        """Execute a saved program by name"""
-        from data.storage import DataStorage
     
-        print(f"\n🎯 Loading program: {program_name}")
+    def _new_wash(self):
+        """Forget the previous cup's inspection results"""
+        self.wash_recipe = None
+        self.wash_passes = 0
+        self.initial_dirt = None
+        self.final_dirt = None
     
-        # Load program
-        program_data = DataStorage.load_program(program_name)
-        if not program_data:
-            self.log_error(f"Program '{program_name}' not found")
-            return False
+    def _wash_record(self) -> Dict:
+        """Inspection results for the wash log (empty without adaptive washing)"""
+        if not self.wash_recipe:
+            return {}
+        record = {"dirt": self.initial_dirt, "wash_time": self.wash_recipe.wash_time,
+                  "brush_speed": self.wash_recipe.brush_speed, "wash_passes": self.wash_passes}
+        if self.final_dirt is not None:
+            record["final_dirt"] = self.final_dirt
+        return record
     
-        steps = program_data.get("steps", [])
-        if not steps:
-            self.log_error(f"Program '{program_name}' has no steps")
-            return False
+    def run_next_cycle(self) -> bool:
+        """One cycle of the current washing mode: a batch in BATCH mode, one cup otherwise"""
+        if self.washing_mode == WashingMode.BATCH:
+            return self.batch_cycle()
+        return self.single_cup_cycle()
     
-        print(f"✓ Loaded {len(steps)} steps")
-    
-        # Execute each step
-        for i, step in enumerate(steps):
-            print(f"\n--- Step {i+1}/{len(steps)} ---")
-        
-            cmd = step.get("cmd", "G01")
-        
-            try:
-                if cmd in ["G00", "G01"]:
-                    # Movement
-                    x = step.get("x", 0.0)
-                    y = step.get("y", 0.0)
-                    z = step.get("z", 0.0)
-                    feedrate = step.get("feedrate", 100)
-                
-                    print(f"Moving: X={x:.1f}, Y={y:.1f}, Z={z:.1f}, F={feedrate}")
-                
-                    if cmd == "G00":
-                        success, response = self.robot.move_point_to_point(x, y, z, feedrate)
-                    else:
-                        success, response = self.robot.move_linear(x, y, z, feedrate)
-                
-                    if not success:
-                        self.log_error(f"Step {i+1} failed: {response}")
-                        return False
-                
-                elif cmd == "GRIPPER":
-                    angle = step.get("angle", 90)
-                    print(f"Gripper: {angle}°")
-                    self.robot.set_gripper_angle(angle)
-                
-                elif cmd == "PUMP_ON":
-                    print("Pump ON")
-                    self.robot.pump_on()
-                
-                elif cmd == "PUMP_OFF":
-                    print("Pump OFF")
-                    self.robot.pump_off()
-                
-                elif cmd == "WAIT":
-                    pause = step.get("pause", 1.0)
-                    print(f"Waiting {pause}s")
-                    time.sleep(pause)
-            
-                # Apply pause ONLY if explicitly set in step
-                pause = step.get("pause", 0.0)
-                if pause > 0 and cmd != "WAIT":
-                    print(f"Pause: {pause}s")
-                    time.sleep(pause)
-                
-            except Exception as e:
-                self.log_error(f"Step {i+1} error: {e}")
-                return False
-    
-        print(f"\n✅ Program '{program_name}' complete!")
-        return True
-
-
-    def single_cup_cycle_with_program(self, program_name: str) -> bool:
-        """Execute washing cycle using a saved program"""
+    def _run_cycle(self, program_name: Optional[str] = None) -> bool:
+        """Run one cup through the cycle state machine and log the result"""
         cycle_start = time.time()
-    
+        
         print("\n" + "="*60)
         print(f"🚀 STARTING CUP #{self.washed_cups + 1} CYCLE")
-        print(f"   Using program: {program_name}")
+        if program_name:
+            print(f"   Using program: {program_name}")
         print("="*60)
-    
+        
+        self.last_failure = None
+        saved_before = self.path_time_saved
+        self._new_wash()
+        record = {"program": program_name} if program_name else {
+            "wash_duration": self.wash_duration,
+            "rinse_duration": self.rinse_duration
+        }
+        
         try:
-            # *** DETECT CUP BEFORE ARM MOVEMENT ***
-            cup_detected, detection_msg = self.detect_cup_before_pickup(confidence_threshold=0.8)  # Increased from 0.5 to reduce false positives
-            if not cup_detected:
-                raise Exception(f"Cup detection failed: {detection_msg}")
+            if not program_name:
+                # Check required positions
+                required_positions = ["pickup", "wash_station", "rinse_station", "stack"]
+                missing = [p for p in required_positions if p not in self.positions]
+                
+                if missing:
+                    raise Exception(f"Missing required positions: {', '.join(missing)}\n"
+                                  "Please calibrate all positions in Developer Mode first!")
+            
+            if not self.state_machine.run(self._cycle_table(program_name), SystemState.DETECTING):
+                raise Exception(self.state_machine.error)
             
-            # Execute the program
-            if not self.execute_program(program_name):
-                raise Exception(f"Program '{program_name}' failed")
-        
             # Success
+            self.pickup_watcher.resume()  # programs don't go through place_at_wash
             cycle_time = time.time() - cycle_start
             self.cycle_times.append(cycle_time)
             self.washed_cups += 1
-            self.state = SystemState.IDLE
-        
+            
             print("\n" + "="*60)
             print(f"✅ CUP #{self.washed_cups} COMPLETE - Time: {cycle_time:.1f}s")
+            print("   " + ", ".join(f"{phase} {seconds:.1f}s"
+                                   for phase, seconds in self.state_machine.phase_times().items()))
+            path_saved = self.path_time_saved - saved_before
+            if self.plan_paths:
+                print(f"   🧭 Planned paths saved ~{path_saved:.1f}s")
+            if self.wash_recipe:
+                dirt = f"{self.initial_dirt:.1f}% dirt" if self.initial_dirt is not None else "not inspected"
+                print(f"   🔍 {dirt}, {self.wash_passes} wash(es)")
             print("="*60)
-        
+            
             # Log cycle
-            DataStorage.log_wash_cycle({
+            DataStorage.log_wash_cycle(dict(record, **self._wash_record(), **{
                 "cup_number": self.washed_cups,
                 "cycle_time": cycle_time,
-                "program": program_name,
+                "phase_times": self.state_machine.phase_times(),
+                "path_time_saved": path_saved,
                 "success": True
-            })
-        
+            }))
+            
             return True
-        
+            
         except Exception as e:
             cycle_time = time.time() - cycle_start
             self.log_error(str(e))
             self.failed_cups += 1
             self.state = SystemState.ERROR
-        
+            self.pickup_watcher.resume()  # a cup left at pickup is latched again
+            
             print("\n" + "="*60)
             print(f"❌ CUP #{self.washed_cups + self.failed_cups} FAILED")
             print(f"   Error: {e}")
             print("="*60)
-        
+            
             # Log failed cycle
-            DataStorage.log_wash_cycle({
+            DataStorage.log_wash_cycle(dict(record, **{
                 "cup_number": self.washed_cups + self.failed_cups,
                 "cycle_time": cycle_time,
-                "program": program_name,
                 "success": False,
                 "error": str(e)
-            })
+            }))
+            
+            return False
+    
+    def run_pipelined(self, max_cups: Optional[int] = None, on_cup_done=None) -> bool:
+        """
+        Wash cups with the pipelined scheduler: one cup washing while the
+        previous one rinses and the arm moves between them.
+        
+        Args:
+            max_cups: Cups to finish (None = until stopped)
+            on_cup_done: Called with washed_cups after each finished cup
+        
+        Returns:
+            True if the run finished without an arm failure
+        """
+        from models.scheduler import PipelineScheduler
+        self.scheduler = PipelineScheduler(self)
+        return self.scheduler.run(max_cups, on_cup_done)
+    
+    def execute_program(self, program_name: str, compiled: Optional[bool] = None) -> bool:
+        """
+        Execute a saved program by name
+        
+        Args:
+            program_name: Program in data/programs
+            compiled: Run the compiled form (default: `compile_programs` setting)
+        """
+        print(f"\n🎯 Loading program: {program_name}")
         
+        try:
+            program = self.program_cache.get(program_name, compiled)
+        except ValueError as e:
+            self.last_failure = FailureKind.PROGRAM
+            self.log_error(str(e))
             return False
+        
+        print(f"✓ Loaded {len(program.steps)} steps")
+        return self._run_compiled(program)
+    
+    def execute_steps(self, steps: List[Dict], program_name: str = "program",
+                      compiled: Optional[bool] = None) -> bool:
+        """
+        Execute unsaved program steps (compiled for this run only)
+        
+        Args:
+            steps: Steps in the program JSON format
+            program_name: Name used in messages
+            compiled: Run the compiled form (default: `compile_programs` setting)
+        """
+        try:
+            program = self.program_cache.build(
+                program_name, steps, self.compile_programs if compiled is None else compiled)
+        except ValueError as e:
+            self.last_failure = FailureKind.PROGRAM
+            self.log_error(str(e))
+            return False
+        return self._run_compiled(program)
+    
+    def _run_compiled(self, program: CompiledProgram) -> bool:
+        """Send a compiled program block by block - runs without pauses go out as one batch"""
+        total = len(program.steps)
+        for block in program.blocks:
+            if block.batched:
+                success = self._execute_batch(block.steps, block.start, total, block.frames)
+            else:
+                success = self._execute_step(block.steps[0], block.start, total, block.frames[0])
+            if not success:
+                return False
+        
+        print(f"\n✅ Program '{program.name}' complete!")
+        return True
+    
+    def test_program(self, steps: List[Dict]) -> bool:
+        """Run unsaved steps once (developer test run), timed as RUNNING_PROGRAM"""
+        table = {
+            SystemState.RUNNING_PROGRAM: {
+                "action": lambda: self.execute_steps(steps, "test"),
+                "error": "Test program failed",
+                "next": [(SystemState.IDLE, None)]
+            }
+        }
+        return self.state_machine.run(table, SystemState.RUNNING_PROGRAM)
+    
+    def _batch_run(self, steps, start: int) -> list:
+        """
+        Steps from `start` that can be sent as one batch: tool steps
+        (gripper/pump) first, then G00/G01 moves. Ends at the first step
+        with a pause, and before any tool step that follows a move, since
+        that must wait for the arm to arrive.
+        """
+        run = []
+        if self.stream_window <= 1:
+            return run
+        
+        seen_move = False
+        for step in steps[start:]:
+            cmd = step.get("cmd", "G01")
+            if cmd in ["G00", "G01"]:
+                seen_move = True
+            elif cmd not in ["GRIPPER", "PUMP_ON", "PUMP_OFF"] or seen_move:
+                break
+            run.append(step)
+            if step.get("pause", 0.0) > 0:
+                break
+        return run
+    
+    def _step_frame(self, step: Dict) -> bytes:
+        """Wire frame for a batchable step"""
+        cmd = step.get("cmd", "G01")
+        if cmd == "GRIPPER":
+            return self.robot.encoder.gripper(step.get("angle", 90))
+        if cmd == "PUMP_ON":
+            return self.robot.encoder.fixed("M03")
+        if cmd == "PUMP_OFF":
+            return self.robot.encoder.fixed("M05")
+        return self.robot.encode_move(
+            step.get("x", 0.0), step.get("y", 0.0), step.get("z", 0.0),
+            step.get("feedrate", 100), speed_override=1.0, move_type=cmd
+        )
+    
+    def _execute_batch(self, run, start: int, total: int, frames=None) -> bool:
+        """Send a run of steps with coalesced writes, up to `stream_window` in flight"""
+        print(f"\n--- Steps {start+1}-{start+len(run)}/{total} (batched, window {self.stream_window}) ---")
+        
+        try:
+            # Tool actions must not fire while the arm is still travelling
+            if run[0].get("cmd") not in ["G00", "G01"] and not self.robot.wait_motion_done():
+                return self._step_failed(f"Step {start+1}: previous move did not complete")
+            
+            frames = frames or [self._step_frame(step) for step in run]
+            results = self.robot.send_batch(frames, window=self.stream_window)
+            
+            for offset, (step, (success, response)) in enumerate(zip(run, results)):
+                cmd = step.get("cmd", "G01")
+                if cmd not in ["G00", "G01"]:
+                    print(f"{cmd}: {response}")
+                    if success and cmd in ["PUMP_ON", "PUMP_OFF"]:
+                        self.robot.pump_active = cmd == "PUMP_ON"
+                    continue
+                if not success:
+                    return self._step_failed(f"Step {start+offset+1} failed: {response}")
+                self.robot.track_move(step.get("x", 0.0), step.get("y", 0.0),
+                                      step.get("z", 0.0), step.get("feedrate", 100))
+            
+            # Apply pause ONLY if explicitly set on the last step
+            pause = run[-1].get("pause", 0.0)
+            if pause > 0:
+                print(f"Pause: {pause}s")
+                time.sleep(pause)
+            
+            return True
+            
+        except Exception as e:
+            return self._step_failed(f"Step {start+1} error: {e}")
+    
+    def _execute_step(self, step: Dict, i: int, total: int, frame: Optional[bytes] = None) -> bool:
+        """Execute a single program step (`frame`: its pre-encoded move, if compiled)"""
+        print(f"\n--- Step {i+1}/{total} ---")
+        
+        cmd = step.get("cmd", "G01")
+        
+        try:
+            if cmd in ["G00", "G01"]:
+                # Movement
+                x = step.get("x", 0.0)
+                y = step.get("y", 0.0)
+                z = step.get("z", 0.0)
+                feedrate = step.get("feedrate", 100)
+            
+                print(f"Moving: X={x:.1f}, Y={y:.1f}, Z={z:.1f}, F={feedrate}")
+            
+                if frame:
+                    success, response = self.robot.send_move(frame, x, y, z, feedrate)
+                elif cmd == "G00":
+                    success, response = self.robot.move_point_to_point(x, y, z, feedrate)
+                else:
+                    success, response = self.robot.move_linear(x, y, z, feedrate)
+            
+                if not success:
+                    return self._step_failed(f"Step {i+1} failed: {response}")
+            
+            elif not self.robot.wait_motion_done():
+                # Tool actions must not fire while the arm is still travelling
+                return self._step_failed(f"Step {i+1}: previous move did not complete")
+            
+            elif cmd == "GRIPPER":
+                angle = step.get("angle", 90)
+                print(f"Gripper: {angle}°")
+                self.robot.set_gripper_angle(angle)
+            
+            elif cmd == "PUMP_ON":
+                print("Pump ON")
+                self.robot.pump_on()
+            
+            elif cmd == "PUMP_OFF":
+                print("Pump OFF")
+                self.robot.pump_off()
+            
+            elif cmd == "WAIT":
+                pause = step.get("pause", 1.0)
+                print(f"Waiting {pause}s")
+                time.sleep(pause)
+        
+            # Apply pause ONLY if explicitly set in step
+            pause = step.get("pause", 0.0)
+            if pause > 0 and cmd != "WAIT":
+                print(f"Pause: {pause}s")
+                time.sleep(pause)
+            
+            return True
+            
+        except Exception as e:
+            return self._step_failed(f"Step {i+1} error: {e}")
+    
+    def _step_failed(self, message: str) -> bool:
+        """Log a failed program step as a robot failure (ends the run); always False"""
+        self.last_failure = FailureKind.ROBOT
+        self.log_error(message)
+        return False
 
     # ═══════════════════════════════════════════════════════════════
     # CONTROL
@@ -648,22 +1453,30 @@ class CupWashingController:
     def start_washing(self, mode: WashingMode, target_cups: int = 10):
         """Start washing operation"""
         self.washing_mode = mode
-        self.target_cups = target_cups if mode == WashingMode.FIXED_COUNT else None
+        self.target_cups = target_cups if mode in (WashingMode.FIXED_COUNT, WashingMode.BATCH) else None
         self.is_running = True
         self.washed_cups = 0
         self.failed_cups = 0
         self.start_time = datetime.now()
         self.cycle_times = []
+        self.path_time_saved = 0.0
+        if self.background_detection:
+            self.pickup_watcher.start()
         
         print("\n" + "="*60)
         print(f"🚀 STARTING WASHING OPERATION")
         print(f"   Mode: {mode.value}")
-        print(f"   Target: {target_cups if mode == WashingMode.FIXED_COUNT else '∞'}")
+        if mode == WashingMode.BATCH:
+            print(f"   Target: {target_cups} cups, batches of {self.batch_size}")
+        else:
+            print(f"   Target: {target_cups if mode == WashingMode.FIXED_COUNT else '∞'}")
         print("="*60)
     
     def stop_washing(self):
         """Stop washing operation"""
         self.is_running = False
+        self.retry_policy.wake()
+        self.pickup_watcher.stop()
         self.robot.emergency_stop()
         self.wash_station.stop_washing()
         self.wash_station.stop_rinsing()
@@ -702,6 +1515,11 @@ class CupWashingController:
             "wash_duration": self.wash_duration,
             "rinse_duration": self.rinse_duration,
             "sensors": self.sensors.get_status_report(),
+            "phase_stats": self.state_machine.stats(),
+            "last_failure": self.last_failure.value if self.last_failure else None,
+            "retry_stats": self.retry_policy.stats(),
+            "path_time_saved": self.path_time_saved,
+            "wash_recipe": self.wash_recipe._asdict() if self.wash_recipe else None,
             "recent_errors": self.error_log[-5:] if self.error_log else [],
             "positions_calibrated": len(self.positions) > 0
         }
@@ -0,0 +1,80 @@
+"""
+dirt_inspector.py
+Soiling estimate and the wash it calls for
+
+The cup is cropped from a camera frame by its detection box and scored
+with VisionSystem.detect_dirt (share of dirt-coloured pixels). The score
+picks a wash time and brush speed from a piecewise-linear curve of
+(dirt %, wash seconds, brush PWM) points, clamped to MIN/MAX_WASH_TIME
+and MIN/MAX_BRUSH_SPEED. The curve can be set with the "wash_curve"
+robot setting, e.g. [[0, 3, 120], [10, 8, 180], [30, 20, 255]].
+"""
+from typing import List, NamedTuple, Optional, Sequence
+from config.constants import (DIRT_WASH_CURVE, DIRT_CLEAN_THRESHOLD, MIN_WASH_TIME, MAX_WASH_TIME,
+                              MIN_BRUSH_SPEED, MAX_BRUSH_SPEED)
+
+
+class WashRecipe(NamedTuple):
+    wash_time: float   # seconds
+    brush_speed: int   # 0-255 PWM
+    dirt: float        # dirt % the recipe was chosen for
+
+
+class DirtInspector:
+    """Scores cup soiling and maps it to a wash recipe"""
+
+    def __init__(self, vision, curve: Optional[Sequence[Sequence[float]]] = None,
+                 clean_threshold: float = DIRT_CLEAN_THRESHOLD):
+        """
+        Args:
+            vision: VisionSystem with the inspection camera
+            curve: (dirt %, wash seconds, brush PWM) points, any order
+            clean_threshold: Dirt % at or below which a cup counts as clean
+        """
+        self.vision = vision
+        self.curve: List[tuple] = sorted(tuple(point) for point in (curve or DIRT_WASH_CURVE))
+        if not self.curve:
+            raise ValueError("Wash curve needs at least one point")
+        self.clean_threshold = clean_threshold
+
+    def recipe_for(self, dirt: float) -> WashRecipe:
+        """Wash time and brush speed for a dirt percentage"""
+        curve = self.curve
+        if dirt <= curve[0][0]:
+            _, wash_time, brush_speed = curve[0]
+        elif dirt >= curve[-1][0]:
+            _, wash_time, brush_speed = curve[-1]
+        else:
+            (d0, t0, b0), (d1, t1, b1) = next((a, b) for a, b in zip(curve, curve[1:]) if dirt <= b[0])
+            share = (dirt - d0) / (d1 - d0) if d1 > d0 else 1.0
+            wash_time = t0 + share * (t1 - t0)
+            brush_speed = b0 + share * (b1 - b0)
+
+        return WashRecipe(round(max(MIN_WASH_TIME, min(MAX_WASH_TIME, wash_time)), 1),
+                          int(round(max(MIN_BRUSH_SPEED, min(MAX_BRUSH_SPEED, brush_speed)))),
+                          dirt)
+
+    def is_clean(self, dirt: float) -> bool:
+        return dirt <= self.clean_threshold
+
+    def measure(self, conf_threshold: float = 0.5) -> Optional[float]:
+        """
+        Dirt % of the cup in view of the camera.
+
+        Returns:
+            Dirt % inside the cup's detection box (the whole frame if the
+            cup is not detected), or None without a frame
+        """
+        frame = self.vision.capture_frame()
+        if frame is None:
+            return None
+
+        roi = None
+        cup = self.vision.get_cup_position(frame, conf_threshold)
+        if cup:
+            height, width = frame.shape[:2]
+            x1, y1 = max(0, cup["x1"]), max(0, cup["y1"])
+            x2, y2 = min(width, cup["x2"]), min(height, cup["y2"])
+            if x2 > x1 and y2 > y1:
+                roi = (x1, y1, x2, y2)
+        return self.vision.detect_dirt(frame, roi)["dirt_percentage"]
@@ -0,0 +1,290 @@
+"""
+duration_estimator.py
+Move and program duration estimates from kinematics and logged history
+
+Uses the trapezoidal MotionModel profile. Its feed scale (mm/s per F
+unit), acceleration and per-move overhead are fitted to measured move
+durations, either from ZKBotController.move_log or from serial session
+recordings (.zkrec), so estimates track the real arm instead of the
+nominal constants.
+
+Usage:
+    python -m models.duration_estimator fit data/logs/serial_*.zkrec
+    python -m models.duration_estimator estimate [program ...]
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config.constants import MOTION_FIT_FILE, POSITION_TOLERANCE, TOOL_COMMAND_TIME
+from models.motion_model import MotionModel
+
+MIN_FIT_SAMPLES = 5
+MAX_SAMPLES = 1000
+GRID_SIZE = 41
+
+POSITION_PATTERN = re.compile(rb"X[:\s]*([-\d.]+)\s*Y[:\s]*([-\d.]+)\s*Z[:\s]*([-\d.]+)", re.IGNORECASE)
+WORD_PATTERN = re.compile(rb"([XYZF])(-?\d+(?:\.\d+)?)", re.IGNORECASE)
+
+# (distance mm, feedrate F, measured seconds)
+Sample = Tuple[float, float, float]
+
+
+def samples_from_recording(path: str, tolerance: float = POSITION_TOLERANCE) -> List[Sample]:
+    """
+    Measured move durations from a serial recording.
+
+    A move counts only if it started with the arm idle and nothing was
+    queued behind it. Its duration runs from the frame being sent to the
+    first P01 reply at the target, as ZKBotController.wait_motion_done
+    measures it.
+    """
+    from models.serial_recorder import read_recording, command_name, RECEIVED, FRAME_HEADER, FRAME_TRAILER
+
+    _, records = read_recording(path)
+    samples = []
+    commanded: Optional[Dict[str, float]] = None
+    timing = None  # (sent at, origin, target, feedrate, single move)
+
+    for kind, timestamp, frame in records:
+        if kind == RECEIVED:
+            match = POSITION_PATTERN.search(frame)
+            if not match or commanded is None:
+                continue
+            position = dict(zip("xyz", (float(v) for v in match.groups())))
+            if MotionModel.distance(position, commanded) > tolerance:
+                continue
+            if timing and timing[4]:
+                sent_at, origin, target, feedrate, _ = timing
+                samples.append((MotionModel.distance(origin, target), feedrate, timestamp - sent_at))
+            timing = None
+            continue
+
+        name = command_name(frame)
+        if name == "G28":
+            commanded = {"x": 0.0, "y": 0.0, "z": 0.0}
+            timing = None
+        elif name in ("G00", "G01"):
+            body = frame.replace(FRAME_HEADER, b"").replace(FRAME_TRAILER, b"").strip()
+            words = {k.decode().lower(): float(v) for k, v in WORD_PATTERN.findall(body.split(b" ", 1)[-1])}
+            origin = commanded
+            if origin is None:
+                commanded = {a: words.get(a, 0.0) for a in "xyz"}
+                continue  # start unknown
+            commanded = {a: words.get(a, origin[a]) for a in "xyz"}
+            if timing is None:
+                timing = (timestamp, origin, commanded, words.get("f", 100.0), True)
+            else:
+                timing = timing[:4] + (False,)  # queued behind another move
+
+    return samples
+
+
+class DurationEstimator:
+    """Fit the motion model to history and estimate program durations"""
+
+    def __init__(self, motion_model: Optional[MotionModel] = None):
+        """
+        Args:
+            motion_model: Model to fit and use (shared with the robot, so
+                wait_motion_done predictions improve as well)
+        """
+        self.motion_model = motion_model or MotionModel()
+        self.samples = deque(maxlen=MAX_SAMPLES)
+        self.fit_error: Optional[float] = None  # RMS seconds of the last fit
+
+    # ═══════════════════════════════════════════════════════════════
+    # HISTORY AND FITTING
+    # ═══════════════════════════════════════════════════════════════
+
+    def add_samples(self, samples: Iterable[Sample]):
+        """Add (distance, feedrate, seconds) measurements"""
+        for distance, feedrate, duration in samples:
+            if distance > 0 and feedrate > 0 and duration > 0:
+                self.samples.append((float(distance), float(feedrate), float(duration)))
+
+    def add_move_log(self, move_log) -> int:
+        """Add entries from ZKBotController.move_log; returns how many"""
+        entries = list(move_log)
+        self.add_samples((MotionModel.distance(e["start"], e["target"]), e["feedrate"], e["duration"])
+                         for e in entries)
+        return len(entries)
+
+    def fit(self) -> bool:
+        """
+        Least-squares fit of feed scale, acceleration and overhead over a
+        log-spaced grid (overhead is solved exactly for each grid point).
+        Feed scale stays fixed unless at least two feedrates were measured.
+
+        Returns:
+            True if the model was updated
+        """
+        if len(self.samples) < MIN_FIT_SAMPLES:
+            return False
+
+        data = np.array(self.samples)
+        distance, feedrate, measured = data[:, 0], data[:, 1], data[:, 2]
+
+        model = self.motion_model
+        fit_scale = len(np.unique(feedrate)) >= 2
+
+        # Coarse grid over several decades, then a fine grid around the best point
+        scale_range = (np.log10(model.feed_scale) - 2, np.log10(model.feed_scale) + 2)
+        accel_range = (0.0, 5.0)
+        for _ in range(2):
+            scales = np.logspace(*scale_range, GRID_SIZE) if fit_scale else np.array([model.feed_scale])
+            accels = np.logspace(*accel_range, GRID_SIZE)
+            overhead, error = self._grid_error(distance, feedrate, measured, scales, accels)
+            i, j = np.unravel_index(np.argmin(error), error.shape)
+
+            scale_step = (scale_range[1] - scale_range[0]) / (GRID_SIZE - 1)
+            accel_step = (accel_range[1] - accel_range[0]) / (GRID_SIZE - 1)
+            scale_range = (np.log10(scales[i]) - scale_step, np.log10(scales[i]) + scale_step)
+            accel_range = (np.log10(accels[j]) - accel_step, np.log10(accels[j]) + accel_step)
+
+        model.feed_scale = float(scales[i])
+        model.acceleration = float(accels[j])
+        model.overhead = float(overhead[i, j])
+        model.calibrated = True
+        self.fit_error = float(np.sqrt(error[i, j]))
+        return True
+
+    @staticmethod
+    def _grid_error(distance, feedrate, measured, scales, accels):
+        """Best overhead and mean squared error for every (scale, accel) pair"""
+        velocity = scales[:, None, None] * np.maximum(feedrate, 1)[None, None, :]
+        accel = accels[None, :, None]
+        trapezoid = distance / velocity + velocity / accel
+        triangle = 2.0 * np.sqrt(distance / accel)
+        predicted = np.where(distance >= velocity * velocity / accel, trapezoid, triangle)
+
+        overhead = np.clip((measured - predicted).mean(axis=2), 0.0, None)
+        error = ((predicted + overhead[:, :, None] - measured) ** 2).mean(axis=2)
+        return overhead, error
+
+    def save(self, path: str = MOTION_FIT_FILE) -> bool:
+        """Persist fitted parameters and samples"""
+        from data.storage import DataStorage
+        return DataStorage.save_json(path, {
+            "feed_scale": self.motion_model.feed_scale,
+            "acceleration": self.motion_model.acceleration,
+            "overhead": self.motion_model.overhead,
+            "fit_error": self.fit_error,
+            "samples": list(self.samples)
+        })
+
+    def load(self, path: str = MOTION_FIT_FILE) -> bool:
+        """Restore a previous fit; False if there is none"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        self.motion_model.feed_scale = data.get("feed_scale", self.motion_model.feed_scale)
+        self.motion_model.acceleration = data.get("acceleration", self.motion_model.acceleration)
+        self.motion_model.overhead = data.get("overhead", self.motion_model.overhead)
+        self.fit_error = data.get("fit_error")
+        self.motion_model.calibrated = self.fit_error is not None
+        self.samples.clear()
+        self.add_samples(data.get("samples", []))
+        return True
+
+    # ═══════════════════════════════════════════════════════════════
+    # ESTIMATES
+    # ═══════════════════════════════════════════════════════════════
+
+    def estimate_move(self, start: Dict[str, float], target: Dict[str, float],
+                      feedrate: float) -> float:
+        """Predicted seconds for one move"""
+        return self.motion_model.estimate_move_time(start, target, feedrate)
+
+    def estimate_program(self, steps: List[Dict],
+                         start: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        Predicted duration of a program, without moving the arm.
+
+        Args:
+            steps: Program steps
+            start: Arm position before the first step (default: the
+                program's last move target, i.e. a repeated cycle)
+
+        Returns:
+            {"total", "motion", "tools", "pauses": seconds, "steps": [seconds per step]}
+        """
+        moves = [s for s in steps if s.get("cmd", "G01") in ("G00", "G01")]
+        if start is None and moves:
+            start = {a: moves[-1].get(a, 0.0) for a in "xyz"}
+
+        position = dict(start) if start else None
+        motion = tools = pauses = 0.0
+        per_step = []
+
+        for step in steps:
+            cmd = step.get("cmd", "G01")
+            seconds = 0.0
+            if cmd in ("G00", "G01"):
+                target = {a: step.get(a, 0.0) for a in "xyz"}
+                seconds = self.estimate_move(position or target, target, step.get("feedrate", 100))
+                motion += seconds
+                position = target
+            elif cmd in ("GRIPPER", "PUMP_ON", "PUMP_OFF"):
+                seconds = TOOL_COMMAND_TIME
+                tools += seconds
+
+            pause = step.get("pause", 1.0 if cmd == "WAIT" else 0.0)
+            pauses += pause
+            per_step.append(seconds + pause)
+
+        return {"total": motion + tools + pauses, "motion": motion, "tools": tools,
+                "pauses": pauses, "steps": per_step}
+
+
+def main():
+    """Fit from recordings or print program estimates"""
+    import argparse
+    from data.storage import DataStorage
+
+    parser = argparse.ArgumentParser(description="ZKBot move duration model")
+    sub = parser.add_subparsers(dest="action", required=True)
+    fit = sub.add_parser("fit", help="Fit the model to serial recordings")
+    fit.add_argument("recordings", nargs="+")
+    estimate = sub.add_parser("estimate", help="Estimated cycle time per program")
+    estimate.add_argument("programs", nargs="*")
+    args = parser.parse_args()
+
+    estimator = DurationEstimator()
+    estimator.load()
+
+    if args.action == "fit":
+        for path in args.recordings:
+            samples = samples_from_recording(path)
+            estimator.add_samples(samples)
+            print(f"📼 {path}: {len(samples)} isolated moves")
+        if not estimator.fit():
+            print(f"❌ Need at least {MIN_FIT_SAMPLES} measured moves, have {len(estimator.samples)}")
+            return
+        model = estimator.motion_model
+        print(f"✓ Fitted: {model.feed_scale * 60:.3f} mm/min per F, accel {model.acceleration:.0f} mm/s², "
+              f"overhead {model.overhead * 1000:.0f} ms (rms error {estimator.fit_error * 1000:.0f} ms)")
+        estimator.save()
+        return
+
+    for name in args.programs or DataStorage.list_programs():
+        program = DataStorage.load_program(name)
+        if not program or not program.get("steps"):
+            continue
+        result = estimator.estimate_program(program["steps"])
+        print(f"⏱ {name}: {result['total']:.1f}s (motion {result['motion']:.1f}s, "
+              f"tools {result['tools']:.1f}s, pauses {result['pauses']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
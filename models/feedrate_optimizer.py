@@ -0,0 +1,308 @@
+"""
+feedrate_optimizer.py
+Per-segment feedrate selection for arm moves
+
+Each move gets the highest feedrate its situation allows:
+    - FEED_LIMIT_EMPTY when nothing is held
+    - FEED_LIMIT_LOADED while the pump holds a cup
+    - FEED_LIMIT_APPROACH for mostly vertical travel next to a station
+    - half speed within WORKSPACE_MARGIN of a WORKSPACE_LIMITS edge
+
+Confirmed move durations (ZKBotController.move_log) teach it where the
+arm stops getting faster: if a higher F does not move the arm any
+quicker, the lower F is used instead. Learned data only ever lowers
+a feedrate, never raises it above the rule limits.
+
+Usage:
+    python -m models.feedrate_optimizer [program]
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+import statistics
+from typing import Dict, List, Optional, Tuple
+from config.constants import (
+    FEED_LIMIT_EMPTY, FEED_LIMIT_LOADED, FEED_LIMIT_APPROACH,
+    STATION_APPROACH_RADIUS, WORKSPACE_MARGIN, WORKSPACE_LIMITS,
+    FEEDRATE_PROFILE_FILE, MIN_ARM_SPEED, MAX_ARM_SPEED
+)
+from models.motion_model import MotionModel
+
+MIN_SAMPLES = 3          # observations per feedrate before it counts
+MIN_LEARN_DISTANCE = 5.0  # mm; shorter moves are dominated by overhead
+SATURATION = 0.95        # fraction of top speed that counts as "as fast"
+MAX_SAMPLES = 50         # kept per feedrate bucket
+
+
+class FeedrateOptimizer:
+    """Choose feedrates from cup state, station proximity and workspace limits"""
+
+    def __init__(self, stations: Optional[Dict[str, Dict]] = None,
+                 motion_model: Optional[MotionModel] = None,
+                 limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            stations: Calibrated positions {"name": {"x", "y", "z"}}
+            motion_model: Model used for projections (default MotionModel())
+            limits: Overrides for "empty" / "loaded" / "approach" feed limits
+        """
+        self.stations = stations or {}
+        self.motion_model = motion_model or MotionModel()
+        self.limits = {
+            "empty": FEED_LIMIT_EMPTY,
+            "loaded": FEED_LIMIT_LOADED,
+            "approach": FEED_LIMIT_APPROACH
+        }
+        self.limits.update(limits or {})
+
+        # segment class -> feedrate -> effective speeds (mm/s)
+        self.observations: Dict[str, Dict[int, List[float]]] = {}
+        self.revision = 0  # bumped whenever a learned cap changes (programs re-optimize)
+
+    # ═══════════════════════════════════════════════════════════════
+    # FEEDRATE SELECTION
+    # ═══════════════════════════════════════════════════════════════
+
+    def classify(self, start: Dict[str, float], target: Dict[str, float],
+                 cup_held: bool) -> str:
+        """Segment class: "approach", "loaded" or "empty" """
+        if self._is_station_approach(start, target):
+            return "approach"
+        return "loaded" if cup_held else "empty"
+
+    def feedrate_for(self, start: Optional[Dict[str, float]], target: Dict[str, float],
+                     cup_held: bool = False) -> Tuple[int, str]:
+        """
+        Highest safe feedrate for one move.
+
+        Returns:
+            (feedrate, reason)
+
+        Raises:
+            ValueError: target is outside WORKSPACE_LIMITS
+        """
+        self._check_workspace(target)
+        start = start or target
+
+        limit_class = self.classify(start, target, cup_held)
+        feedrate = self.limits[limit_class]
+        # A loaded approach is bounded by both limits
+        if limit_class == "approach" and cup_held:
+            feedrate = min(feedrate, self.limits["loaded"])
+        reason = limit_class
+
+        if self._near_workspace_edge(target):
+            feedrate //= 2
+            reason += ", near workspace edge"
+
+        learned = self.learned_cap(limit_class)
+        if learned is not None and learned < feedrate:
+            feedrate = learned
+            reason += ", learned"
+
+        return max(MIN_ARM_SPEED, min(MAX_ARM_SPEED, int(feedrate))), reason
+
+    def optimize_steps(self, steps: List[Dict],
+                       start: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        Program steps with each G00/G01 feedrate replaced by feedrate_for().
+        Cup state follows the program's PUMP_ON / PUMP_OFF steps.
+        """
+        optimized = []
+        position = dict(start) if start else None
+        cup_held = False
+
+        for source in steps:
+            step = dict(source)
+            cmd = step.get("cmd", "G01")
+            if cmd == "PUMP_ON":
+                cup_held = True
+            elif cmd == "PUMP_OFF":
+                cup_held = False
+            elif cmd in ("G00", "G01"):
+                target = {"x": step.get("x", 0.0), "y": step.get("y", 0.0), "z": step.get("z", 0.0)}
+                step["feedrate"], _ = self.feedrate_for(position, target, cup_held)
+                position = target
+            optimized.append(step)
+
+        return optimized
+
+    def _is_station_approach(self, start: Dict[str, float], target: Dict[str, float]) -> bool:
+        """Mostly vertical move ending or starting next to a station"""
+        dz = abs(target["z"] - start["z"])
+        dxy = math.hypot(target["x"] - start["x"], target["y"] - start["y"])
+        if dz == 0 or dz < dxy:
+            return False
+
+        for station in self.stations.values():
+            for point in (start, target):
+                if math.hypot(point["x"] - station["x"], point["y"] - station["y"]) <= STATION_APPROACH_RADIUS:
+                    return True
+        return False
+
+    @staticmethod
+    def _check_workspace(target: Dict[str, float]):
+        for axis, limit in WORKSPACE_LIMITS.items():
+            value = target[axis.lower()]
+            if not limit["min"] <= value <= limit["max"]:
+                raise ValueError(f"{axis}={value} outside workspace [{limit['min']}, {limit['max']}]")
+
+    @staticmethod
+    def _near_workspace_edge(target: Dict[str, float]) -> bool:
+        for axis, limit in WORKSPACE_LIMITS.items():
+            value = target[axis.lower()]
+            if value - limit["min"] < WORKSPACE_MARGIN or limit["max"] - value < WORKSPACE_MARGIN:
+                return True
+        return False
+
+    # ═══════════════════════════════════════════════════════════════
+    # LEARNING
+    # ═══════════════════════════════════════════════════════════════
+
+    def observe(self, start: Dict[str, float], target: Dict[str, float], feedrate: int,
+                duration: float, cup_held: bool = False):
+        """Record one confirmed move duration"""
+        distance = MotionModel.distance(start, target)
+        move_time = duration - self.motion_model.overhead
+        if distance < MIN_LEARN_DISTANCE or move_time <= 0:
+            return
+
+        limit_class = self.classify(start, target, cup_held)
+        cap = self.learned_cap(limit_class)
+        bucket = self.observations.setdefault(limit_class, {}).setdefault(int(feedrate), [])
+        bucket.append(distance / move_time)
+        del bucket[:-MAX_SAMPLES]
+        if self.learned_cap(limit_class) != cap:
+            self.revision += 1
+
+    def learn(self, move_log) -> int:
+        """
+        Feed entries from ZKBotController.move_log.
+
+        Returns:
+            Number of entries consumed
+        """
+        count = 0
+        for entry in list(move_log):
+            self.observe(entry["start"], entry["target"], entry["feedrate"],
+                         entry["duration"], entry.get("loaded", False))
+            count += 1
+        return count
+
+    def _speeds(self, limit_class: str) -> Dict[int, float]:
+        """Median effective speed per feedrate with enough samples"""
+        buckets = self.observations.get(limit_class, {})
+        return {feed: statistics.median(values)
+                for feed, values in buckets.items() if len(values) >= MIN_SAMPLES}
+
+    def learned_cap(self, limit_class: str) -> Optional[int]:
+        """Lowest feedrate that already reaches the top observed speed, if a higher one was tried"""
+        speeds = self._speeds(limit_class)
+        if len(speeds) < 2:
+            return None
+
+        top = max(speeds.values())
+        cap = min(feed for feed, speed in speeds.items() if speed >= SATURATION * top)
+        return cap if cap < max(speeds) else None
+
+    def effective_feedrate(self, feedrate: float, limit_class: str) -> float:
+        """Feedrate the arm actually achieves, given what has been observed"""
+        if self.learned_cap(limit_class) is None:
+            return feedrate
+        top = max(self._speeds(limit_class).values()) / self.motion_model.feed_scale
+        return min(feedrate, top)
+
+    def save(self, path: str = FEEDRATE_PROFILE_FILE) -> bool:
+        """Persist observations"""
+        from data.storage import DataStorage
+        data = {cls: {str(feed): values for feed, values in buckets.items()}
+                for cls, buckets in self.observations.items()}
+        return DataStorage.save_json(path, {"observations": data})
+
+    def load(self, path: str = FEEDRATE_PROFILE_FILE):
+        """Load observations saved by save()"""
+        import json
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f).get("observations", {})
+        except (OSError, ValueError):
+            return
+        self.observations = {cls: {int(feed): list(values) for feed, values in buckets.items()}
+                             for cls, buckets in data.items()}
+        self.revision += 1
+
+    # ═══════════════════════════════════════════════════════════════
+    # DRY RUN
+    # ═══════════════════════════════════════════════════════════════
+
+    def project_steps(self, steps: List[Dict],
+                      start: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        Projected duration of a program without moving the arm.
+
+        Returns:
+            {"motion": s, "pauses": s, "total": s, "segments": [(step index, feedrate, seconds), ...]}
+        """
+        position = dict(start) if start else None
+        cup_held = False
+        motion = pauses = 0.0
+        segments = []
+
+        for index, step in enumerate(steps):
+            cmd = step.get("cmd", "G01")
+            pause = step.get("pause", 1.0 if cmd == "WAIT" else 0.0)
+            pauses += pause
+            if cmd == "PUMP_ON":
+                cup_held = True
+            elif cmd == "PUMP_OFF":
+                cup_held = False
+            elif cmd in ("G00", "G01"):
+                target = {"x": step.get("x", 0.0), "y": step.get("y", 0.0), "z": step.get("z", 0.0)}
+                begin = position or target
+                feedrate = step.get("feedrate", 100)
+                achieved = self.effective_feedrate(feedrate, self.classify(begin, target, cup_held))
+                seconds = self.motion_model.estimate_move_time(begin, target, achieved)
+                motion += seconds
+                segments.append((index, feedrate, seconds))
+                position = target
+
+        return {"motion": motion, "pauses": pauses, "total": motion + pauses, "segments": segments}
+
+
+def main():
+    """Dry run: projected program time with current vs optimized feedrates"""
+    import argparse
+    from data.storage import DataStorage
+
+    parser = argparse.ArgumentParser(description="Projected cycle time with optimized feedrates")
+    parser.add_argument("programs", nargs="*", help="Program names (default: all)")
+    args = parser.parse_args()
+
+    positions = DataStorage.load_calibration().get("positions", {})
+    optimizer = FeedrateOptimizer(positions)
+    optimizer.load()
+
+    for name in args.programs or DataStorage.list_programs():
+        program = DataStorage.load_program(name)
+        steps = program.get("steps", []) if program else []
+        if not steps:
+            print(f"⚠ Program '{name}' has no steps")
+            continue
+        try:
+            optimized = optimizer.optimize_steps(steps)
+        except ValueError as e:
+            print(f"❌ {name}: {e}")
+            continue
+
+        before = optimizer.project_steps(steps)
+        after = optimizer.project_steps(optimized)
+        print(f"⏱ {name}: projected {before['total']:.1f}s → {after['total']:.1f}s "
+              f"(motion {before['motion']:.1f}s → {after['motion']:.1f}s, pauses {before['pauses']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+frame_encoder.py
+ZKBot command frame encoding - produces wire bytes directly
+"""
+from typing import Dict
+from config.constants import MIN_ARM_SPEED, MAX_ARM_SPEED
+
+FRAME_HEADER = b"0x550xAA "
+FRAME_TRAILER = b" 0xAA0x55"
+
+# Commands without parameters never change - encode them once
+FIXED_FRAMES: Dict[str, bytes] = {
+    gcode: FRAME_HEADER + gcode.encode("ascii") + FRAME_TRAILER
+    for gcode in ("M03", "M05", "M112", "M122", "M999", "G28", "P01")
+}
+
+_MOVE_PREFIXES = {
+    "G00": FRAME_HEADER + b"G00 X",
+    "G01": FRAME_HEADER + b"G01 X",
+}
+
+
+class FrameEncoder:
+    """Builds command frames as bytes in a reusable buffer"""
+    
+    def __init__(self):
+        self._buffer = bytearray()
+        self._gripper_frames: Dict[int, bytes] = {}
+    
+    @staticmethod
+    def fixed(gcode: str) -> bytes:
+        """Cached frame for a parameterless command (M03, G28, P01, ...)"""
+        return FIXED_FRAMES[gcode]
+    
+    def move(self, move_type: str, x: float, y: float, z: float, feedrate: int) -> bytes:
+        """
+        G00/G01 XYZ move frame. Unknown move types fall back to G01,
+        feedrate is clamped to the controller range.
+        
+        Format: 0x550xAA G01 X... Y... Z... F... 0xAA0x55
+        """
+        prefix = _MOVE_PREFIXES.get(move_type)
+        if prefix is None:
+            prefix = _MOVE_PREFIXES.get(str(move_type).upper(), _MOVE_PREFIXES["G01"])
+        
+        feedrate = int(feedrate)
+        if feedrate < MIN_ARM_SPEED:
+            feedrate = MIN_ARM_SPEED
+        elif feedrate > MAX_ARM_SPEED:
+            feedrate = MAX_ARM_SPEED
+        
+        buf = self._buffer
+        del buf[:]
+        buf += prefix
+        buf += str(x).encode("ascii")
+        buf += b" Y"
+        buf += str(y).encode("ascii")
+        buf += b" Z"
+        buf += str(z).encode("ascii")
+        buf += b" F%d" % feedrate
+        buf += FRAME_TRAILER
+        return bytes(buf)
+    
+    def gripper(self, angle: int) -> bytes:
+        """G06 frame for DO-0 gripper (0-180), cached per angle"""
+        angle = max(0, min(180, int(angle)))
+        frame = self._gripper_frames.get(angle)
+        if frame is None:
+            frame = FRAME_HEADER + b"G06 D7 S1 A%d" % angle + FRAME_TRAILER
+            self._gripper_frames[angle] = frame
+        return frame
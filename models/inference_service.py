@@ -0,0 +1,187 @@
+"""
+inference_service.py
+One YOLOv8 model serving the cameras of several washing cells
+
+Cells run in their own processes (CellOrchestrator) and send JPEG frames
+to the service over a shared queue. The service thread collects whatever
+frames are waiting, up to INFERENCE_MAX_BATCH, runs them through the
+model in one call and returns each cell its boxes - so N cells cost one
+model in memory and batched GPU/CPU passes instead of N models.
+"""
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+from config.constants import INFERENCE_MAX_BATCH, INFERENCE_TIMEOUT, INFERENCE_JPEG_QUALITY
+
+NO_BOXES = np.zeros((0, 6), dtype=np.float32)
+
+
+class InferenceClient:
+    """
+    Detector handed to a cell's VisionSystem. Picklable, so it can be
+    passed to the cell process. Thread-safe: the cell's replies share one
+    queue, so the cycle thread and the PickupWatcher take turns.
+    """
+
+    def __init__(self, cell: str, requests, responses):
+        self.cell = cell
+        self.requests = requests
+        self.responses = responses
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]  # locks don't pickle - each process gets its own
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def detect(self, frame: np.ndarray, conf: float, iou: float) -> np.ndarray:
+        """
+        Boxes for one frame, same layout as YOLO boxes.data (x1, y1, x2, y2, conf, class).
+        Returns no boxes if the service does not answer in time.
+        """
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, INFERENCE_JPEG_QUALITY])
+        if not ok:
+            return NO_BOXES
+
+        # One request in flight per cell, or threads would take each other's answers
+        with self._lock:
+            self._sequence += 1
+            self.requests.put((self.cell, self._sequence, jpeg.tobytes(), conf, iou))
+
+            deadline = time.monotonic() + INFERENCE_TIMEOUT
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"⚠ [{self.cell}] Inference timeout")
+                    return NO_BOXES
+                try:
+                    sequence, boxes = self.responses.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if sequence == self._sequence:
+                    return boxes
+                # Late answer to a request that already timed out - drop it
+
+
+class InferenceService:
+    """Batched detections for all cells from one model"""
+
+    def __init__(self, model_path: str, context, max_batch: int = INFERENCE_MAX_BATCH):
+        """
+        Args:
+            model_path: YOLOv8 weights
+            context: multiprocessing context the cell processes are started from
+            max_batch: Most frames run through the model at once
+        """
+        self.model_path = model_path
+        self.context = context
+        self.max_batch = max_batch
+        self.model = None
+        self.requests = context.Queue()
+        self.responses: Dict[str, object] = {}
+
+        self.frames = 0
+        self.batches = 0
+        self.busy = 0.0  # seconds spent in the model
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def add_client(self, cell: str) -> InferenceClient:
+        """Detector for one cell (call before starting the cell's process)"""
+        self.responses[cell] = self.context.Queue()
+        return InferenceClient(cell, self.requests, self.responses[cell])
+
+    # ═══════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════
+
+    def start(self) -> bool:
+        """Load the model and start serving; False if YOLOv8 is not available"""
+        try:
+            from ultralytics import YOLO
+            self.model = YOLO(self.model_path)
+        except Exception as e:
+            print(f"⚠ Inference service disabled: {e}")
+            return False
+
+        print(f"✓ Inference service serving {len(self.responses)} cells with {self.model_path}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="InferenceService", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    # ═══════════════════════════════════════════════════════════════
+    # SERVICE THREAD
+    # ═══════════════════════════════════════════════════════════════
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self.requests.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                results = self._infer(batch)
+            except Exception as e:
+                print(f"⚠ Inference error: {e}")
+                results = [NO_BOXES] * len(batch)
+
+            for (cell, sequence, _, _, _), boxes in zip(batch, results):
+                self.responses[cell].put((sequence, boxes))
+
+    def _infer(self, batch: List[tuple]) -> List[np.ndarray]:
+        """
+        Run one batch. NMS depends on the iou, so requests run in one model
+        call per iou value; each request gets only boxes above its own
+        confidence threshold.
+        """
+        groups: Dict[float, List[int]] = {}
+        for index, (_, _, _, _, iou) in enumerate(batch):
+            groups.setdefault(iou, []).append(index)
+
+        boxes: List[np.ndarray] = [NO_BOXES] * len(batch)
+        for iou, indices in groups.items():
+            requests = [batch[i] for i in indices]
+            frames = [cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                      for _, _, jpeg, _, _ in requests]
+            lowest = min(conf for _, _, _, conf, _ in requests)
+
+            started = time.monotonic()
+            results = self.model(frames, conf=lowest, iou=iou, verbose=False)
+            self.busy += time.monotonic() - started
+            self.frames += len(frames)
+            self.batches += 1
+
+            for index, (_, _, _, conf, _), result in zip(indices, requests, results):
+                data = result.boxes.data.cpu().numpy() if result.boxes is not None else NO_BOXES
+                boxes[index] = data[data[:, 4] >= conf] if len(data) else NO_BOXES
+        return boxes
+
+    def stats(self) -> Dict:
+        """Frames served, mean batch size and model time per frame"""
+        return {
+            "frames": self.frames,
+            "batches": self.batches,
+            "mean_batch": self.frames / self.batches if self.batches else 0.0,
+            "ms_per_frame": self.busy / self.frames * 1000 if self.frames else 0.0
+        }
@@ -0,0 +1,160 @@
+"""
+link_supervisor.py
+Heartbeat and auto-reconnect for the ZKBot serial link
+"""
+import threading
+import time
+from typing import Optional
+from config.constants import (
+    HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT, HEARTBEAT_MISSES,
+    RECONNECT_BACKOFF_MIN, RECONNECT_BACKOFF_MAX, RECONNECT_WAIT
+)
+from models.robot import LINK_ERRORS
+
+
+class LinkSupervisor:
+    """
+    Watches a ZKBotController link and brings it back after a glitch.
+
+    A dead link is either a port error (reader thread or a write failed)
+    or HEARTBEAT_MISSES unanswered M122 heartbeats. Heartbeats only go out
+    after HEARTBEAT_INTERVAL seconds without any received byte and with
+    nothing in flight, so they never compete with real traffic. If the
+    controller has never answered a heartbeat, heartbeats stop and only
+    port errors count (a silent reply slot would otherwise steal the
+    next command's reply).
+
+    Reconnects retry with exponential backoff. Afterwards the position is
+    resynced with P01 (or the arm is rehomed if it gives no coordinates
+    and `rehome` is set), and commands waiting in send_command resume.
+    """
+
+    CHECK_INTERVAL = 0.1  # seconds between link checks
+
+    def __init__(self, robot, heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+                 max_misses: int = HEARTBEAT_MISSES, rehome: bool = False,
+                 reconnect_wait: float = RECONNECT_WAIT):
+        self.robot = robot
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_misses = max_misses
+        self.rehome = rehome
+        self.reconnect_wait = reconnect_wait
+
+        self.heartbeat_supported: Optional[bool] = None  # unknown until first heartbeat
+        self.misses = 0
+        self.reconnects = 0
+        self.last_outage: Optional[float] = None  # seconds the last outage lasted
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ═══════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════
+
+    def start(self):
+        """Start supervising; commands now wait for reconnects"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.robot.reconnect_wait = self.reconnect_wait
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ZKBotLinkSupervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop supervising; commands fail fast again"""
+        self._stop.set()
+        self.robot.reconnect_wait = 0.0
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ═══════════════════════════════════════════════════════════════
+    # SUPERVISOR THREAD
+    # ═══════════════════════════════════════════════════════════════
+
+    def _run(self):
+        while not self._stop.wait(self.CHECK_INTERVAL):
+            robot = self.robot
+
+            if robot.link_lost or (robot.connected and robot.reader and not robot.reader.is_running):
+                self._reconnect(robot.link_error or "reader stopped")
+                continue
+
+            if self.heartbeat_supported is None:
+                self.heartbeat_supported = robot.answers_status  # learned from the connect handshake
+            if not robot.connected or not robot.reader or self.heartbeat_supported is False:
+                continue  # deliberately disconnected, or nothing to probe with
+
+            if (time.monotonic() - robot.reader.last_rx_time < self.heartbeat_interval or
+                    robot.reader.pending_count() > 0):
+                continue  # traffic proves the link is alive
+
+            _, response = robot.ping(timeout=self.heartbeat_timeout)
+            if response.startswith(LINK_ERRORS):
+                continue  # port failed during the heartbeat - handled next pass
+            if response != "ok (no response)":
+                # Any reply, even an error (e.g. estop active), proves the link
+                self.heartbeat_supported = True
+                self.misses = 0
+            elif self.heartbeat_supported is None:
+                self.heartbeat_supported = False
+                print("⚠ Robot does not answer M122 - link supervisor watches port errors only")
+            else:
+                self.misses += 1
+                if self.misses >= self.max_misses:
+                    robot.trace.error("link silent: %d heartbeats missed", self.misses)
+                    robot._link_failed("heartbeat timeout")
+
+    def _reconnect(self, reason: str):
+        """Reopen the port with backoff, then resync position"""
+        robot = self.robot
+        lost_at = time.monotonic()
+        print(f"⚠ Robot link lost ({reason}) - reconnecting...")
+
+        robot._link_failed(reason)
+        robot._close_link()
+
+        delay = RECONNECT_BACKOFF_MIN
+        while not self._stop.is_set():
+            success, _ = robot.connect()
+            if success:
+                break
+            robot._link_failed("reconnect failed")
+            self._stop.wait(delay)
+            delay = min(delay * 2.0, RECONNECT_BACKOFF_MAX)
+        else:
+            return
+
+        self.misses = 0
+        self.reconnects += 1
+        self._resync()
+        robot.resume_link()
+        self.last_outage = time.monotonic() - lost_at
+        print(f"✓ Robot link restored after {self.last_outage:.1f}s")
+
+    def _resync(self):
+        """Bring the cached position back in line with the arm"""
+        robot = self.robot
+        position = robot._query_position(timeout=1.0, wait_link=False)
+        if position is not None:
+            robot.current_position = position
+            if not robot.motion_in_progress:
+                robot.target_position = dict(position)
+            # else: queued moves may still be running - keep waiting for their target
+            print(f"📍 Resynced position: X={position['x']:.1f}, Y={position['y']:.1f}, Z={position['z']:.1f}")
+        elif self.rehome:
+            success, _ = robot._send_once(robot.encoder.fixed("G28"), True, 10.0)
+            if success:
+                robot.current_position = {"x": 0.0, "y": 0.0, "z": 0.0}
+                robot.target_position = dict(robot.current_position)
+                robot.motion_in_progress = False
+                print("🏠 Rehomed after reconnect")
+        else:
+            print("⚠ No position feedback after reconnect - keeping last commanded target")
@@ -0,0 +1,78 @@
+"""
+motion_model.py
+Move duration prediction from a trapezoidal velocity profile
+"""
+import math
+from typing import Dict
+from config.constants import FEEDRATE_MM_PER_S, MAX_ACCELERATION, MOVE_OVERHEAD
+
+
+class MotionModel:
+    """Predict how long the arm needs for a move"""
+    
+    def __init__(self, acceleration: float = MAX_ACCELERATION,
+                 feed_scale: float = FEEDRATE_MM_PER_S,
+                 overhead: float = MOVE_OVERHEAD):
+        self.acceleration = acceleration  # mm/s^2
+        self.feed_scale = feed_scale      # mm/s per F unit
+        self.overhead = overhead          # fixed seconds per move
+        self.calibrated = False           # True once fitted to measured moves
+    
+    def profile_time(self, distance: float, feedrate: float) -> float:
+        """
+        Time to travel `distance` mm at `feedrate`, accelerating and
+        decelerating at `acceleration`. Short moves never reach full
+        speed and follow a triangular profile instead.
+        """
+        if distance <= 0:
+            return self.overhead
+        
+        velocity = max(feedrate, 1) * self.feed_scale
+        ramp_distance = velocity * velocity / self.acceleration  # accel + decel
+        
+        if distance >= ramp_distance:
+            move_time = distance / velocity + velocity / self.acceleration
+        else:
+            move_time = 2.0 * math.sqrt(distance / self.acceleration)
+        
+        return move_time + self.overhead
+    
+    def distance_at(self, distance: float, feedrate: float, elapsed: float) -> float:
+        """Distance covered `elapsed` seconds into a move (same profile as profile_time)"""
+        if distance <= 0 or elapsed <= 0:
+            return 0.0
+        
+        velocity = max(feedrate, 1) * self.feed_scale
+        accel = self.acceleration
+        
+        if distance < velocity * velocity / accel:
+            # Triangular: peak speed reached half way
+            velocity = math.sqrt(distance * accel)
+        
+        ramp_time = velocity / accel
+        ramp_distance = 0.5 * accel * ramp_time * ramp_time
+        cruise_time = (distance - 2.0 * ramp_distance) / velocity
+        
+        if elapsed < ramp_time:
+            return 0.5 * accel * elapsed * elapsed
+        if elapsed < ramp_time + cruise_time:
+            return ramp_distance + velocity * (elapsed - ramp_time)
+        
+        decel_elapsed = elapsed - ramp_time - cruise_time
+        if decel_elapsed >= ramp_time:
+            return distance
+        return (distance - ramp_distance) + velocity * decel_elapsed - 0.5 * accel * decel_elapsed * decel_elapsed
+    
+    def estimate_move_time(self, start: Dict[str, float], end: Dict[str, float],
+                           feedrate: float) -> float:
+        """Predicted seconds for a straight move between two positions"""
+        return self.profile_time(self.distance(start, end), feedrate)
+    
+    @staticmethod
+    def distance(start: Dict[str, float], end: Dict[str, float]) -> float:
+        """Euclidean distance between two positions in mm"""
+        return math.sqrt(
+            (end["x"] - start["x"]) ** 2 +
+            (end["y"] - start["y"]) ** 2 +
+            (end["z"] - start["z"]) ** 2
+        )
@@ -0,0 +1,230 @@
+"""
+path_planner.py
+Collision-aware waypoints between calibrated positions
+
+The cell is modelled as boxes: every wash/rinse station (and batch slot)
+is a box of STATION_HALF_WIDTH around its calibrated XY, from the floor
+up to STATION_RIM_HEIGHT above the position where the cup sits. The tool
+is a point inflated by TOOL_RADIUS; with the pump on, the cup hangs below
+it, so boxes also grow CUP_HEIGHT upwards and CUP_RADIUS sideways.
+
+A move goes straight when the segment misses every box. Otherwise the
+tool lifts vertically out of the box it starts in, travels at the lowest
+height that clears the boxes under its path, and descends into the
+target - the route through the taught `safe` position is only used when
+it is predicted to be faster (or nothing else is possible).
+
+Usage:
+    python -m models.path_planner        # per-leg savings for the saved calibration
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from config.constants import (STATION_HALF_WIDTH, STATION_RIM_HEIGHT, CUP_HEIGHT, CUP_RADIUS,
+                              TOOL_RADIUS, PATH_CLEARANCE, WORKSPACE_LIMITS)
+from models.motion_model import MotionModel
+
+OBSTACLE_STATIONS = ("wash_station", "rinse_station")
+
+Point = Dict[str, float]
+
+
+class Box(NamedTuple):
+    name: str
+    low: Tuple[float, float, float]
+    high: Tuple[float, float, float]
+
+
+class PlannedPath(NamedTuple):
+    waypoints: List[Point]   # ends with the target; the start is not included
+    time: float              # predicted seconds
+    baseline: float          # predicted seconds of the route through `safe` (or direct)
+    route: str               # "direct", "lifted" or "safe"
+
+    @property
+    def saved(self) -> float:
+        return self.baseline - self.time
+
+
+class PathPlanner:
+    """Plans moves around the station volumes"""
+
+    def __init__(self, positions: Dict[str, Point], motion_model: Optional[MotionModel] = None,
+                 geometry: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            positions: Calibrated (and derived slot) positions
+            motion_model: Move timing used to pick the fastest route
+            geometry: Overrides of station_half_width, rim_height, cup_height,
+                cup_radius, tool_radius, clearance (mm)
+        """
+        geometry = geometry or {}
+        self.positions = positions
+        self.motion_model = motion_model or MotionModel()
+        self.half_width = geometry.get("station_half_width", STATION_HALF_WIDTH)
+        self.rim_height = geometry.get("rim_height", STATION_RIM_HEIGHT)
+        self.cup_height = geometry.get("cup_height", CUP_HEIGHT)
+        self.cup_radius = geometry.get("cup_radius", CUP_RADIUS)
+        self.tool_radius = geometry.get("tool_radius", TOOL_RADIUS)
+        self.clearance = geometry.get("clearance", PATH_CLEARANCE)
+
+    # ═══════════════════════════════════════════════════════════════
+    # COLLISION MODEL
+    # ═══════════════════════════════════════════════════════════════
+
+    def obstacles(self, cup_held: bool) -> List[Box]:
+        """Station boxes grown by the tool (and the cup hanging below it)"""
+        grow = max(self.tool_radius, self.cup_radius if cup_held else 0.0)
+        top_extra = self.rim_height + (self.cup_height if cup_held else 0.0)
+        floor = WORKSPACE_LIMITS["Z"]["min"]
+        boxes = []
+        for name, pos in self.positions.items():
+            if not name.startswith(OBSTACLE_STATIONS):
+                continue
+            half = self.half_width + grow
+            boxes.append(Box(name, (pos["x"] - half, pos["y"] - half, floor),
+                             (pos["x"] + half, pos["y"] + half, pos["z"] + top_extra)))
+        return boxes
+
+    @staticmethod
+    def segment_hits(start: Point, end: Point, box: Box) -> bool:
+        """Slab test: does the straight segment pass through the box?"""
+        t_min, t_max = 0.0, 1.0
+        for axis, lo, hi in zip("xyz", box.low, box.high):
+            origin = start[axis]
+            delta = end[axis] - origin
+            if abs(delta) < 1e-9:
+                if origin < lo or origin > hi:
+                    return False
+                continue
+            t1, t2 = (lo - origin) / delta, (hi - origin) / delta
+            if t1 > t2:
+                t1, t2 = t2, t1
+            t_min, t_max = max(t_min, t1), min(t_max, t2)
+            if t_min > t_max:
+                return False
+        return True
+
+    def collides(self, start: Point, end: Point, boxes: List[Box]) -> bool:
+        return any(self.segment_hits(start, end, box) for box in boxes)
+
+    # ═══════════════════════════════════════════════════════════════
+    # PLANNING
+    # ═══════════════════════════════════════════════════════════════
+
+    def path_time(self, start: Point, waypoints: List[Point], feedrate: float) -> float:
+        """Predicted seconds for a move sequence"""
+        total, here = 0.0, start
+        for point in waypoints:
+            total += self.motion_model.estimate_move_time(here, point, feedrate)
+            here = point
+        return total
+
+    def _lifted(self, start: Point, target: Point, boxes: List[Box]) -> Optional[List[Point]]:
+        """
+        Lift out, travel above every box under the path, descend - None if
+        that height is out of reach. The vertical legs stay inside the
+        start/target columns, and the travel height clears every box whose
+        footprint the XY path crosses, so the route is clear by construction.
+        """
+        flat_start, flat_target = dict(start, z=0.0), dict(target, z=0.0)
+        crossed = [box for box in boxes
+                   if self.segment_hits(flat_start, flat_target,
+                                        box._replace(low=box.low[:2] + (-1.0,), high=box.high[:2] + (1.0,)))]
+        travel_z = max([box.high[2] + self.clearance for box in crossed] + [start["z"], target["z"]])
+        if travel_z > WORKSPACE_LIMITS["Z"]["max"]:
+            return None
+
+        waypoints = []
+        if travel_z > start["z"]:
+            waypoints.append(dict(start, z=travel_z))
+        if travel_z > target["z"]:
+            waypoints.append(dict(target, z=travel_z))
+        waypoints.append(dict(target))
+        return waypoints
+
+    def plan(self, start: Point, target: Point, feedrate: float, cup_held: bool = False,
+             via: Optional[Point] = None) -> PlannedPath:
+        """
+        Fastest collision-free route from `start` to `target`.
+
+        Args:
+            start, target: Tool positions
+            feedrate: Feedrate of every leg
+            cup_held: Pump on - the cup hangs below the tool
+            via: Taught detour (the `safe` position) used as the baseline
+
+        Returns:
+            PlannedPath; falls back to the detour (or a direct move if
+            there is none) when no lifted route fits in the workspace
+        """
+        start = {a: start[a] for a in "xyz"}
+        target = {a: target[a] for a in "xyz"}
+        boxes = self.obstacles(cup_held)
+
+        candidates: List[Tuple[str, List[Point]]] = []
+        # A tool inside a station box (cup in the station) always hits it - it has to lift out
+        if not self.collides(start, target, boxes):
+            candidates.append(("direct", [target]))
+        lifted = self._lifted(start, target, boxes)
+        if lifted is not None:
+            candidates.append(("lifted", lifted))
+
+        baseline_points = [dict(via), target] if via else [target]
+        baseline = self.path_time(start, baseline_points, feedrate)
+        if via or not candidates:
+            candidates.append(("safe" if via else "direct", baseline_points))
+
+        route, waypoints = min(candidates, key=lambda c: self.path_time(start, c[1], feedrate))
+        return PlannedPath(waypoints, self.path_time(start, waypoints, feedrate), baseline, route)
+
+    # ═══════════════════════════════════════════════════════════════
+    # REPORT
+    # ═══════════════════════════════════════════════════════════════
+
+    def cycle_report(self, feedrate: float = 200) -> Dict[str, PlannedPath]:
+        """
+        Planned vs `safe`-routed time of the cycle legs that carry a cup,
+        and of the batch legs between wash slot k and rinse slot k
+        """
+        positions = self.positions
+        via = positions.get("safe")
+        legs = {"wash → rinse": ("wash_station", "rinse_station"),
+                "rinse → stack": ("rinse_station", "stack")}
+        for name in sorted(positions):
+            if name.startswith("wash_station_"):
+                slot = name[len("wash_station_"):]
+                legs[f"wash {slot} → rinse {slot}"] = (name, f"rinse_station_{slot}")
+        return {leg: self.plan(positions[a], positions[b], feedrate, cup_held=True, via=via)
+                for leg, (a, b) in legs.items() if a in positions and b in positions}
+
+
+def print_report(report: Dict[str, PlannedPath]):
+    total = sum(path.saved for path in report.values())
+    print(f"🧭 Path planning saves {total:.2f}s per cycle")
+    for leg, path in report.items():
+        print(f"   {leg:18s} {path.route:7s} {path.time:6.2f}s vs {path.baseline:6.2f}s "
+              f"({len(path.waypoints)} moves, {path.saved:+.2f}s)")
+
+
+def main():
+    """Report per-leg savings for the saved calibration"""
+    from data.storage import DataStorage
+    from models.duration_estimator import DurationEstimator
+
+    positions = DataStorage.load_calibration().get("positions", {})
+    estimator = DurationEstimator()
+    estimator.load()
+    report = PathPlanner(positions, estimator.motion_model).cycle_report()
+    if not report:
+        print("❌ Calibrate wash_station, rinse_station and stack first")
+        return
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
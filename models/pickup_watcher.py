@@ -0,0 +1,83 @@
+"""
+pickup_watcher.py
+Background cup detection at the pickup area
+"""
+import threading
+import time
+from typing import Optional
+from config.constants import PICKUP_WATCH_INTERVAL
+
+
+class PickupWatcher:
+    """
+    Evaluates camera frames on its own thread while the arm is busy
+    elsewhere, so VisionSystem latches the next cup's stable detection
+    before the cycle asks for it (VisionSystem.take_latched_cup).
+
+    Frames already evaluated by someone else (e.g. the UI camera thread)
+    are reused, so the camera is not read twice as often while both run.
+    """
+
+    def __init__(self, vision, interval: float = PICKUP_WATCH_INTERVAL):
+        """
+        Args:
+            vision: VisionSystem with the pickup camera
+            interval: Seconds between evaluated frames
+        """
+        self.vision = vision
+        self.interval = interval
+        self.frame_time = interval  # smoothed seconds per evaluated frame
+        self.empty_frames = 0  # consecutive failed captures
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ═══════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════
+
+    def start(self):
+        """Start watching; latching begins armed"""
+        self.vision.arm_latch()
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="PickupWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching and drop any latched detection"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self.vision.disarm_latch()
+
+    def resume(self):
+        """The arm has left the pickup area - latch the next cup"""
+        if self.is_running:
+            self.vision.arm_latch()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ═══════════════════════════════════════════════════════════════
+    # WATCH THREAD
+    # ═══════════════════════════════════════════════════════════════
+
+    def _run(self):
+        vision = self.vision
+        while not self._stop.is_set():
+            started = time.monotonic()
+            if vision.is_running and started - vision.last_evaluated >= self.interval:
+                try:
+                    frame = vision.capture_frame()
+                    self.empty_frames = self.empty_frames + 1 if frame is None else 0
+                    if frame is not None:
+                        vision.detect_cup_stable(frame)
+                        seconds = time.monotonic() - started + self.interval
+                        self.frame_time = 0.8 * self.frame_time + 0.2 * seconds
+                except Exception as e:
+                    print(f"⚠ Pickup watcher error: {e}")
+            self._stop.wait(self.interval)
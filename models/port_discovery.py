@@ -0,0 +1,201 @@
+"""
+port_discovery.py
+Find the serial port and baudrate the ZKBot answers on
+
+Every candidate port is probed on its own worker thread with a short
+M122 handshake. A port can only be opened once at a time, so the
+baudrates of one port are tried in turn while different ports run in
+parallel. The first port that answers wins and the others stop.
+
+Ports are opened exclusively, so a port another process (e.g. another
+washing cell) has open is skipped instead of being sent M122.
+
+Usage:
+    python -m models.port_discovery [--no-save]
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, List, Optional, Tuple
+from config.constants import DISCOVERY_BAUDRATES, DISCOVERY_TIMEOUT, DISCOVERY_WORKERS
+from models.frame_encoder import FrameEncoder
+
+HANDSHAKE_REPEAT = 0.2  # seconds between M122 frames while waiting
+REPLY_MARKERS = (b"ok", b"error", b"estop")
+
+
+class PortDiscovery:
+    """Probe serial ports concurrently for a responding ZKBot"""
+
+    def __init__(self, baudrates: Optional[List[int]] = None,
+                 timeout: float = DISCOVERY_TIMEOUT,
+                 max_workers: int = DISCOVERY_WORKERS):
+        """
+        Args:
+            baudrates: Baudrates to try on each port, in order
+            timeout: Seconds to wait for a reply at each baudrate
+            max_workers: Ports probed at once
+        """
+        self.baudrates = list(baudrates or DISCOVERY_BAUDRATES)
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._found = threading.Event()
+        self._handshake = FrameEncoder().fixed("M122")
+
+    @staticmethod
+    def candidate_ports() -> List[str]:
+        """Serial devices present on this machine"""
+        try:
+            from serial.tools import list_ports
+            return [p.device for p in list_ports.comports()]
+        except Exception as e:
+            print(f"⚠ Could not list serial ports: {e}")
+            return []
+
+    def probe(self, port: str, baudrates: Optional[List[int]] = None) -> Optional[Tuple[str, int, str]]:
+        """
+        Try each baudrate on one port.
+
+        Returns:
+            (port, baudrate, reply) or None if nothing answered
+        """
+        import serial
+
+        for baudrate in baudrates or self.baudrates:
+            if self._found.is_set():
+                return None  # another port already answered
+
+            try:
+                connection = serial.Serial(port=port, baudrate=baudrate, timeout=0.05, write_timeout=0.5,
+                                           exclusive=True)
+            except Exception:
+                return None  # busy, missing or not a serial device - no point trying other speeds
+
+            try:
+                connection.reset_input_buffer()
+                reply = self._handshake_reply(connection)
+            except Exception:
+                reply = None
+            finally:
+                connection.close()
+
+            if reply is not None:
+                return port, baudrate, reply
+        return None
+
+    def _handshake_reply(self, connection) -> Optional[str]:
+        """Send M122 until something recognisable comes back or time runs out"""
+        received = bytearray()
+        deadline = time.monotonic() + self.timeout
+        next_send = 0.0
+
+        while time.monotonic() < deadline and not self._found.is_set():
+            now = time.monotonic()
+            if now >= next_send:
+                connection.write(self._handshake)
+                next_send = now + HANDSHAKE_REPEAT
+
+            received.extend(connection.read(connection.in_waiting or 1))
+            lowered = received.lower()
+            if any(marker in lowered for marker in REPLY_MARKERS):
+                return received.decode("ascii", errors="ignore").strip()
+        return None
+
+    def discover(self, ports: Optional[List[str]] = None,
+                 preferred: Optional[Tuple[str, int]] = None,
+                 exclude: Iterable[str] = ()) -> Optional[Tuple[str, int]]:
+        """
+        Probe all ports concurrently.
+
+        Args:
+            ports: Ports to try (default: every serial device present)
+            preferred: (port, baudrate) from settings, tried first on that port
+            exclude: Ports never probed (e.g. configured for other cells)
+
+        Returns:
+            (port, baudrate) of the first responding arm, or None
+        """
+        ports = list(ports) if ports is not None else self.candidate_ports()
+        excluded = set(exclude)
+        ports = [port for port in ports if port not in excluded]
+        if not ports:
+            print("❌ No serial ports found")
+            return None
+
+        print(f"🔍 Probing {len(ports)} serial port(s) at {len(self.baudrates)} baudrate(s)...")
+        self._found.clear()
+        start = time.monotonic()
+        result = None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(ports))),
+                                thread_name_prefix="PortProbe") as pool:
+            futures = []
+            for port in ports:
+                baudrates = self.baudrates
+                if preferred and preferred[0] == port:
+                    baudrates = [preferred[1]] + [b for b in baudrates if b != preferred[1]]
+                futures.append(pool.submit(self.probe, port, baudrates))
+
+            for future in as_completed(futures):
+                found = future.result()
+                if found and result is None:
+                    result = found
+                    self._found.set()  # stop the other probes
+
+        if result is None:
+            print(f"❌ No ZKBot answered ({time.monotonic() - start:.1f}s)")
+            return None
+
+        port, baudrate, reply = result
+        print(f"✓ ZKBot found on {port} @ {baudrate} baud ({time.monotonic() - start:.1f}s): {reply!r}")
+        return port, baudrate
+
+    @staticmethod
+    def save(port: str, baudrate: int, cell: Optional[str] = None) -> bool:
+        """
+        Store the result so the next startup connects without probing.
+        With `cell`, only that cell's entry in "cells" is updated.
+        """
+        from data.storage import DataStorage
+        settings = DataStorage.load_settings()
+        if cell:
+            target = next((c for c in settings.get("cells", []) if c.get("name") == cell), None)
+            if target is None:
+                return False
+        else:
+            target = settings.setdefault("robot", {})
+        target["port"] = port
+        target["baudrate"] = baudrate
+        return DataStorage.save_settings(settings)
+
+    @staticmethod
+    def ports_of_other_cells(cell: Optional[str] = None) -> List[str]:
+        """Ports configured for every cell except `cell`"""
+        from data.storage import DataStorage
+        return [c["port"] for c in DataStorage.load_settings().get("cells", [])
+                if c.get("name") != cell and c.get("port")]
+
+
+def main():
+    """Probe, print and save the robot port"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find the ZKBot serial port")
+    parser.add_argument("ports", nargs="*", help="Ports to probe (default: all)")
+    parser.add_argument("--no-save", action="store_true", help="Do not write config/settings.json")
+    args = parser.parse_args()
+
+    found = PortDiscovery().discover(args.ports or None, exclude=PortDiscovery.ports_of_other_cells())
+    if found and not args.no_save:
+        if PortDiscovery.save(*found):
+            print("💾 Saved to settings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+position_monitor.py
+Background position updates for the teach pendant
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from config.constants import POSITION_MONITOR_RATE
+
+
+class PositionMonitor:
+    """
+    Polls ZKBotController.get_position() at a fixed rate on its own thread
+    and hands each reading to the registered callbacks, so a UI can show
+    the live position without blocking on the serial link.
+
+    Readings younger than one period are reused (e.g. from
+    wait_motion_done), so the monitor adds no P01 traffic while something
+    else is already polling. Nothing is sent while the link is down.
+    """
+
+    def __init__(self, robot, rate_hz: float = POSITION_MONITOR_RATE):
+        """
+        Args:
+            robot: ZKBotController to poll
+            rate_hz: Updates per second
+        """
+        self.robot = robot
+        self.rate_hz = rate_hz
+        self.callbacks: List[Callable[[Dict[str, float]], None]] = []
+        self.last_position: Optional[Dict[str, float]] = None
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / max(0.1, self.rate_hz)
+
+    def add_callback(self, callback: Callable[[Dict[str, float]], None]):
+        """Call `callback(position)` for every reading (on the monitor thread)"""
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[Dict[str, float]], None]):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    # ═══════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════
+
+    def start(self):
+        """Start streaming positions"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.last_position = None  # report the first reading even if unchanged
+        self._thread = threading.Thread(target=self._run, name="ZKBotPositionMonitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop streaming positions"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ═══════════════════════════════════════════════════════════════
+    # MONITOR THREAD
+    # ═══════════════════════════════════════════════════════════════
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while not self._stop.is_set():
+            robot = self.robot
+            if robot.connected and not robot.link_lost:
+                position = robot.get_position(max_age=self.interval)
+                if position and position != self.last_position:
+                    self.last_position = dict(position)
+                    for callback in list(self.callbacks):
+                        try:
+                            callback(dict(position))
+                        except Exception as e:
+                            print(f"⚠ Position callback error: {e}")
+
+            # Fixed rate, without drifting by the query time
+            next_poll = max(next_poll + self.interval, time.monotonic())
+            self._stop.wait(next_poll - time.monotonic())
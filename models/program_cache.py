@@ -0,0 +1,176 @@
+"""
+program_cache.py
+Compiled, cached form of saved programs
+
+A program is validated, optionally compiled (ProgramCompiler) and
+feedrate-optimized, split into send blocks and encoded into wire frames
+once. The result is immutable and cached by file mtime and content hash,
+so repeated cycles (INFINITE mode) skip reading, parsing and encoding.
+"""
+import hashlib
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+MOVE_COMMANDS = ("G00", "G01")
+
+
+class ProgramBlock(NamedTuple):
+    """Steps sent together: a batch, or a single step"""
+    start: int                      # index of the first step
+    steps: Tuple[Mapping, ...]
+    frames: Tuple[bytes, ...]       # one per step; b"" where nothing is sent (WAIT)
+    batched: bool
+
+
+class CompiledProgram(NamedTuple):
+    """Ready-to-run program"""
+    name: str
+    steps: Tuple[Mapping, ...]
+    blocks: Tuple[ProgramBlock, ...]
+    predicted_time: float           # seconds, from the duration estimator
+    warnings: Tuple[str, ...]
+    digest: str                     # sha1 of the source JSON ("" for unsaved steps)
+
+
+class ProgramCache:
+    """Compile programs once and reuse them until the file changes"""
+
+    def __init__(self, controller):
+        """
+        Args:
+            controller: CupWashingController (positions, encoder, settings)
+        """
+        self.controller = controller
+        # (name, compiled, optimized, window, optimizer revision)
+        #   -> (mtime_ns, size, digest, CompiledProgram or error message)
+        self._entries: Dict[Tuple[str, bool, bool, int, int], Tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, compiled: Optional[bool] = None) -> CompiledProgram:
+        """
+        Compiled program for a saved program name.
+
+        Args:
+            name: Program in data/programs
+            compiled: Run through ProgramCompiler (default: `compile_programs` setting)
+
+        Raises:
+            ValueError: program missing, empty or invalid
+        """
+        from data.storage import DataStorage
+
+        compiled = self.controller.compile_programs if compiled is None else compiled
+        # Blocks depend on the stream window, feedrates on the optimizer and what it has learned
+        optimized = self.controller.optimize_feedrates
+        revision = self.controller.feedrate_optimizer.revision if optimized else 0
+        key = (name, compiled, optimized, self.controller.stream_window, revision)
+        path = DataStorage.program_path(name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise ValueError(f"Program '{name}' not found")
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            self.hits += 1
+            return self._result(entry[3])
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        if entry and entry[2] == digest:
+            # Touched but unchanged
+            result = entry[3]
+        else:
+            self.misses += 1
+            try:
+                program = DataStorage.load_program(name) or {}
+                result = self.build(name, program.get("steps", []), compiled, digest)
+            except ValueError as e:
+                result = str(e)  # cache the failure too, until the file changes
+
+        with self._lock:
+            # Programs optimized before the last learned change are stale
+            for stale in [k for k in self._entries if k[:4] == key[:4] and k[4] != revision]:
+                del self._entries[stale]
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, digest, result)
+        return self._result(result)
+
+    @staticmethod
+    def _result(result) -> CompiledProgram:
+        if isinstance(result, str):
+            raise ValueError(result)
+        return result
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one program (or all, e.g. after positions change)"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == name]:
+                    del self._entries[key]
+
+    # ═══════════════════════════════════════════════════════════════
+    # COMPILATION
+    # ═══════════════════════════════════════════════════════════════
+
+    def build(self, name: str, steps: List[Dict], compiled: bool = False,
+              digest: str = "") -> CompiledProgram:
+        """
+        Validate, compile and encode a step list (not cached).
+
+        Raises:
+            ValueError: no steps, or the program is invalid
+        """
+        from utils.validators import Validators
+        controller = self.controller
+
+        if not steps:
+            raise ValueError(f"Program '{name}' has no steps")
+
+        # Reject bad programs before the arm moves, not halfway through a cup
+        valid, errors, warnings = Validators.validate_program(steps, controller.positions)
+        if not valid:
+            raise ValueError(f"Program '{name}' rejected: {'; '.join(errors)}")
+        for warning in warnings:
+            print(f"⚠ {warning}")
+
+        if compiled:
+            from models.program_compiler import ProgramCompiler, print_report
+            steps, report = ProgramCompiler(controller.robot.motion_model).compile(steps)
+            print_report(name, report)
+
+        if controller.optimize_feedrates:
+            # A cycle program starts where its previous run ended
+            moves = [s for s in steps if s.get("cmd", "G01") in MOVE_COMMANDS]
+            start = {a: moves[-1].get(a, 0.0) for a in "xyz"} if moves else None
+            try:
+                steps = controller.feedrate_optimizer.optimize_steps(steps, start)
+            except ValueError as e:
+                raise ValueError(f"Program '{name}': {e}")
+
+        frozen = tuple(MappingProxyType(dict(step)) for step in steps)
+        blocks = []
+        i = 0
+        while i < len(frozen):
+            run = controller._batch_run(frozen, i)
+            if len(run) > 1:
+                blocks.append(ProgramBlock(i, tuple(run), tuple(controller._step_frame(s) for s in run), True))
+                i += len(run)
+                continue
+            step = frozen[i]
+            sendable = step.get("cmd", "G01") in MOVE_COMMANDS + ("GRIPPER", "PUMP_ON", "PUMP_OFF")
+            frame = controller._step_frame(step) if sendable else b""
+            blocks.append(ProgramBlock(i, (step,), (frame,), False))
+            i += 1
+
+        predicted = controller.duration_estimator.estimate_program(list(frozen))["total"]
+        print(f"🛠 Program '{name}' compiled: {len(frozen)} steps in {len(blocks)} blocks, "
+              f"~{predicted:.1f}s predicted")
+        return CompiledProgram(name, frozen, tuple(blocks), predicted, tuple(warnings), digest)
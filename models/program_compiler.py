@@ -0,0 +1,203 @@
+"""
+program_compiler.py
+Compile pass for saved programs (data/programs/*.json)
+
+Drops moves that go nowhere, drops tool steps that repeat the state the
+program already set, and merges runs of collinear G01 segments into one
+move so the arm does not stop at every intermediate waypoint.
+
+The ZKBot firmware has no blending mode (no G64 / continuous-path word),
+so merged straight segments are the only continuous-path output; corners
+still stop. The compiled program uses the same step format as the source
+and runs through the normal execute_program path.
+
+Usage:
+    python -m models.program_compiler testing
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+from typing import Dict, List, Optional, Tuple
+from config.constants import COLLINEAR_TOLERANCE, POSITION_TOLERANCE
+from models.motion_model import MotionModel
+
+MOVE_COMMANDS = ("G00", "G01")
+
+
+def _position(step: Dict) -> Dict[str, float]:
+    return {"x": step.get("x", 0.0), "y": step.get("y", 0.0), "z": step.get("z", 0.0)}
+
+
+def _on_segment(point: Dict[str, float], start: Dict[str, float], end: Dict[str, float],
+                tolerance: float) -> bool:
+    """True if `point` lies between `start` and `end` within `tolerance` mm of the line"""
+    axes = ("x", "y", "z")
+    direction = [end[a] - start[a] for a in axes]
+    offset = [point[a] - start[a] for a in axes]
+    length_sq = sum(d * d for d in direction)
+    if length_sq == 0:
+        return False
+
+    t = sum(o * d for o, d in zip(offset, direction)) / length_sq
+    if t < 0.0 or t > 1.0:
+        return False  # reversal or overshoot - the arm must stop there
+
+    off_line = [o - t * d for o, d in zip(offset, direction)]
+    return math.sqrt(sum(v * v for v in off_line)) <= tolerance
+
+
+class ProgramCompiler:
+    """Rewrite program steps into an equivalent, faster step list"""
+
+    def __init__(self, motion_model: Optional[MotionModel] = None,
+                 position_tolerance: float = POSITION_TOLERANCE,
+                 collinear_tolerance: float = COLLINEAR_TOLERANCE):
+        self.motion_model = motion_model or MotionModel()
+        self.position_tolerance = position_tolerance
+        self.collinear_tolerance = collinear_tolerance
+
+    def compile(self, steps: List[Dict],
+                start: Optional[Dict[str, float]] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Compile a step list.
+
+        Args:
+            steps: Program steps as stored in the program JSON
+            start: Arm position before the first step, if known
+
+        Returns:
+            (compiled steps, report dict)
+        """
+        compiled: List[Dict] = []
+        position = dict(start) if start else None
+        last_move: Optional[Dict] = None        # last emitted move, if nothing followed it
+        last_move_start: Optional[Dict] = None  # where that move begins
+        via: List[Dict[str, float]] = []        # waypoints merged into last_move
+        gripper_angle = None
+        pump_on = None
+        dropped_moves = merged_moves = dropped_tools = 0
+
+        for source in steps:
+            step = dict(source)
+            cmd = step.get("cmd", "G01")
+            pause = step.get("pause", 0.0)
+
+            if cmd in MOVE_COMMANDS:
+                target = _position(step)
+
+                # Already there: nothing to send
+                if (position is not None and pause <= 0 and
+                        MotionModel.distance(position, target) <= self.position_tolerance):
+                    dropped_moves += 1
+                    continue
+
+                # Straight continuation of the previous G01 at the same speed
+                if (cmd == "G01" and last_move is not None and last_move_start is not None and
+                        last_move.get("cmd") == "G01" and last_move.get("pause", 0.0) <= 0 and
+                        last_move.get("feedrate", 100) == step.get("feedrate", 100)):
+                    points = via + [_position(last_move)]
+                    if all(_on_segment(p, last_move_start, target, self.collinear_tolerance)
+                           for p in points):
+                        via = points
+                        for key in ("x", "y", "z", "pause"):
+                            last_move[key] = step.get(key, 0.0)
+                        merged_moves += 1
+                        position = target
+                        continue
+
+                compiled.append(step)
+                last_move_start = position
+                last_move = step
+                via = []
+                position = target
+                continue
+
+            # Tool steps end any continuous segment
+            last_move = None
+            via = []
+
+            if cmd == "GRIPPER" and pause <= 0:
+                angle = step.get("angle", 90)
+                if angle == gripper_angle:
+                    dropped_tools += 1
+                    continue
+                gripper_angle = angle
+            elif cmd in ("PUMP_ON", "PUMP_OFF") and pause <= 0:
+                state = cmd == "PUMP_ON"
+                if state == pump_on:
+                    dropped_tools += 1
+                    continue
+                pump_on = state
+            elif cmd == "GRIPPER":
+                gripper_angle = step.get("angle", 90)
+            elif cmd in ("PUMP_ON", "PUMP_OFF"):
+                pump_on = cmd == "PUMP_ON"
+
+            compiled.append(step)
+
+        before = self.estimate_motion_time(steps, start)
+        after = self.estimate_motion_time(compiled, start)
+        report = {
+            "steps_before": len(steps),
+            "steps_after": len(compiled),
+            "dropped_moves": dropped_moves,
+            "merged_moves": merged_moves,
+            "dropped_tool_steps": dropped_tools,
+            "motion_time_before": before,
+            "motion_time_after": after,
+            "time_saved": before - after
+        }
+        return compiled, report
+
+    def estimate_motion_time(self, steps: List[Dict],
+                             start: Optional[Dict[str, float]] = None) -> float:
+        """
+        Predicted seconds spent moving (pauses excluded). The first move
+        counts as zero distance when the start position is unknown.
+        """
+        total = 0.0
+        position = dict(start) if start else None
+        for step in steps:
+            if step.get("cmd", "G01") not in MOVE_COMMANDS:
+                continue
+            target = _position(step)
+            total += self.motion_model.estimate_move_time(position or target, target,
+                                                          step.get("feedrate", 100))
+            position = target
+        return total
+
+
+def print_report(name: str, report: Dict):
+    """Print a compile report"""
+    print(f"🛠 Compiled '{name}': {report['steps_before']} → {report['steps_after']} steps")
+    print(f"   dropped moves: {report['dropped_moves']}, merged G01: {report['merged_moves']}, "
+          f"dropped tool steps: {report['dropped_tool_steps']}")
+    print(f"   predicted motion: {report['motion_time_before']:.2f}s → "
+          f"{report['motion_time_after']:.2f}s (saves {report['time_saved']:.2f}s)")
+
+
+def main():
+    """Compile saved programs and print what would change"""
+    import argparse
+    from data.storage import DataStorage
+
+    parser = argparse.ArgumentParser(description="Compile ZKBot programs and report savings")
+    parser.add_argument("programs", nargs="*", help="Program names (default: all)")
+    args = parser.parse_args()
+
+    compiler = ProgramCompiler()
+    for name in args.programs or DataStorage.list_programs():
+        program = DataStorage.load_program(name)
+        if not program or not program.get("steps"):
+            print(f"⚠ Program '{name}' has no steps")
+            continue
+        _, report = compiler.compile(program["steps"])
+        print_report(name, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+retry_policy.py
+Failure classification and retry rules for cycle operations
+
+A failed detection, pickup or move is classified first: an empty tray is
+not an error and is waited out with short polls, a dead camera or robot
+fails fast after a few backed-off retries and stops the run, and a
+fumbled pickup is tried again. Rules can be overridden per kind in the
+"retry" robot setting, e.g. {"camera": {"attempts": 5}}.
+"""
+import threading
+import time
+from enum import Enum
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class FailureKind(Enum):
+    """Why an operation failed"""
+    NO_CUP = "no_cup"      # pickup area empty
+    CAMERA = "camera"      # camera not running, no frames, or no model
+    ROBOT = "robot"        # move/tool command failed or link down
+    PICKUP = "pickup"      # pick sequence did not complete
+    STATION = "station"    # wash/rinse stopped early
+    PROGRAM = "program"    # saved program missing or invalid
+    UNKNOWN = "unknown"
+
+
+class RetryRule(NamedTuple):
+    attempts: Optional[int]  # retries after the first try (None = until stopped)
+    backoff_min: float       # seconds before the first retry, doubled each time
+    backoff_max: float
+    fatal: bool              # stop the run once retries are used up
+
+
+DEFAULT_RULES = {
+    FailureKind.NO_CUP: RetryRule(None, 0.1, 1.0, False),
+    FailureKind.CAMERA: RetryRule(3, 0.5, 4.0, True),
+    FailureKind.ROBOT: RetryRule(2, 0.2, 2.0, True),
+    FailureKind.PICKUP: RetryRule(1, 0.2, 0.2, False),
+    FailureKind.STATION: RetryRule(0, 0.0, 0.0, True),
+    FailureKind.PROGRAM: RetryRule(0, 0.0, 0.0, True),
+    FailureKind.UNKNOWN: RetryRule(0, 0.0, 0.0, False)
+}
+
+
+class RetryPolicy:
+    """Runs operations under the retry rule of their failure kind"""
+
+    def __init__(self, overrides: Optional[Dict[str, Dict]] = None):
+        """
+        Args:
+            overrides: {kind value: {rule field: value}} from settings
+        """
+        self.rules = dict(DEFAULT_RULES)
+        for kind_name, fields in (overrides or {}).items():
+            try:
+                kind = FailureKind(kind_name)
+            except ValueError:
+                print(f"⚠ Unknown retry rule '{kind_name}' ignored")
+                continue
+            self.rules[kind] = self.rules[kind]._replace(**fields)
+
+        self.retries: Dict[FailureKind, int] = {kind: 0 for kind in FailureKind}
+        self.gave_up: Dict[FailureKind, int] = {kind: 0 for kind in FailureKind}
+        self._wake = threading.Event()
+
+    def delay(self, kind: FailureKind, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)"""
+        rule = self.rules[kind]
+        return min(rule.backoff_min * (2 ** attempt), rule.backoff_max)
+
+    def is_fatal(self, kind: Optional[FailureKind]) -> bool:
+        """True if a failure of this kind should stop the run"""
+        return kind is not None and self.rules[kind].fatal
+
+    def wake(self):
+        """Cut the current backoff short (e.g. on stop)"""
+        self._wake.set()
+
+    def run(self, operation: Callable[[], bool], classify: Callable[[], FailureKind],
+            should_stop: Callable[[], bool],
+            on_retry: Optional[Callable[[FailureKind, int, float], None]] = None
+            ) -> Tuple[bool, Optional[FailureKind]]:
+        """
+        Call `operation` until it succeeds or its failure kind runs out of retries.
+
+        Args:
+            operation: Returns True on success
+            classify: Kind of the failure that just happened
+            should_stop: No more retries once this returns True (run stopped)
+            on_retry: Called with (kind, attempt, delay) before each backoff
+
+        Returns:
+            (success, kind of the last failure or None)
+        """
+        attempt = 0
+        previous = None
+        while True:
+            if operation():
+                return True, None
+
+            kind = classify()
+            if kind != previous:
+                attempt = 0  # e.g. camera back, tray now empty - start that kind's backoff over
+                previous = kind
+            rule = self.rules[kind]
+            if should_stop() or (rule.attempts is not None and attempt >= rule.attempts):
+                self.gave_up[kind] += 1
+                return False, kind
+
+            seconds = self.delay(kind, attempt)
+            if on_retry:
+                on_retry(kind, attempt, seconds)
+            self.retries[kind] += 1
+            attempt += 1
+
+            self._wake.clear()
+            deadline = time.monotonic() + seconds
+            while not should_stop() and time.monotonic() < deadline:
+                if self._wake.wait(min(0.1, deadline - time.monotonic())):
+                    break
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Retries and give-ups per failure kind (kinds never seen are left out)"""
+        return {kind.value: {"retries": self.retries[kind], "gave_up": self.gave_up[kind]}
+                for kind in FailureKind if self.retries[kind] or self.gave_up[kind]}
@@ -3,18 +3,53 @@ robot.py
 Robot Model - ZKBot Communication
 """
 import serial
+import threading
 import time
-from typing import Tuple, Dict, Optional
+from collections import deque
+from concurrent.futures import Future
+from typing import Tuple, Dict, List, Optional, Union
 import re
+from models.serial_reader import PendingReply, SerialResponseReader
+from models.frame_encoder import FrameEncoder
+from models.motion_model import MotionModel
+from models.serial_recorder import SerialRecorder
+from utils.trace import TraceBuffer
+from config.constants import (POSITION_TOLERANCE, MOTION_POLL_MIN, MOTION_POLL_MAX, POSITION_MAX_AGE,
+                              NO_FEEDBACK_MOVE_TIME, NO_REPLY_WINDOW)
+
+# Results that mean the frame may not have reached the arm
+LINK_ERRORS = ("Send error", "Not connected", "Stream stalled")
+
+# P01 reply, e.g. "X:123.45 Y:67.89 Z:12.34" - one pass for all three axes
+NUMBER = r"(-?(?:\d+(?:\.\d*)?|\.\d+))"
+POSITION_PATTERN = re.compile(rf"X[:\s]*{NUMBER}.*?Y[:\s]*{NUMBER}.*?Z[:\s]*{NUMBER}",
+                              re.IGNORECASE | re.DOTALL)
+
 
 class ZKBotController:
     """ZKBot robot arm controller"""
     
-    def __init__(self, port: str = "COM3", baudrate: int = 115200):
+    def __init__(self, port: str = "COM3", baudrate: int = 115200, trace_level: str = "error"):
         self.port = port
         self.baudrate = baudrate
         self.serial_connection = None
         self.connected = False
+        self.reader: Optional[SerialResponseReader] = None
+        self._write_lock = threading.Lock()  # keeps register+write pairs in order
+        
+        # Link state - a LinkSupervisor reconnects after a port failure
+        self.link_lost = False
+        self.link_error: Optional[str] = None  # why the link was declared lost
+        self.reconnect_wait = 0.0  # seconds a command waits for a reconnect (0 = fail fast)
+        self._link_ready = threading.Event()
+        self.answers_status: Optional[bool] = None  # controller replied to M122 on connect
+        self.position_feedback: Optional[bool] = None  # P01 returned coordinates (None = not asked yet)
+        
+        # Frame encoding and diagnostics (no stdout on the command path)
+        self.encoder = FrameEncoder()
+        self.trace = TraceBuffer()
+        self.trace.set_level(trace_level)
+        self.recorder: Optional[SerialRecorder] = None
         
         # Current position tracking
         self.current_position = {
@@ -22,19 +57,44 @@ class ZKBotController:
             "y": 0.0,
             "z": 0.0
         }
+        
+        self.position_time = 0.0  # time.monotonic() of the last P01-confirmed position
+        
+        # Motion tracking - last commanded target and predicted finish time
+        self.target_position = dict(self.current_position)
+        self.motion_model = MotionModel()
+        self.motion_in_progress = False
+        self._motion_end = 0.0
+        self._motion_started = 0.0
+        self._motion_moves: List[Dict] = []  # moves queued since the arm was last idle
+        
+        # Confirmed single-move durations, for feedrate learning
+        self.move_log = deque(maxlen=500)
+        self.pump_active = False
     
     def connect(self) -> Tuple[bool, str]:
         """Connect to robot"""
+        # After a link failure the supervisor resyncs before commands resume
+        resuming = self.link_lost and self.reconnect_wait > 0
         try:
             self.serial_connection = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
-                timeout=2.0,
-                write_timeout=2.0
+                timeout=SerialResponseReader.POLL_INTERVAL,  # reader thread polls
+                write_timeout=2.0,
+                exclusive=True  # port discovery in another cell must not open this arm
             )
-            time.sleep(0.5)  # Reduced from 2 to 0.5 seconds for faster connection
+            # Replies are framed and matched on a dedicated thread
+            self.reader = SerialResponseReader(self.serial_connection)
+            self.reader.recorder = self.recorder
+            self.reader.start()
             
             self.connected = True
+            self.link_lost = False
+            self.position_feedback = None
+            self._wait_ready()
+            if not resuming:
+                self._link_ready.set()
             print(f"✓ Connected to ZKBot on {self.port}")
             return True, "Connected successfully"
             
@@ -49,69 +109,305 @@ class ZKBotController:
             print(f"❌ {error_msg}")
             return False, error_msg
     
+    def _wait_ready(self, settle: float = 0.5):
+        """
+        Wait until the controller answers after the port opens (boards that
+        reset on open need a moment). Returns on the first reply instead
+        of always sleeping `settle` seconds.
+        """
+        deadline = time.monotonic() + settle
+        while time.monotonic() < deadline:
+            success, response = self.ping(timeout=min(0.1, max(0.01, deadline - time.monotonic())))
+            if not response.startswith(LINK_ERRORS) and response != "ok (no response)":
+                self.answers_status = True
+                return
+        # A board slower than the ping timeout still answered, just late
+        self.answers_status = bool(self.reader and self.reader.late_replies)
+    
     def disconnect(self) -> bool:
         """Disconnect from robot"""
         try:
-            if self.serial_connection and self.serial_connection.is_open:
-                self.serial_connection.close()
             self.connected = False
+            self.link_lost = False
+            self._link_ready.clear()
+            self._close_link()
             print("✓ Disconnected from ZKBot")
             return True
         except Exception as e:
             print(f"❌ Disconnect error: {e}")
             return False
     
-    def send_command(self, command: str, wait_for_response: bool = True, timeout: float = 3.0) -> Tuple[bool, str]:
+    def _close_link(self):
+        """Stop the reader and close the port"""
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
+        if self.serial_connection and self.serial_connection.is_open:
+            try:
+                self.serial_connection.close()
+            except Exception:
+                pass  # adapter already gone
+    
+    def _link_failed(self, reason: str):
+        """The port failed under us - stop sending until it is reconnected"""
+        if not self.link_lost:
+            self.trace.error("link lost: %s", reason)
+            self.link_error = reason
+        self.link_lost = True
+        self.connected = False
+        self._link_ready.clear()
+    
+    def resume_link(self):
+        """Release commands held back while the link was down"""
+        if self.connected:
+            self._link_ready.set()
+    
+    def wait_for_link(self, timeout: Optional[float] = None) -> bool:
+        """Block until the link is up (after a reconnect); False on timeout"""
+        return self._link_ready.wait(self.reconnect_wait if timeout is None else timeout)
+    
+    def start_recording(self, path: str) -> bool:
+        """Record every frame sent and received to `path` (binary, see serial_recorder)"""
+        try:
+            self.stop_recording()
+            self.recorder = SerialRecorder(path)
+            if self.reader:
+                self.reader.recorder = self.recorder
+            print(f"📼 Recording serial session to {path}")
+            return True
+        except Exception as e:
+            print(f"❌ Could not start serial recording: {e}")
+            self.recorder = None
+            return False
+    
+    def stop_recording(self):
+        """Stop recording and close the file"""
+        if self.recorder:
+            if self.reader:
+                self.reader.recorder = None
+            self.recorder.close()
+            print(f"📼 Serial recording saved: {self.recorder.path} ({self.recorder.records} frames)")
+            self.recorder = None
+    
+    def send_command(self, command: Union[str, bytes], wait_for_response: bool = True,
+                     timeout: float = 3.0) -> Tuple[bool, str]:
         """
         Send G-code command to robot using correct protocol format.
         
+        Accepts a formatted frame string or pre-encoded frame bytes.
+        Returns as soon as the reader thread has matched a reply to this
+        command, or after `timeout` seconds without one. A controller that
+        didn't answer on connect is only given NO_REPLY_WINDOW seconds.
+        
+        With `reconnect_wait` set (see LinkSupervisor), a command issued or
+        cut off while the link is down waits for the reconnect and is sent
+        once more. Moves are absolute and tool commands set a state, so
+        sending one twice is harmless.
+        
         Returns:
             Tuple[bool, str]: (success, response/error_message)
         """
-        if not self.connected or not self.serial_connection:
+        if not self._link_ready.is_set() and self.reconnect_wait > 0:
+            self.wait_for_link()
+        
+        success, response = self._send_once(command, wait_for_response, timeout)
+        if not success and self.link_lost and self.reconnect_wait > 0 and self.wait_for_link():
+            success, response = self._send_once(command, wait_for_response, timeout)
+        return success, response
+    
+    def ping(self, timeout: float = 0.5) -> Tuple[bool, str]:
+        """M122 status query that never waits for a reconnect (heartbeat)"""
+        return self._send_once(self.encoder.fixed("M122"), True, timeout)
+    
+    def _send_once(self, command: Union[str, bytes], wait_for_response: bool,
+                   timeout: float) -> Tuple[bool, str]:
+        """One write and (optionally) one reply"""
+        if not self.connected or not self.serial_connection or not self.reader:
             return False, "Not connected"
         
+        pending = None
         try:
             # Send command exactly as formatted
-            data = command.encode('utf-8')
-            written = self.serial_connection.write(data)
-            print(f"Sent: {command} | bytes: {written}")
+            data = command if isinstance(command, bytes) else command.encode('utf-8')
             
             if not wait_for_response:
+                # Not registered - a reply slot nobody answers would
+                # swallow the reply meant for the next command
+                with self._write_lock:
+                    self.serial_connection.write(data)
+                    if self.recorder:
+                        self.recorder.record_sent(data, expects_reply=False)
+                self.trace.debug("sent %r (no reply expected)", data)
                 return True, "ok"
             
-            # Minimal wait for controller to process
-            time.sleep(0.05)
+            timeout = self._reply_timeout(timeout)
             
-            # Read response
-            response = self.serial_connection.read(100)
-            response_str = response.decode('utf-8', errors='ignore').strip().lower()
-            print(f"Reply: {response}")
+            # Register before writing so a fast reply can't be missed
+            with self._write_lock:
+                pending = self.reader.expect_reply(data, timeout)
+                self.serial_connection.write(data)
+                if self.recorder:
+                    self.recorder.record_sent(data)
+            self.trace.debug("sent %r", data)
             
-            # Parse response
-            if "ok" in response_str:
-                return True, response_str
-            elif "error" in response_str:
-                return False, response_str
-            elif not response_str:
-                # No response - assume success for movement commands
-                return True, "ok (no response)"
-            else:
-                return True, response_str
+            if not pending.wait(timeout):
+                self.reader.cancel(pending)
+            
+            self.trace.debug("reply %r after %.4fs", pending.response, pending.latency)
+            return self._parse_reply(pending)
             
         except Exception as e:
+            if pending is not None:
+                self.reader.cancel(pending)
             error_msg = f"Send error: {str(e)}"
+            self._link_failed(error_msg)
+            self.trace.error("%s", error_msg)
             print(f"❌ {error_msg}")
             return False, error_msg
     
+    def _reply_timeout(self, timeout: float) -> float:
+        """Reply window for a command - short if the controller never answers"""
+        if self.answers_status is False:
+            return min(timeout, NO_REPLY_WINDOW)
+        return timeout
+    
+    def _parse_reply(self, pending: PendingReply) -> Tuple[bool, str]:
+        """Turn the frames collected for a command into (success, response)"""
+        response_str = pending.response.decode('utf-8', errors='ignore').strip().lower()
+        
+        if "ok" in response_str:
+            return True, response_str
+        elif "error" in response_str:
+            return False, response_str
+        elif not response_str:
+            if not self.reader or not self.reader.is_running:
+                error = self.reader.last_error if self.reader else None
+                self._link_failed(error or "reader stopped")
+                return False, f"Send error: {error or 'reader stopped'}"
+            # No response - assume success for movement commands
+            return True, "ok (no response)"
+        else:
+            return True, response_str
+    
+    def stream(self, commands: List[Union[str, bytes]], window: int = 4, timeout: float = 5.0) -> List[Future]:
+        """
+        Stream commands into the controller's planner buffer.
+        
+        Keeps up to `window` commands in flight. Every reply returns a
+        credit, which lets the next command go out, so the controller
+        never runs dry between moves. Blocks only while the window is full.
+        When several credits are free at once, the frames that fit go out
+        in a single write.
+        
+        Args:
+            commands: Formatted command frames, in execution order
+            window: Maximum commands written but not yet acknowledged
+            timeout: Per-command reply timeout in seconds
+        
+        Returns:
+            One future per command, resolving to (success, response)
+        """
+        futures = [Future() for _ in commands]
+        
+        if not self.connected or not self.serial_connection or not self.reader:
+            for future in futures:
+                future.set_result((False, "Not connected"))
+            return futures
+        
+        frames = [c if isinstance(c, bytes) else c.encode('utf-8') for c in commands]
+        timeout = self._reply_timeout(timeout)
+        credits = threading.Semaphore(max(1, window))
+        
+        def make_callback(future: Future):
+            def on_reply(pending: PendingReply):
+                if not future.done():
+                    future.set_result(self._parse_reply(pending))
+                credits.release()
+            return on_reply
+        
+        i = 0
+        while i < len(frames):
+            # Wait for a credit; replies always arrive or expire within timeout
+            if not credits.acquire(timeout=timeout + 1.0):
+                reason = "Stream stalled: no reply within timeout"
+            else:
+                # Take every other credit that is free right now
+                count = 1
+                while i + count < len(frames) and credits.acquire(blocking=False):
+                    count += 1
+                
+                chunk = frames[i:i + count]
+                registered = []
+                try:
+                    with self._write_lock:
+                        for data, future in zip(chunk, futures[i:i + count]):
+                            registered.append(self.reader.expect_reply(data, timeout, make_callback(future)))
+                        self.serial_connection.write(b"".join(chunk))
+                        if self.recorder:
+                            for data in chunk:
+                                self.recorder.record_sent(data)
+                    self.trace.debug("streamed %d frame(s) %r", count, chunk)
+                    i += count
+                    continue
+                except Exception as e:
+                    reason = f"Send error: {str(e)}"
+                    self._link_failed(reason)
+                    for future in futures[i:i + count]:
+                        future.set_result((False, reason))
+                    for pending in registered:
+                        self.reader.cancel(pending)  # returns the credit
+                    for _ in range(count - len(registered)):
+                        credits.release()
+            
+            # Abort: nothing after a failed command may be sent
+            self.trace.error("%s", reason)
+            print(f"❌ {reason}")
+            for remaining in futures[i:]:
+                if not remaining.done():
+                    remaining.set_result((False, reason))
+            break
+        
+        return futures
+    
+    def send_batch(self, frames: List[Union[str, bytes]], window: Optional[int] = None,
+                   timeout: float = 5.0) -> List[Tuple[bool, str]]:
+        """
+        Send several frames with as few writes as possible and collect
+        the replies in order.
+        
+        Args:
+            frames: Formatted command frames, in execution order
+            window: Maximum frames in flight (default: all in one write)
+            timeout: Per-frame reply timeout in seconds
+        
+        Returns:
+            (success, response) per frame. If a write fails, the rest
+            of the batch is not sent - or, with `reconnect_wait` set, it is
+            sent again from the first unanswered frame after the reconnect.
+        """
+        if not frames:
+            return []
+        futures = self.stream(frames, window=window or len(frames), timeout=timeout)
+        results = [future.result() for future in futures]
+        
+        if self.link_lost and self.reconnect_wait > 0:
+            failed = next((i for i, (success, response) in enumerate(results)
+                           if not success and response.startswith(LINK_ERRORS)), None)
+            if failed is not None and self.wait_for_link():
+                resent = self.stream(frames[failed:], window=window or len(frames), timeout=timeout)
+                results[failed:] = [future.result() for future in resent]
+        return results
+    
     def home(self) -> Tuple[bool, str]:
         """Home the robot (G28)"""
         print("🏠 Homing robot...")
-        cmd = "0x550xAA G28 0xAA0x55"
-        success, response = self.send_command(cmd, timeout=10.0)
+        success, response = self.send_command(self.encoder.fixed("G28"), timeout=10.0)
         
         if success:
             self.current_position = {"x": 0.0, "y": 0.0, "z": 0.0}
+            self.target_position = dict(self.current_position)
+            self.motion_in_progress = False
+            self.position_time = time.monotonic()
             print("✓ Homing complete")
         
         return success, response
@@ -124,13 +420,7 @@ class ZKBotController:
             x, y, z: Target coordinates in mm
             feedrate: Movement speed
         """
-        cmd = self.build_xyz_move_command(x, y, z, feedrate, speed_override=1.0, move_type="G00")
-        success, response = self.send_command(cmd, timeout=5.0)
-        
-        if success:
-            self.current_position = {"x": x, "y": y, "z": z}
-        
-        return success, response
+        return self.send_move(self.encoder.move("G00", x, y, z, feedrate), x, y, z, feedrate)
     
     def move_linear(self, x: float, y: float, z: float, feedrate: int = 100) -> Tuple[bool, str]:
         """
@@ -140,11 +430,20 @@ class ZKBotController:
             x, y, z: Target coordinates in mm
             feedrate: Movement speed
         """
-        cmd = self.build_xyz_move_command(x, y, z, feedrate, speed_override=1.0, move_type="G01")
-        success, response = self.send_command(cmd, timeout=5.0)
+        return self.send_move(self.encoder.move("G01", x, y, z, feedrate), x, y, z, feedrate)
+    
+    def send_move(self, frame: bytes, x: float, y: float, z: float, feedrate: int) -> Tuple[bool, str]:
+        """
+        Send a pre-encoded G00/G01 frame and track the move
+        
+        Args:
+            frame: Wire frame (e.g. from a compiled program)
+            x, y, z, feedrate: The frame's target and speed, for motion tracking
+        """
+        success, response = self.send_command(frame, timeout=5.0)
         
         if success:
-            self.current_position = {"x": x, "y": y, "z": z}
+            self.track_move(x, y, z, feedrate)
         
         return success, response
     
@@ -156,12 +455,121 @@ class ZKBotController:
             dx, dy, dz: Offset in mm
             feedrate: Movement speed
         """
-        new_x = self.current_position["x"] + dx
-        new_y = self.current_position["y"] + dy
-        new_z = self.current_position["z"] + dz
+        new_x = self.target_position["x"] + dx
+        new_y = self.target_position["y"] + dy
+        new_z = self.target_position["z"] + dz
         
         return self.move_linear(new_x, new_y, new_z, feedrate)
     
+    # ═══════════════════════════════════════════════════════════════
+    # MOTION TRACKING
+    # ═══════════════════════════════════════════════════════════════
+    
+    def track_move(self, x: float, y: float, z: float, feedrate: int = 100) -> float:
+        """
+        Record an acknowledged move. Moves queue up behind each other in
+        the controller, so the predicted finish time accumulates.
+        
+        Returns:
+            Predicted duration of this move in seconds
+        """
+        target = {"x": x, "y": y, "z": z}
+        duration = self.motion_model.estimate_move_time(self.target_position, target, feedrate)
+        
+        now = time.monotonic()
+        if not self.motion_in_progress:
+            self._motion_started = now
+            self._motion_moves = []
+        self._motion_moves.append({"start": dict(self.target_position), "target": target,
+                                   "feedrate": feedrate, "loaded": self.pump_active})
+        
+        self._motion_end = max(now, self._motion_end) + duration
+        self.target_position = target
+        self.motion_in_progress = True
+        self.position_time = 0.0  # the arm is moving - the cached reading is stale
+        return duration
+    
+    def predicted_motion_remaining(self) -> float:
+        """Seconds until queued motion is predicted to finish"""
+        if not self.motion_in_progress:
+            return 0.0
+        return max(0.0, self._motion_end - time.monotonic())
+    
+    def wait_motion_done(self, timeout: Optional[float] = None,
+                         tolerance: float = POSITION_TOLERANCE,
+                         predicted: Optional[float] = None) -> bool:
+        """
+        Block until the arm has reached its last commanded target.
+        
+        Polls P01 sparsely while the predicted duration is far away and
+        tightens the interval as the predicted end approaches. If the
+        controller gives no position feedback, the prediction is trusted
+        once the motion model has been fitted to measured moves; before
+        that, each queued move waits at most NO_FEEDBACK_MOVE_TIME.
+        
+        Args:
+            timeout: Give up after this many seconds (default: 2x predicted + 2s)
+            tolerance: Distance in mm that counts as "arrived"
+            predicted: Override for the predicted remaining duration
+        
+        Returns:
+            True when motion is done, False on timeout or lost link
+        """
+        if not self.motion_in_progress:
+            return True
+        
+        start = time.monotonic()
+        if predicted is not None:
+            self._motion_end = start + predicted
+        remaining = self.predicted_motion_remaining()
+        if timeout is None:
+            timeout = remaining * 2.0 + 2.0
+        deadline = start + timeout
+        
+        target = self.target_position
+        feedback = True
+        interval = MOTION_POLL_MIN
+        
+        while True:
+            if feedback:
+                position = self._query_position(timeout=min(0.5, timeout))
+                if position is None:
+                    feedback = False  # controller doesn't report - use prediction
+                    if predicted is None and not self.motion_model.calibrated:
+                        # Unfitted F units are a guess - don't trust a long prediction
+                        self._motion_end = min(self._motion_end, self._motion_started +
+                                               NO_FEEDBACK_MOVE_TIME * max(1, len(self._motion_moves)))
+                elif MotionModel.distance(position, target) <= tolerance:
+                    self.current_position = position
+                    self.motion_in_progress = False
+                    if len(self._motion_moves) == 1:
+                        # Only an isolated move has a measurable duration
+                        self.move_log.append(dict(self._motion_moves[0],
+                                                  duration=time.monotonic() - self._motion_started))
+                    return True
+            
+            now = time.monotonic()
+            remaining = self._motion_end - now
+            if not feedback and remaining <= 0:
+                self.current_position = dict(target)
+                self.motion_in_progress = False
+                return True
+            
+            if now >= deadline or not self.connected:
+                print(f"⚠ Motion not confirmed after {now - start:.1f}s")
+                return False
+            
+            if not feedback:
+                interval = remaining
+            elif remaining > 0:
+                # Sparse early, tight near the predicted end
+                interval = min(max(remaining / 2.0, MOTION_POLL_MIN), MOTION_POLL_MAX)
+            else:
+                # Overrunning the prediction - back off gradually
+                interval = min(interval * 1.5, MOTION_POLL_MAX)
+            
+            time.sleep(max(0.0, min(interval, deadline - now)))
+    
     def set_gripper_angle(self, angle: int) -> Tuple[bool, str]:
         """
         Set gripper to specific angle (0-180)
@@ -169,8 +577,7 @@ class ZKBotController:
         Args:
             angle: Gripper angle in degrees (0=closed, 180=open)
         """
-        cmd = self.build_gripper_command(angle)
-        return self.send_command(cmd)
+        return self.send_command(self.encoder.gripper(angle))
     
     def gripper_open(self) -> Tuple[bool, str]:
         """Open gripper fully"""
@@ -182,28 +589,29 @@ class ZKBotController:
     
     def reset_errors(self) -> Tuple[bool, str]:
         """Reset any robot errors"""
-        cmd = "0x550xAA M999 0xAA0x55"
-        return self.send_command(cmd)
+        return self.send_command(self.encoder.fixed("M999"))
     
     def check_estop(self) -> Tuple[bool, str]:
         """Check E-stop status"""
-        cmd = "0x550xAA M122 0xAA0x55"
-        return self.send_command(cmd)
+        return self.send_command(self.encoder.fixed("M122"))
     
     def pump_on(self) -> Tuple[bool, str]:
         """Activate vacuum pump"""
-        cmd = "0x550xAA M03 0xAA0x55"
-        return self.send_command(cmd)
+        success, response = self.send_command(self.encoder.fixed("M03"))
+        if success:
+            self.pump_active = True
+        return success, response
     
     def pump_off(self) -> Tuple[bool, str]:
         """Deactivate vacuum pump"""
-        cmd = "0x550xAA M05 0xAA0x55"
-        return self.send_command(cmd)
+        success, response = self.send_command(self.encoder.fixed("M05"))
+        if success:
+            self.pump_active = False
+        return success, response
     
     def emergency_stop(self) -> Tuple[bool, str]:
         """Emergency stop"""
-        cmd = "0x550xAA M112 0xAA0x55"
-        return self.send_command(cmd, wait_for_response=False)
+        return self.send_command(self.encoder.fixed("M112"), wait_for_response=False)
     
     def build_gripper_command(self, angle: int) -> str:
         """
@@ -216,11 +624,7 @@ class ZKBotController:
         Returns:
             Formatted command string
         """
-        angle = max(0, min(180, angle))  # Clamp to valid range
-        gcode = f"G06 D7 S1 A{angle}"
-        frame = f"0x550xAA {gcode} 0xAA0x55"
-        print(f"FRAME: {frame}")
-        return frame
+        return self.encoder.gripper(angle).decode('ascii')
     
     def build_xyz_move_command(self, x: float, y: float, z: float, feedrate: int = 100, 
                                speed_override: float = 1.0, move_type: str = "G01") -> str:
@@ -237,63 +641,71 @@ class ZKBotController:
         Returns:
             Formatted command string
         """
-        # Validate move type
-        move_type = move_type.upper()
-        if move_type not in ["G00", "G01"]:
-            move_type = "G01"
-        
-        # Build parts list
-        parts = [move_type]
-        parts.append(f"X{x}")
-        parts.append(f"Y{y}")
-        parts.append(f"Z{z}")
-        
-        # Apply speed override to feedrate (integer, 1-500 mm/min)
-        effective_speed = int(feedrate * speed_override)
-        effective_speed = max(1, min(500, effective_speed))  # Clamp to valid range
-        parts.append(f"F{effective_speed}")
-        
-        # Build frame with spaces
-        gcode = " ".join(parts)
-        frame = f"0x550xAA {gcode} 0xAA0x55"
-        print(f"FRAME: {frame} (Override: {speed_override*100:.0f}%)")
+        return self.encode_move(x, y, z, feedrate, speed_override, move_type).decode('ascii')
+    
+    def encode_move(self, x: float, y: float, z: float, feedrate: int = 100,
+                    speed_override: float = 1.0, move_type: str = "G01") -> bytes:
+        """Same as build_xyz_move_command, but returns wire bytes"""
+        effective_speed = feedrate * speed_override if speed_override != 1.0 else feedrate
+        frame = self.encoder.move(move_type, x, y, z, effective_speed)
+        self.trace.debug("frame %r (override %.0f%%)", frame, speed_override * 100)
         return frame
     
-    def get_position(self) -> Optional[Dict[str, float]]:
+    def get_position(self, max_age: float = POSITION_MAX_AGE) -> Optional[Dict[str, float]]:
         """
         Get current position
         
+        Args:
+            max_age: Reuse the last P01 reading if it is at most this many
+                seconds old (0 = always query)
+        
         Returns:
             Dictionary with x, y, z coordinates or None if failed
         """
-        success, response = self.send_command("0x550xAA P01 0xAA0x55")
+        if max_age > 0 and self.position_age() <= max_age:
+            return dict(self.current_position)
         
-        if success and response:
-            # Parse response for coordinates
-            # Expected format: "X:123.45 Y:67.89 Z:12.34"
-            try:
-                x_match = re.search(r'X[:\s]*([-\d.]+)', response)
-                y_match = re.search(r'Y[:\s]*([-\d.]+)', response)
-                z_match = re.search(r'Z[:\s]*([-\d.]+)', response)
-                
-                if x_match and y_match and z_match:
-                    position = {
-                        "x": float(x_match.group(1)),
-                        "y": float(y_match.group(1)),
-                        "z": float(z_match.group(1))
-                    }
-                    self.current_position = position
-                    return position
-            except Exception as e:
-                print(f"⚠ Position parsing error: {e}")
+        position = self._query_position()
+        if position:
+            return position
         
         # Return cached position if query failed
         return self.current_position
     
+    def position_age(self) -> float:
+        """Seconds since the position was last confirmed by P01"""
+        if not self.position_time:
+            return float("inf")
+        return time.monotonic() - self.position_time
+    
+    def _query_position(self, timeout: float = 3.0, wait_link: bool = True) -> Optional[Dict[str, float]]:
+        """
+        Send P01 and parse the reply; None if no coordinates came back.
+        With `wait_link` False the query never waits for a reconnect.
+        """
+        if wait_link:
+            success, response = self.send_command(self.encoder.fixed("P01"), timeout=timeout)
+        else:
+            success, response = self._send_once(self.encoder.fixed("P01"), True, timeout)
+        
+        if success and response:
+            # Expected format: "X:123.45 Y:67.89 Z:12.34" (reply is lower-cased)
+            match = POSITION_PATTERN.search(response)
+            if match:
+                x, y, z = match.groups()
+                position = {"x": float(x), "y": float(y), "z": float(z)}
+                self.current_position = position
+                self.position_time = time.monotonic()
+                self.position_feedback = True
+                return dict(position)
+        
+        if success and self.position_feedback is None:
+            self.position_feedback = False  # answers, but never with coordinates
+        return None
+    
     def emergency_stop(self) -> Tuple[bool, str]:
         """Emergency stop"""
-        cmd = "0x550xAA M112 0xAA0x55"
-        return self.send_command(cmd, wait_for_response=False)
+        return self.send_command(self.encoder.fixed("M112"), wait_for_response=False)
     
     def __del__(self):
         """Cleanup on deletion"""
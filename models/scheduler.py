@@ -0,0 +1,322 @@
+"""
+scheduler.py
+Pipelined two-station scheduler
+
+single_cup_cycle runs one cup at a time, so the arm idles through every
+wash and rinse dwell. The pipeline keeps up to one cup in each station
+and gives the arm whichever task is ready, downstream first:
+
+    unload    rinse done            -> rinse_station to stack
+    transfer  wash done, rinse free -> wash_station to rinse_station
+    load      wash free             -> pickup to wash_station
+
+Stations run on their own timers (WashStationController.start_washing
+returns a StationCycle handle) instead of blocking the arm for the
+dwell. Unlike the serial cycle, the cup is released at the rinse
+station and picked up again afterwards, so the arm is free during the
+rinse.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+from config.constants import SystemState, QUICK_DETECT_FRAMES
+from models.wash_station import StationCycle
+
+STATION_POLL = 0.5  # seconds between stop checks while waiting on a station
+
+
+class Station:
+    """Occupancy and timer of one station"""
+
+    def __init__(self, name: str, position: str):
+        self.name = name
+        self.position = position
+        self.cup: Optional[int] = None             # cup number inside, if any
+        self.cycle: Optional[StationCycle] = None  # its wash or rinse
+
+    @property
+    def occupied(self) -> bool:
+        return self.cup is not None
+
+    @property
+    def is_done(self) -> bool:
+        return self.occupied and self.cycle is not None and self.cycle.done()
+
+
+class PipelineScheduler:
+    """Interleave arm tasks with wash and rinse dwells"""
+
+    def __init__(self, controller):
+        """
+        Args:
+            controller: CupWashingController whose arm and stations are used
+        """
+        self.controller = controller
+        self.wash = Station("wash", "wash_station")
+        self.rinse = Station("rinse", "rinse_station")
+        self.task_times: Dict[str, list] = {"load": [], "transfer": [], "unload": []}
+        self.cup_started: Dict[int, float] = {}
+        self.next_cup = 1
+        self.completed = 0
+        self.run_time = 0.0
+        self._station_done = threading.Event()
+
+    # ═══════════════════════════════════════════════════════════════
+    # MAIN LOOP
+    # ═══════════════════════════════════════════════════════════════
+
+    def run(self, max_cups: Optional[int] = None,
+            on_cup_done: Optional[Callable[[int], None]] = None) -> bool:
+        """
+        Wash cups until `max_cups` are stacked (None = until stopped).
+
+        Args:
+            max_cups: Cups to finish
+            on_cup_done: Called with the controller's washed count after each cup
+
+        Returns:
+            True if the run finished cleanly, False on an arm/station failure
+        """
+        controller = self.controller
+        required_positions = ["pickup", "wash_station", "rinse_station", "stack"]
+        missing = [p for p in required_positions if p not in controller.positions]
+        if missing:
+            controller.log_error(f"Missing required positions: {', '.join(missing)}")
+            return False
+
+        print("\n" + "=" * 60)
+        print(f"🚀 PIPELINED RUN - target: {max_cups if max_cups else '∞'} cups")
+        print("=" * 60)
+
+        start = time.monotonic()
+        started = 0
+
+        try:
+            while controller.is_running:
+                self._station_done.clear()
+                in_flight = self.wash.occupied or self.rinse.occupied
+                stopped = [st for st in (self.wash, self.rinse) if st.occupied and st.cycle.cancelled()]
+                if stopped:
+                    return self._abort(f"{stopped[0].name.capitalize()} stopped before cup #{stopped[0].cup} was done")
+
+                if self.rinse.is_done:
+                    if not self._unload():
+                        return self._abort("Unload from rinse failed")
+                    if on_cup_done:
+                        on_cup_done(controller.washed_cups)
+                    if max_cups and self.completed >= max_cups:
+                        break
+                    continue
+
+                if self.wash.is_done and not self.rinse.occupied:
+                    if not self._transfer():
+                        return self._abort("Transfer to rinse failed")
+                    continue
+
+                if not self.wash.occupied and (not max_cups or started < max_cups):
+                    # With cups in flight only glance at the pickup area, so
+                    # finished stations are not kept waiting
+                    loaded = self._load(quick=in_flight)
+                    if loaded is None:
+                        return self._abort("Load to wash failed")
+                    if loaded:
+                        started += 1
+                        continue
+                    if not in_flight:
+                        if not controller.is_running:
+                            break  # stop pressed while waiting for a cup
+                        if controller.retry_policy.is_fatal(controller.last_failure):
+                            return self._abort("Cup detection failed - camera not working")
+                        controller.failed_cups += 1  # same as a serial cycle with no cup
+                        time.sleep(0.5)
+                        continue
+
+                if not in_flight:
+                    break  # target loaded and everything stacked
+
+                # Arm has nothing to do - wait for the next station to finish
+                controller.state = SystemState.WASHING if self.wash.occupied else SystemState.RINSING
+                if not any(s.is_done for s in (self.wash, self.rinse)):
+                    self._station_done.wait(STATION_POLL)
+        finally:
+            self.run_time += time.monotonic() - start
+            if not controller.is_running and (self.wash.occupied or self.rinse.occupied):
+                print(f"⚠ Stopped with cups left in: "
+                      f"{', '.join(s.name for s in (self.wash, self.rinse) if s.occupied)}")
+
+        controller.state = SystemState.IDLE
+        self.print_report()
+        return True
+
+    def _abort(self, message: str) -> bool:
+        """Stop the run; every cup still in a station counts as failed"""
+        controller = self.controller
+        in_flight = [s for s in (self.wash, self.rinse) if s.occupied]
+        controller.failed_cups += max(1, len(in_flight))
+        controller.log_error(message)
+        controller.state = SystemState.ERROR
+        controller.wash_station.stop_washing()
+        controller.wash_station.stop_rinsing()
+        return False
+
+    # ═══════════════════════════════════════════════════════════════
+    # STATIONS
+    # ═══════════════════════════════════════════════════════════════
+
+    def _start_station(self, station: Station, cup: int):
+        wash_station = self.controller.wash_station
+        if station is self.wash:
+            recipe = self.controller.wash_recipe
+            if recipe:
+                cycle = wash_station.start_washing(recipe.wash_time, recipe.brush_speed)
+            else:
+                cycle = wash_station.start_washing(self.controller.wash_duration, wash_station.brush_speed)
+        else:
+            cycle = wash_station.start_rinsing(self.controller.rinse_duration)
+        station.cup = cup
+        station.cycle = cycle
+        cycle.add_done_callback(lambda _: self._station_done.set())
+
+    # ═══════════════════════════════════════════════════════════════
+    # ARM TASKS
+    # ═══════════════════════════════════════════════════════════════
+
+    def _load(self, quick: bool = False) -> Optional[bool]:
+        """
+        Pickup to wash station.
+
+        Args:
+            quick: Check the pickup area briefly and without logging a miss
+
+        Returns:
+            True if loaded, False if no cup was waiting, None on failure
+        """
+        controller = self.controller
+        task_start = time.monotonic()
+
+        if quick:
+            detected, _ = controller.detect_cup_before_pickup(
+                confidence_threshold=0.5, max_wait_frames=QUICK_DETECT_FRAMES, log_miss=False)
+        else:
+            detected = controller.wait_for_cup(confidence_threshold=0.5)  # waits out an empty tray
+        if not detected:
+            return False
+        if controller.adaptive_wash:
+            controller.inspect_cup()  # recipe is used when this cup's wash starts
+
+        cup = self.next_cup
+        print(f"\n📥 Cup #{cup}: loading wash station")
+        if not controller.pick_cup_with_retry() or not controller.place_at_wash():
+            return None
+
+        self.next_cup += 1
+        self.cup_started[cup] = task_start
+        self._start_station(self.wash, cup)
+        self.task_times["load"].append(time.monotonic() - task_start)
+        return True
+
+    def _transfer(self) -> bool:
+        """Wash station to rinse station"""
+        controller = self.controller
+        robot = controller.robot
+        task_start = time.monotonic()
+        cup = self.wash.cup
+        print(f"\n🔁 Cup #{cup}: wash → rinse")
+
+        if not controller.move_to("wash_station") or not robot.wait_motion_done():
+            return False
+        if not controller.pick_from_wash() or not controller.place_at_rinse():
+            return False
+        if not robot.wait_motion_done():
+            return False
+        robot.pump_off()  # leave the cup so the arm is free during the rinse
+
+        self.wash.cup = None
+        self._start_station(self.rinse, cup)
+        self.task_times["transfer"].append(time.monotonic() - task_start)
+        return True
+
+    def _unload(self) -> bool:
+        """Rinse station to stack"""
+        controller = self.controller
+        robot = controller.robot
+        task_start = time.monotonic()
+        cup = self.rinse.cup
+        print(f"\n📤 Cup #{cup}: rinse → stack")
+
+        if not controller.move_to("rinse_station") or not robot.wait_motion_done():
+            return False
+        robot.pump_on()
+        if not controller.place_at_stack():
+            return False
+
+        self.rinse.cup = None
+        self.task_times["unload"].append(time.monotonic() - task_start)
+        self._cup_finished(cup)
+        return True
+
+    def _cup_finished(self, cup: int):
+        controller = self.controller
+        cycle_time = time.monotonic() - self.cup_started.pop(cup)
+        controller.cycle_times.append(cycle_time)
+        controller.washed_cups += 1
+        self.completed += 1
+        print(f"✅ CUP #{cup} COMPLETE - Time in cell: {cycle_time:.1f}s")
+
+        from data.storage import DataStorage
+        DataStorage.log_wash_cycle({
+            "cup_number": controller.washed_cups,
+            "cycle_time": cycle_time,
+            "wash_duration": controller.wash_duration,
+            "rinse_duration": controller.rinse_duration,
+            "pipelined": True,
+            "success": True
+        })
+
+    # ═══════════════════════════════════════════════════════════════
+    # THROUGHPUT
+    # ═══════════════════════════════════════════════════════════════
+
+    @staticmethod
+    def projected_throughput(load: float, transfer: float, unload: float,
+                             wash: float, rinse: float) -> Dict:
+        """
+        Steady-state seconds per cup, serial vs pipelined.
+
+        Pipelined, a cup leaves every max(arm work, wash turnaround, rinse
+        turnaround) seconds: the wash is refilled only after a transfer and
+        a load, the rinse only after an unload and a transfer.
+
+        Returns:
+            {"serial": s, "pipelined": s, "gain": serial / pipelined}
+        """
+        serial = load + wash + transfer + rinse + unload
+        pipelined = max(load + transfer + unload, wash + transfer + load, rinse + unload + transfer)
+        return {"serial": serial, "pipelined": pipelined,
+                "gain": serial / pipelined if pipelined > 0 else 1.0}
+
+    def throughput_report(self) -> Optional[Dict]:
+        """Measured cups/hour and the gain over serial cycles with the same task times"""
+        if not self.completed or not all(self.task_times.values()):
+            return None
+
+        average = {task: sum(times) / len(times) for task, times in self.task_times.items()}
+        projection = self.projected_throughput(average["load"], average["transfer"], average["unload"],
+                                               self.controller.wash_duration, self.controller.rinse_duration)
+        measured = self.run_time / self.completed
+        return {
+            "cups": self.completed,
+            "seconds_per_cup": measured,
+            "cups_per_hour": 3600.0 / measured,
+            "serial_cups_per_hour": 3600.0 / projection["serial"],
+            "projected_cups_per_hour": 3600.0 / projection["pipelined"],
+            "gain": projection["serial"] / measured
+        }
+
+    def print_report(self):
+        report = self.throughput_report()
+        if not report:
+            return
+        print(f"⏱ Pipelined: {report['cups']} cups, {report['seconds_per_cup']:.1f}s/cup "
+              f"({report['cups_per_hour']:.0f} cups/h) vs serial {report['serial_cups_per_hour']:.0f} cups/h "
+              f"- {report['gain']:.2f}x (steady state {report['projected_cups_per_hour']:.0f} cups/h)")
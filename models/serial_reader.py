@@ -0,0 +1,287 @@
+"""
+serial_reader.py
+Background reply reader for the ZKBot serial link
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+# Reply framing
+FRAME_HEADER = b"0x550xAA"
+FRAME_TRAILER = b"0xAA0x55"
+LINE_TERMINATORS = (b"\n", b"\r")
+
+# An expired command's reply may still arrive this long after its deadline
+LATE_REPLY_WINDOW = 2.0
+
+
+class PendingReply:
+    """A command that has been written and is waiting for its reply"""
+
+    def __init__(self, command: str, timeout: float,
+                 callback: Optional[Callable[["PendingReply"], None]] = None):
+        self.command = command
+        self.sent_at = time.monotonic()
+        self.deadline = self.sent_at + timeout
+        self.completed_at: Optional[float] = None
+        self.frames: List[bytes] = []
+        self.callback = callback
+        self._event = threading.Event()
+
+    def complete(self):
+        """Mark reply as received (or abandoned) - runs callback once"""
+        if self._event.is_set():
+            return
+        self.completed_at = time.monotonic()
+        self._event.set()
+        if self.callback:
+            try:
+                self.callback(self)
+            except Exception as e:
+                print(f"⚠ Reply callback error: {e}")
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the reply lands; False on timeout"""
+        return self._event.wait(max(0.0, timeout))
+
+    @property
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def response(self) -> bytes:
+        """All frames received for this command"""
+        return b"\n".join(self.frames)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from write to reply"""
+        if self.completed_at is None:
+            return None
+        return self.completed_at - self.sent_at
+
+
+class SerialResponseReader:
+    """
+    Reads the serial port on a dedicated thread and hands each reply
+    to the oldest command still waiting for one.
+
+    A frame ends at a line terminator, at the 0xAA0x55 trailer, or after
+    `reply_gap` seconds without new bytes. A reply is complete when a frame
+    contains "ok"/"error", or when the link goes quiet after at least one
+    frame has arrived.
+
+    A command that expires (or is cancelled) before its reply leaves a
+    tombstone. Its late reply is dropped instead of being credited to the
+    next command. Tombstones lapse after LATE_REPLY_WINDOW. If the next
+    command then expires in silence with no late replies outstanding, the
+    dropped reply was really its own (the expired command never got one),
+    so that expiry leaves no new tombstone and the mismatch cannot cascade.
+    """
+
+    POLL_INTERVAL = 0.01  # serial read timeout used by the reader thread
+
+    def __init__(self, serial_connection, reply_gap: float = 0.02):
+        self.serial_connection = serial_connection
+        self.reply_gap = reply_gap
+
+        self._pending = deque()
+        self._tombstones = deque(maxlen=32)  # [late reply deadline, frames received] per expired command
+        self._claimed = 0  # replies dropped by tombstones since a reply last reached its command
+        self.late_replies = 0  # replies that arrived after their command expired
+        self._unsolicited = deque(maxlen=32)
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._finished: List[PendingReply] = []
+        self._last_rx = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.last_error: Optional[str] = None
+        self.recorder = None  # optional SerialRecorder, sees every received frame
+
+    # ═══════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════
+
+    def start(self):
+        """Start reader thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ZKBotReader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reader thread and release any waiters"""
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        self._release_all()
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+    
+    @property
+    def last_rx_time(self) -> float:
+        """time.monotonic() of the last byte received (0.0 if none yet)"""
+        return self._last_rx
+
+    # ═══════════════════════════════════════════════════════════════
+    # REQUEST MATCHING
+    # ═══════════════════════════════════════════════════════════════
+
+    def expect_reply(self, command: str, timeout: float,
+                     callback: Optional[Callable[[PendingReply], None]] = None) -> PendingReply:
+        """
+        Register a command about to be written (call before write).
+        
+        `callback` runs on the reader thread when the reply lands or the
+        command expires.
+        """
+        pending = PendingReply(command, timeout, callback)
+        with self._lock:
+            # Anything that arrived while nothing was pending is stale
+            self._unsolicited.clear()
+            self._pending.append(pending)
+        return pending
+
+    def cancel(self, pending: PendingReply):
+        """Give up on a reply (write failed or caller timed out)"""
+        with self._lock:
+            try:
+                self._pending.remove(pending)
+                if not pending.frames:
+                    self._tombstone(time.monotonic())
+            except ValueError:
+                pass
+        pending.complete()
+
+    def pending_count(self) -> int:
+        """Commands written but not yet answered"""
+        with self._lock:
+            return len(self._pending)
+
+    # ═══════════════════════════════════════════════════════════════
+    # READER THREAD
+    # ═══════════════════════════════════════════════════════════════
+
+    def _run(self):
+        """Reader loop"""
+        while self._running:
+            try:
+                waiting = self.serial_connection.in_waiting
+                data = self.serial_connection.read(waiting or 1)
+            except Exception as e:
+                # Port closed or adapter gone - wake everyone up and exit
+                self.last_error = str(e)
+                self._running = False
+                break
+
+            now = time.monotonic()
+            with self._lock:
+                if data:
+                    self._buffer.extend(data)
+                    self._last_rx = now
+                    self._extract_frames()
+                elif now - self._last_rx >= self.reply_gap:
+                    self._flush_idle()
+                self._expire(now)
+                finished, self._finished = self._finished, []
+
+            # Wake waiters outside the lock so callbacks may send again
+            for pending in finished:
+                pending.complete()
+
+        self._release_all()
+
+    def _release_all(self):
+        """Complete every outstanding command (reader is gone)"""
+        with self._lock:
+            leftovers = self._finished + list(self._pending)
+            self._finished = []
+            self._pending.clear()
+        for pending in leftovers:
+            pending.complete()
+
+    def _extract_frames(self):
+        """Split complete frames off the receive buffer"""
+        while self._buffer:
+            end = -1
+            for terminator in LINE_TERMINATORS:
+                idx = self._buffer.find(terminator)
+                if idx >= 0 and (end < 0 or idx + 1 < end):
+                    end = idx + 1
+            idx = self._buffer.find(FRAME_TRAILER)
+            if idx >= 0 and (end < 0 or idx + len(FRAME_TRAILER) < end):
+                end = idx + len(FRAME_TRAILER)
+            if end < 0:
+                return
+
+            frame = bytes(self._buffer[:end])
+            del self._buffer[:end]
+            self._dispatch(frame)
+
+    def _flush_idle(self):
+        """Link went quiet: close partial frame and finish open replies"""
+        if self._buffer:
+            frame = bytes(self._buffer)
+            self._buffer.clear()
+            self._dispatch(frame)
+
+        if self._tombstones and self._tombstones[0][1]:
+            self._tombstones.popleft()  # late reply without ok/error is over
+        elif self._pending and self._pending[0].frames:
+            self._claimed = 0
+            self._finished.append(self._pending.popleft())
+
+    def _dispatch(self, frame: bytes):
+        """Hand one frame to the oldest pending command"""
+        if self.recorder:
+            self.recorder.record_received(frame)
+        
+        frame = frame.replace(FRAME_HEADER, b"").replace(FRAME_TRAILER, b"").strip()
+        if not frame:
+            return
+
+        lowered = frame.lower()
+        terminated = b"ok" in lowered or b"error" in lowered
+
+        if self._tombstones:
+            # Late reply to an expired command - never credit it to the next one
+            self._tombstones[0][1] += 1
+            if terminated:
+                self._tombstones.popleft()
+                self._claimed += 1
+                self.late_replies += 1
+            return
+
+        if not self._pending:
+            self._unsolicited.append(frame)
+            return
+
+        pending = self._pending[0]
+        pending.frames.append(frame)
+
+        if terminated:
+            self._claimed = 0
+            self._finished.append(self._pending.popleft())
+
+    def _expire(self, now: float):
+        """Drop commands whose reply window has passed"""
+        while self._tombstones and self._tombstones[0][0] <= now:
+            self._tombstones.popleft()
+        while self._pending and self._pending[0].deadline <= now:
+            pending = self._pending.popleft()
+            if not pending.frames:
+                self._tombstone(now)
+            self._finished.append(pending)
+
+    def _tombstone(self, now: float):
+        """Expect a late reply for a command that got none in time"""
+        if self._claimed and not self._tombstones:
+            self._claimed -= 1  # its reply was already dropped by an older tombstone
+        else:
+            self._tombstones.append([now + LATE_REPLY_WINDOW, 0])
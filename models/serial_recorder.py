@@ -0,0 +1,260 @@
+"""
+serial_recorder.py
+Serial session recorder and replayer for the ZKBot link
+
+Recording format (little endian):
+    header  b"ZKREC\\x01" + <d wall-clock start> + <d monotonic start>
+    record  <B kind> <d seconds since start> <H length> + frame bytes
+
+kind: 0 = sent (reply expected), 1 = received, 2 = sent (no reply expected)
+
+Usage:
+    python -m models.serial_recorder report data/logs/serial_20260301_080000.zkrec
+    python -m models.serial_recorder replay data/logs/serial_20260301_080000.zkrec --speed 10
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Tuple
+
+MAGIC = b"ZKREC\x01"
+HEADER = struct.Struct("<dd")
+RECORD = struct.Struct("<BdH")
+
+SENT = 0
+RECEIVED = 1
+SENT_NO_REPLY = 2
+
+FRAME_HEADER = b"0x550xAA"
+FRAME_TRAILER = b"0xAA0x55"
+
+
+def command_name(frame: bytes) -> str:
+    """G-code word of a sent frame ("G00", "P01", ...)"""
+    text = frame.replace(FRAME_HEADER, b"").replace(FRAME_TRAILER, b"").strip()
+    return text.split(b" ", 1)[0].decode("ascii", "ignore").upper() if text else "?"
+
+
+class SerialRecorder:
+    """Appends every frame sent and received to a compact binary file"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, "wb", buffering=64 * 1024)
+        self._file.write(MAGIC + HEADER.pack(time.time(), self._start))
+        self.records = 0
+
+    def record_sent(self, frame: bytes, expects_reply: bool = True):
+        """Log a frame written to the port"""
+        self._write(SENT if expects_reply else SENT_NO_REPLY, frame)
+
+    def record_received(self, frame: bytes):
+        """Log a frame read from the port"""
+        self._write(RECEIVED, frame)
+
+    def _write(self, kind: int, frame: bytes):
+        frame = frame[:0xFFFF]
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD.pack(kind, time.monotonic() - self._start, len(frame)))
+            self._file.write(frame)
+            self.records += 1
+
+    def close(self):
+        """Flush and close the file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path: str) -> Tuple[float, List[Tuple[int, float, bytes]]]:
+    """
+    Load a recording.
+
+    Returns:
+        (wall-clock start time, [(kind, seconds since start, frame), ...])
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a ZKBot serial recording")
+
+    offset = len(MAGIC)
+    wall_start, _ = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+
+    records = []
+    while offset + RECORD.size <= len(data):
+        kind, timestamp, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        frame = data[offset:offset + length]
+        if len(frame) < length:
+            break  # truncated tail (recorder still running or crashed)
+        offset += length
+        records.append((kind, timestamp, frame))
+
+    return wall_start, records
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of pre-sorted values"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Per-command count / min / p50 / p90 / p99 / max in seconds"""
+    summary = {}
+    for name, values in sorted(latencies.items()):
+        values = sorted(values)
+        summary[name] = {
+            "count": len(values),
+            "min": values[0],
+            "p50": _percentile(values, 0.50),
+            "p90": _percentile(values, 0.90),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+            "total": sum(values)
+        }
+    return summary
+
+
+def print_latency_summary(summary: Dict[str, Dict[str, float]], title: str = "Latency per command"):
+    """Print a latency table in milliseconds"""
+    print(f"\n{title}")
+    print(f"  {'cmd':6s} {'count':>6s} {'min':>8s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>8s} {'total s':>9s}")
+    for name, s in summary.items():
+        print(f"  {name:6s} {s['count']:6d} {s['min']*1000:8.1f} {s['p50']*1000:8.1f} "
+              f"{s['p90']*1000:8.1f} {s['p99']*1000:8.1f} {s['max']*1000:8.1f} {s['total']:9.2f}")
+
+
+class SessionReplayer:
+    """Analyse a recording or drive its sent frames into a port again"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.wall_start, self.records = read_recording(path)
+
+    def recorded_latencies(self) -> Dict[str, List[float]]:
+        """
+        Match replies to sent frames the way the live reader does (oldest
+        waiting command first; a reply ends at an ok/error frame).
+        """
+        latencies = defaultdict(list)
+        waiting = deque()
+
+        for kind, timestamp, frame in self.records:
+            if kind == SENT:
+                waiting.append((command_name(frame), timestamp))
+            elif kind == RECEIVED and waiting:
+                lowered = frame.lower()
+                if b"ok" in lowered or b"error" in lowered:
+                    name, sent_at = waiting.popleft()
+                    latencies[name].append(timestamp - sent_at)
+
+        return dict(latencies)
+
+    def replay(self, port: str, baudrate: int = 115200, speed: float = 1.0,
+               timeout: float = 5.0) -> Dict[str, List[float]]:
+        """
+        Send the recorded frames to `port` with the original spacing
+        (divided by `speed`) and measure the latency of each reply.
+        """
+        import serial
+        from models.serial_reader import SerialResponseReader
+
+        connection = serial.Serial(port=port, baudrate=baudrate,
+                                   timeout=SerialResponseReader.POLL_INTERVAL, write_timeout=2.0)
+        reader = SerialResponseReader(connection)
+        reader.start()
+
+        latencies = defaultdict(list)
+        outstanding = []
+        start = time.monotonic()
+
+        def on_reply(pending):
+            if pending.frames:
+                latencies[command_name(pending.command)].append(pending.latency)
+
+        try:
+            for kind, timestamp, frame in self.records:
+                if kind == RECEIVED:
+                    continue
+
+                delay = start + timestamp / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+                if kind == SENT:
+                    outstanding.append(reader.expect_reply(frame, timeout, on_reply))
+                connection.write(frame)
+
+            for pending in outstanding:
+                pending.wait(timeout)
+        finally:
+            reader.stop()
+            connection.close()
+
+        return dict(latencies)
+
+
+def main():
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ZKBot serial recording tools")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    report = sub.add_parser("report", help="Per-command latency from a recording")
+    report.add_argument("recording")
+
+    replay = sub.add_parser("replay", help="Replay sent frames into a port or the emulator")
+    replay.add_argument("recording")
+    replay.add_argument("--port", help="Serial port (default: start a local emulator)")
+    replay.add_argument("--baudrate", type=int, default=115200)
+    replay.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+
+    args = parser.parse_args()
+    replayer = SessionReplayer(args.recording)
+    sent = sum(1 for r in replayer.records if r[0] != RECEIVED)
+    duration = replayer.records[-1][1] if replayer.records else 0.0
+    print(f"📼 {args.recording}: {sent} frames sent over {duration:.1f}s")
+
+    if args.action == "report":
+        print_latency_summary(latency_summary(replayer.recorded_latencies()), "Recorded latency per command (ms)")
+        return
+
+    emulator = None
+    port = args.port
+    if not port:
+        from models.zkbot_emulator import ZKBotEmulator
+        emulator = ZKBotEmulator(time_scale=1.0 / args.speed)
+        port = emulator.start()
+        print(f"🤖 Replaying into emulator on {port}")
+
+    try:
+        latencies = replayer.replay(port, args.baudrate, args.speed)
+    finally:
+        if emulator:
+            emulator.stop()
+
+    print_latency_summary(latency_summary(latencies), "Replayed latency per command (ms)")
+
+
+if __name__ == "__main__":
+    main()
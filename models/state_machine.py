@@ -0,0 +1,195 @@
+"""
+state_machine.py
+Table-driven cycle state machine with per-state timing
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from config.constants import SystemState
+
+HISTORY = 500  # durations kept per state / phase
+TERMINAL_STATES = (SystemState.IDLE, SystemState.ERROR, SystemState.EMERGENCY_STOP)
+
+# Cycle phases for reporting, in cycle order
+PHASES = {
+    "wait": (SystemState.WAITING_FOR_CUPS,),
+    "detect": (SystemState.DETECTING,),
+    "inspect": (SystemState.INSPECTING, SystemState.REINSPECTING),
+    "pick": (SystemState.MOVING_TO_PICKUP, SystemState.PICKING_UP),
+    "wash": (SystemState.MOVING_TO_WASH, SystemState.WASHING),
+    "rinse": (SystemState.MOVING_TO_RINSE, SystemState.RINSING),
+    "stack": (SystemState.MOVING_TO_STACK, SystemState.STACKING),
+    "program": (SystemState.RUNNING_PROGRAM,)
+}
+
+
+class StateMachine:
+    """
+    Runs a cycle from a table of states and times every state.
+
+    A table maps each state to a dict with:
+        "action": callable returning True on success (optional)
+        "next":   [(target state, guard or None), ...] - first passing guard wins
+        "error":  message logged when the action fails (optional)
+        "enter" / "exit": hooks called with the state (optional)
+
+    A failing action, or no passing guard, ends the run in ERROR. Reaching
+    IDLE, ERROR or EMERGENCY_STOP ends it. Every state change goes through
+    enter(), also ones made outside a run, so time in each state is
+    recorded whoever sets it.
+    """
+
+    def __init__(self, initial: SystemState = SystemState.IDLE):
+        self._state = initial
+        self._entered_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._table: Dict[SystemState, Dict] = {}
+        self.listeners: List[Callable[[SystemState, SystemState, float], None]] = []
+
+        self.durations: Dict[SystemState, deque] = {}  # seconds per visit
+        self.phase_history: Dict[str, deque] = {phase: deque(maxlen=HISTORY) for phase in PHASES}
+        self.run_times: Dict[SystemState, float] = {}  # seconds per state in the current/last run
+        self.error: Optional[str] = None
+        self._in_run = False
+
+    @property
+    def state(self) -> SystemState:
+        return self._state
+
+    def time_in_state(self) -> float:
+        """Seconds since the current state was entered"""
+        return time.monotonic() - self._entered_at
+
+    def add_listener(self, callback: Callable[[SystemState, SystemState, float], None]):
+        """Call `callback(old, new, seconds in old)` on every state change"""
+        self.listeners.append(callback)
+
+    # ═══════════════════════════════════════════════════════════════
+    # TRANSITIONS
+    # ═══════════════════════════════════════════════════════════════
+
+    def enter(self, state: SystemState):
+        """Switch to `state`, recording how long the previous state lasted"""
+        with self._lock:
+            if state == self._state:
+                return
+            now = time.monotonic()
+            old, seconds = self._state, now - self._entered_at
+            self._state, self._entered_at = state, now
+            self.durations.setdefault(old, deque(maxlen=HISTORY)).append(seconds)
+            if self._in_run:
+                self.run_times[old] = self.run_times.get(old, 0.0) + seconds
+
+        exit_hook = self._table.get(old, {}).get("exit")
+        if exit_hook:
+            exit_hook(old)
+        enter_hook = self._table.get(state, {}).get("enter")
+        if enter_hook:
+            enter_hook(state)
+        for listener in list(self.listeners):
+            listener(old, state, seconds)
+
+    def run(self, table: Dict[SystemState, Dict], start: SystemState) -> bool:
+        """
+        Run a cycle from `start` until a terminal state.
+
+        Returns:
+            True if the cycle reached IDLE; the failure is in `error` otherwise.
+            Exceptions from actions end the run in ERROR and propagate.
+        """
+        self._table = table
+        self.run_times = {}
+        self.error = None
+        self._in_run = True
+        state = start
+
+        try:
+            while state not in TERMINAL_STATES:
+                entry = table[state]
+                self.enter(state)
+
+                action = entry.get("action")
+                if action is not None and not action():
+                    self.error = entry.get("error", f"{state.value} failed")
+                    state = SystemState.ERROR
+                    break
+
+                target = next((target for target, guard in entry.get("next", [])
+                               if guard is None or guard()), None)
+                if target is None:
+                    self.error = f"No transition from {state.value}"
+                    state = SystemState.ERROR
+                    break
+                state = target
+        except Exception as e:
+            self.error = str(e)
+            state = SystemState.ERROR
+            raise
+        finally:
+            self.enter(state)
+            self._in_run = False
+            self._table = {}
+
+        if state == SystemState.IDLE:
+            for phase, seconds in self.phase_times().items():
+                self.phase_history[phase].append(seconds)
+        return state == SystemState.IDLE
+
+    # ═══════════════════════════════════════════════════════════════
+    # TIMING
+    # ═══════════════════════════════════════════════════════════════
+
+    def phase_times(self, run_times: Optional[Dict[SystemState, float]] = None) -> Dict[str, float]:
+        """Seconds per phase (wait, detect, inspect, pick, wash, rinse, stack, program) of the last run"""
+        run_times = self.run_times if run_times is None else run_times
+        times = {phase: sum(run_times.get(state, 0.0) for state in states)
+                 for phase, states in PHASES.items()}
+        return {phase: seconds for phase, seconds in times.items() if seconds > 0}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """count / mean / p50 / p95 / max seconds per phase over recent cycles"""
+        result = {}
+        for phase, history in self.phase_history.items():
+            if not history:
+                continue
+            values = np.array(history)
+            result[phase] = {
+                "count": len(values),
+                "mean": float(values.mean()),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(values.max())
+            }
+        return result
+
+    def histogram(self, phase: str, bins: int = 10) -> Tuple[List[int], List[float]]:
+        """
+        Duration histogram of one phase.
+
+        Returns:
+            (counts, bin edges in seconds)
+        """
+        values = list(self.phase_history.get(phase, []))
+        if not values:
+            return [], []
+        counts, edges = np.histogram(values, bins=bins)
+        return counts.tolist(), edges.tolist()
+
+    def print_report(self, bins: int = 8):
+        """Print per-phase statistics and histograms"""
+        stats = self.stats()
+        if not stats:
+            print("⏱ No completed cycles yet")
+            return
+        total = sum(s["mean"] for s in stats.values())
+        print(f"⏱ Cycle phases ({max(s['count'] for s in stats.values())} cycles, mean {total:.1f}s):")
+        for phase, s in stats.items():
+            print(f"   {phase:8s} mean {s['mean']:6.2f}s  p50 {s['p50']:6.2f}s  p95 {s['p95']:6.2f}s  "
+                  f"max {s['max']:6.2f}s  ({s['mean'] / total * 100:.0f}%)")
+            counts, edges = self.histogram(phase, bins)
+            peak = max(counts) or 1
+            for count, low, high in zip(counts, edges, edges[1:]):
+                if count:
+                    print(f"      {low:6.2f}-{high:6.2f}s {'█' * round(count / peak * 20)} {count}")
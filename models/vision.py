@@ -4,6 +4,7 @@ Computer Vision System - YOLOv8 Object Detection
 import cv2
 import numpy as np
 from typing import Optional, Dict, List, Tuple
+import threading
 import time
 
 try:
@@ -16,25 +17,47 @@ except ImportError:
 class VisionSystem:
     """Computer vision for cup detection and tracking"""
     
-    def __init__(self, model_path="runs/detect/train/weights/best.pt"):
+    def __init__(self, model_path="runs/detect/train/weights/best.pt", detector=None):
+        """
+        Args:
+            model_path: YOLOv8 weights
+            detector: Shared inference client with detect(frame, conf, iou) -> boxes;
+                no model is loaded in this process when given
+        """
         self.model = None
+        self.detector = detector
         self.camera = None
         self.is_running = False
         self.current_frame = None
         self.detections = []
         self.annotated_frame = None
         
+        # Neither cv2.VideoCapture nor the YOLO model is thread-safe; the
+        # cycle thread, PickupWatcher and the UI camera thread share them
+        self._camera_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        
         # Detection stability tracking
         self.stable_count = 0
         self.stable_frames_required = 8
         self.last_detection_time = 0.0
         self.detection_cooldown = 0.5  # seconds
+        self.last_evaluated = 0.0  # monotonic time of the last detect_cup_stable
+        
+        # Latched pickup detection: the first stable detection is held for
+        # the next cycle until taken, or until the cup disappears
+        self.latched_cup: Optional[Dict] = None
+        self.latch_armed = False
+        self._latch_lock = threading.Lock()
+        self._latch_event = threading.Event()
         
         # Detection thresholds
         self.conf_threshold = 0.85  # Increased from 0.6 to reduce false positives
         self.iou_threshold = 0.5   # Match test file
         
-        if YOLO_AVAILABLE:
+        if detector is not None:
+            print("✓ Vision system using the shared inference service")
+        elif YOLO_AVAILABLE:
             try:
                 self.model = YOLO(model_path)
                 print(f"✓ Vision system initialized with {model_path}")
@@ -69,26 +92,34 @@ class VisionSystem:
         """Stop camera"""
         self.is_running = False
         if self.camera:
-            self.camera.release()
+            with self._camera_lock:
+                self.camera.release()
             print("✓ Camera stopped")
     
     def capture_frame(self) -> Optional[np.ndarray]:
         """Get frame from camera"""
-        if self.camera and self.camera.isOpened():
-            ret, frame = self.camera.read()
-            if ret:
-                self.current_frame = frame
-                return frame
+        with self._camera_lock:
+            if self.camera and self.camera.isOpened():
+                ret, frame = self.camera.read()
+                if ret:
+                    self.current_frame = frame
+                    return frame
         return None
     
     def detect_objects(self, frame: np.ndarray, conf_threshold: Optional[float] = None) -> List:
         """Run YOLOv8 detection with configurable threshold"""
+        if self.detector is not None:
+            self.detections = self.detector.detect(frame, conf_threshold or self.conf_threshold,
+                                                   self.iou_threshold)
+            return self.detections
+        
         if not self.model or not YOLO_AVAILABLE:
             return []
         
         try:
             conf = conf_threshold or self.conf_threshold
-            results = self.model(frame, conf=conf, iou=self.iou_threshold, verbose=False)
+            with self._model_lock:
+                results = self.model(frame, conf=conf, iou=self.iou_threshold, verbose=False)
             self.detections = results[0].boxes.data.cpu().numpy() if results[0].boxes is not None else []
             return self.detections
         except Exception as e:
@@ -131,10 +162,18 @@ class VisionSystem:
         """
         cup_position = self.get_cup_position(frame)
         
-        if cup_position is not None:
-            self.stable_count += 1
-        else:
-            self.stable_count = 0
+        with self._latch_lock:
+            self.last_evaluated = time.monotonic()
+            if cup_position is not None:
+                self.stable_count += 1
+                if self.latch_armed and self.latched_cup is None and self.is_stable_detection():
+                    self.latched_cup = dict(cup_position, time=self.last_evaluated,
+                                            stable_count=self.stable_count)
+                    self._latch_event.set()
+            else:
+                self.stable_count = 0
+                self.latched_cup = None  # cup gone (or never settled)
+                self._latch_event.clear()
         
         return cup_position is not None, self.stable_count
     
@@ -147,6 +186,52 @@ class VisionSystem:
         self.stable_count = 0
         self.last_detection_time = time.time()
     
+    def arm_latch(self):
+        """
+        Start latching stable detections again, counting from zero - call
+        once the arm has left the pickup area.
+        """
+        with self._latch_lock:
+            if self.latch_armed:
+                return
+            self.latch_armed = True
+            self.stable_count = 0
+            self.latched_cup = None
+            self._latch_event.clear()
+    
+    def disarm_latch(self):
+        """Stop latching and drop any latched detection"""
+        with self._latch_lock:
+            self.latch_armed = False
+            self.latched_cup = None
+            self._latch_event.clear()
+    
+    def take_latched_cup(self, timeout: float, conf_threshold: Optional[float] = None) -> Optional[Dict]:
+        """
+        Wait up to `timeout` seconds for a latched stable detection and
+        take it. The latch stays disarmed until arm_latch(), so the cup
+        being picked is not reported again.
+        
+        Returns:
+            Cup position with "time" (when it latched), or None
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._latch_lock:
+                cup = self.latched_cup
+                if cup and cup["confidence"] >= (conf_threshold or 0.0):
+                    self.latch_armed = False
+                    self.latched_cup = None
+                    self._latch_event.clear()
+                    return cup
+                if cup:
+                    self.latched_cup = None  # too weak for this caller - latch a better one
+                    self._latch_event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self._latch_event.wait(remaining)
+    
     def detect_dirt(self, frame: np.ndarray, roi: tuple = None) -> Dict:
         """Estimate cup cleanliness (simple color-based method)"""
         if roi:
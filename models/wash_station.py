@@ -3,8 +3,34 @@
 Wash Station Controller
 Manages brush motor, water pump, and washing logic
 """
+import threading
 import time
-from typing import Optional
+from concurrent.futures import CancelledError, Future
+from typing import Callable, List, Optional
+
+
+class StationCycle(Future):
+    """
+    Handle of a running wash or rinse.
+    
+    Completes with True when its timer expires; cancelled when the
+    station is stopped early. Use done(), result(timeout),
+    add_done_callback() and remaining() like any Future.
+    """
+    
+    def __init__(self, kind: str, duration: float):
+        super().__init__()
+        self.kind = kind  # "wash" or "rinse"
+        self.duration = duration
+        self.started_at = time.monotonic()
+        self.ends_at = self.started_at + duration
+    
+    def remaining(self) -> float:
+        """Seconds until the timer expires (0 once finished or cancelled)"""
+        if self.done():
+            return 0.0
+        return max(0.0, self.ends_at - time.monotonic())
+
 
 class WashStationController:
     """Control wash station hardware (motors, pumps, sensors)"""
@@ -20,9 +46,22 @@ class WashStationController:
         
         self.total_wash_time = 0.0
         self.cycles_completed = 0
+        
+        # Running cycles and their timers
+        self.wash_cycle: Optional[StationCycle] = None
+        self.rinse_cycle: Optional[StationCycle] = None
+        self._timers = {}
+        self._lock = threading.Lock()
+        self.completion_callbacks: List[Callable[[StationCycle], None]] = []
     
-    def start_washing(self, wash_time: int = 10, brush_speed: int = 150):
-        """Start washing cycle"""
+    def start_washing(self, wash_time: int = 10, brush_speed: int = 150) -> StationCycle:
+        """
+        Start washing cycle; returns at once.
+        
+        Returns:
+            StationCycle that completes when wash_time has elapsed
+        """
+        self._cancel("wash")
         self.wash_duration = wash_time
         self.brush_speed = brush_speed
         self.is_washing = True
@@ -34,23 +73,34 @@ class WashStationController:
         # self.set_brush_motor_pwm(brush_speed)
         # self.set_water_pump_pwm(self.water_flow)
         
-        return True
+        self.wash_cycle = self._start_timer("wash", wash_time)
+        return self.wash_cycle
     
     def stop_washing(self):
-        """Stop washing cycle"""
-        self.is_washing = False
-        self.brush_speed = 0
+        """Stop washing cycle (cancels a running wash)"""
+        self._cancel("wash")
+        self._wash_off()
         
         print("🛑 Washing stopped")
         
+        return True
+    
+    def _wash_off(self):
+        self.is_washing = False
+        self.brush_speed = 0
+        
         # TODO: Stop motors
         # self.set_brush_motor_pwm(0)
         # self.set_water_pump_pwm(0)
-        
-        return True
     
-    def start_rinsing(self, rinse_time: int = 5):
-        """Start rinse cycle"""
+    def start_rinsing(self, rinse_time: int = 5) -> StationCycle:
+        """
+        Start rinse cycle; returns at once.
+        
+        Returns:
+            StationCycle that completes when rinse_time has elapsed
+        """
+        self._cancel("rinse")
         self.rinse_duration = rinse_time
         self.is_rinsing = True
         
@@ -59,18 +109,83 @@ class WashStationController:
         # TODO: Control water pump for rinsing (no brush)
         # self.set_water_pump_pwm(self.water_flow)
         
-        return True
+        self.rinse_cycle = self._start_timer("rinse", rinse_time)
+        return self.rinse_cycle
     
     def stop_rinsing(self):
-        """Stop rinse cycle"""
-        self.is_rinsing = False
+        """Stop rinse cycle (cancels a running rinse)"""
+        self._cancel("rinse")
+        self._rinse_off()
         
         print("💧 Rinsing stopped")
         
+        return True
+    
+    def _rinse_off(self):
+        self.is_rinsing = False
+        
         # TODO: Stop water pump
         # self.set_water_pump_pwm(0)
-        
-        return True
+    
+    # ═══════════════════════════════════════════════════════════════
+    # TIMERS
+    # ═══════════════════════════════════════════════════════════════
+    
+    def _start_timer(self, kind: str, duration: float) -> StationCycle:
+        cycle = StationCycle(kind, duration)
+        for callback in self.completion_callbacks:
+            cycle.add_done_callback(callback)
+        
+        timer = threading.Timer(max(0.0, duration), self._finish, args=(cycle,))
+        timer.daemon = True
+        with self._lock:
+            self._timers[kind] = timer
+        timer.start()
+        return cycle
+    
+    def _finish(self, cycle: StationCycle):
+        """Timer expired: switch the hardware off and complete the handle"""
+        with self._lock:
+            current = self.wash_cycle if cycle.kind == "wash" else self.rinse_cycle
+            if cycle is not current or not cycle.set_running_or_notify_cancel():
+                return  # stopped or replaced meanwhile
+            self._timers.pop(cycle.kind, None)
+        
+        if cycle.kind == "wash":
+            self._wash_off()
+            self.total_wash_time += cycle.duration
+            self.cycles_completed += 1
+            print("✓ Washing done")
+        else:
+            self._rinse_off()
+            print("✓ Rinsing done")
+        cycle.set_result(True)
+    
+    def _cancel(self, kind: str):
+        """Cancel the running cycle of one kind, if any"""
+        with self._lock:
+            timer = self._timers.pop(kind, None)
+            cycle = self.wash_cycle if kind == "wash" else self.rinse_cycle
+            if timer:
+                timer.cancel()
+            if cycle is not None:
+                cycle.cancel()  # no-op once completed
+    
+    def add_completion_callback(self, callback: Callable[[StationCycle], None]):
+        """Call `callback(cycle)` whenever a wash or rinse completes or is cancelled"""
+        self.completion_callbacks.append(callback)
+    
+    def remove_completion_callback(self, callback: Callable[[StationCycle], None]):
+        if callback in self.completion_callbacks:
+            self.completion_callbacks.remove(callback)
+    
+    def wash_remaining(self) -> float:
+        """Seconds left in the running wash"""
+        return self.wash_cycle.remaining() if self.wash_cycle else 0.0
+    
+    def rinse_remaining(self) -> float:
+        """Seconds left in the running rinse"""
+        return self.rinse_cycle.remaining() if self.rinse_cycle else 0.0
     
     def set_brush_speed(self, speed: int):
         """Set brush motor speed (0-255)"""
@@ -90,30 +205,28 @@ class WashStationController:
             # self.set_water_pump_pwm(self.water_flow)
             pass
     
-    def execute_wash_cycle(self, duration: int) -> bool:
-        """Complete washing cycle with timing"""
-        self.start_washing(duration, self.brush_speed)
-        time.sleep(duration)
-        self.stop_washing()
-        
-        self.total_wash_time += duration
-        self.cycles_completed += 1
-        
-        return True
+    def execute_wash_cycle(self, duration: float, brush_speed: Optional[int] = None) -> bool:
+        """Complete washing cycle, blocking until done (False if stopped early)"""
+        return self._wait(self.start_washing(duration, brush_speed or self.brush_speed))
     
     def execute_rinse_cycle(self, duration: int) -> bool:
-        """Complete rinse cycle with timing"""
-        self.start_rinsing(duration)
-        time.sleep(duration)
-        self.stop_rinsing()
-        
-        return True
+        """Complete rinse cycle, blocking until done (False if stopped early)"""
+        return self._wait(self.start_rinsing(duration))
+    
+    @staticmethod
+    def _wait(cycle: StationCycle) -> bool:
+        try:
+            return cycle.result()
+        except CancelledError:
+            return False
     
     def get_status(self) -> dict:
         """Get wash station status"""
         return {
             "is_washing": self.is_washing,
             "is_rinsing": self.is_rinsing,
+            "wash_remaining": self.wash_remaining(),
+            "rinse_remaining": self.rinse_remaining(),
             "brush_speed": self.brush_speed,
             "water_flow": self.water_flow,
             "total_wash_time": self.total_wash_time,
@@ -0,0 +1,336 @@
+"""
+zkbot_emulator.py
+Pseudo-terminal ZKBot emulator with a motion timing model
+
+Opens a pty that speaks the 0x550xAA ... 0xAA0x55 framing, so
+ZKBotController can connect to it like to the real arm on COM3.
+Motion time follows the trapezoidal MotionModel (distance, feedrate,
+acceleration); moves are accepted into a planner buffer of limited
+depth and acked after `reply_latency`. POSIX only (Linux/macOS).
+
+Usage:
+    python -m models.zkbot_emulator [--time-scale 0.1] [--latency 0.002]
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+import select
+import threading
+import time
+from collections import deque, Counter
+from typing import Dict, List, Optional, Tuple
+from models.motion_model import MotionModel
+
+FRAME_HEADER = b"0x550xAA"
+FRAME_TRAILER = b"0xAA0x55"
+WORD_PATTERN = re.compile(r"([A-Z])(-?\d+(?:\.\d+)?)")
+
+HOMING_FEEDRATE = 300
+
+
+class _Segment:
+    """One queued move"""
+
+    def __init__(self, start: Dict[str, float], target: Dict[str, float],
+                 feedrate: float, duration: float):
+        self.start = start
+        self.target = target
+        self.feedrate = feedrate
+        self.duration = duration
+        self.distance = MotionModel.distance(start, target)
+        self.begin_at: Optional[float] = None  # set when it reaches the head
+        self.reply: Optional[bytes] = None     # sent on completion (G28)
+
+
+class ZKBotEmulator:
+    """Simulated ZKBot controller behind a pseudo-terminal"""
+
+    def __init__(self, motion_model: Optional[MotionModel] = None,
+                 reply_latency: float = 0.002, planner_depth: int = 8,
+                 time_scale: float = 1.0):
+        """
+        Args:
+            motion_model: Timing model for moves (default MotionModel())
+            reply_latency: Seconds between receiving a frame and replying
+            planner_depth: Moves the controller buffers before it stops acking
+            time_scale: Multiplier on all simulated durations (0.1 = 10x faster)
+        """
+        self.motion_model = motion_model or MotionModel()
+        self.reply_latency = reply_latency
+        self.planner_depth = planner_depth
+        self.time_scale = time_scale
+
+        self.position = {"x": 0.0, "y": 0.0, "z": 0.0}
+        self.pump_on = False
+        self.gripper_angle = 0
+        self.estop = False
+
+        self.commands_received = Counter()
+        self.moves_completed = 0
+        self.busy_time = 0.0
+
+        self._planner: deque = deque()
+        self._backlog: deque = deque()   # moves waiting for planner space (ack deferred)
+        self._replies: List[Tuple[float, bytes]] = []
+        self._rx = bytearray()
+        self._lock = threading.Lock()
+        self._master_fd: Optional[int] = None
+        self._slave_fd: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.port: Optional[str] = None
+
+    # ═══════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════
+
+    def start(self) -> str:
+        """Open the pty and start serving; returns the port name to connect to"""
+        import pty
+        import tty
+
+        self._master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ZKBotEmulator", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """Stop serving and close the pty"""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for fd in (self._master_fd, self._slave_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master_fd = self._slave_fd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ═══════════════════════════════════════════════════════════════
+    # STATE
+    # ═══════════════════════════════════════════════════════════════
+
+    def current_position(self) -> Dict[str, float]:
+        """Interpolated arm position right now"""
+        with self._lock:
+            return self._position_at(time.monotonic())
+
+    def is_moving(self) -> bool:
+        """True while queued motion remains"""
+        with self._lock:
+            self._advance(time.monotonic())
+            return bool(self._planner or self._backlog)
+
+    def get_stats(self) -> Dict:
+        """Counters for benchmarks"""
+        return {
+            "commands": dict(self.commands_received),
+            "moves_completed": self.moves_completed,
+            "busy_time": self.busy_time,
+            "position": self.current_position()
+        }
+
+    # ═══════════════════════════════════════════════════════════════
+    # SERVER LOOP
+    # ═══════════════════════════════════════════════════════════════
+
+    def _run(self):
+        """Read frames, advance motion, send due replies"""
+        while self._running:
+            timeout = 0.001 if (self._replies or self._planner or self._backlog) else 0.01
+            try:
+                readable, _, _ = select.select([self._master_fd], [], [], timeout)
+                if readable:
+                    self._rx.extend(os.read(self._master_fd, 1024))
+            except OSError:
+                break
+
+            now = time.monotonic()
+            with self._lock:
+                while True:
+                    end = self._rx.find(FRAME_TRAILER)
+                    if end < 0:
+                        break
+                    frame = bytes(self._rx[:end + len(FRAME_TRAILER)])
+                    del self._rx[:end + len(FRAME_TRAILER)]
+                    self._handle_frame(frame, now)
+
+                self._advance(now)
+                due = [r for r in self._replies if r[0] <= now]
+                self._replies = [r for r in self._replies if r[0] > now]
+
+            for _, data in sorted(due, key=lambda r: r[0]):  # stable: keeps reply order
+                try:
+                    os.write(self._master_fd, data)
+                except OSError:
+                    self._running = False
+
+    def _reply(self, now: float, text: str, delay: float = 0.0):
+        """Queue a reply line"""
+        self._replies.append((now + delay + self.reply_latency * self.time_scale,
+                              text.encode("ascii") + b"\r\n"))
+
+    def _handle_frame(self, frame: bytes, now: float):
+        """Execute one command frame"""
+        text = frame.replace(FRAME_HEADER, b"").replace(FRAME_TRAILER, b"").decode("ascii", "ignore").strip()
+        if not text:
+            return
+
+        gcode = text.split()[0].upper()
+        words = {k: float(v) for k, v in WORD_PATTERN.findall(text[len(gcode):].upper())}
+        self.commands_received[gcode] += 1
+
+        if gcode == "M112":
+            # Emergency stop - freeze where we are, drop everything, no reply
+            self.position = self._position_at(now)
+            self._planner.clear()
+            self._backlog.clear()
+            self._replies.clear()
+            self.estop = True
+            return
+
+        if gcode == "M999":
+            self.estop = False
+            self._reply(now, "ok")
+            return
+
+        if gcode == "M122":
+            self._reply(now, "error: estop active" if self.estop else "ok estop:0")
+            return
+
+        if gcode == "P01":
+            pos = self._position_at(now)
+            self._reply(now, f"X:{pos['x']:.2f} Y:{pos['y']:.2f} Z:{pos['z']:.2f}")
+            self._reply(now, "ok")
+            return
+
+        if self.estop:
+            self._reply(now, "error: estop active")
+            return
+
+        if gcode in ("G00", "G01"):
+            self._backlog.append((words, None))
+            self._advance(now)
+        elif gcode == "G28":
+            # Homing completes before the controller answers
+            self._backlog.append(({"X": 0.0, "Y": 0.0, "Z": 0.0, "F": HOMING_FEEDRATE}, "ok"))
+            self._advance(now)
+        elif gcode == "G06":
+            self.gripper_angle = int(words.get("A", self.gripper_angle))
+            self._reply(now, "ok")
+        elif gcode == "M03":
+            self.pump_on = True
+            self._reply(now, "ok")
+        elif gcode == "M05":
+            self.pump_on = False
+            self._reply(now, "ok")
+        else:
+            self._reply(now, f"error: unknown command {gcode}")
+
+    # ═══════════════════════════════════════════════════════════════
+    # MOTION
+    # ═══════════════════════════════════════════════════════════════
+
+    def _advance(self, now: float):
+        """Retire finished segments and admit backlog into the planner"""
+        while self._planner:
+            segment = self._planner[0]
+            if segment.begin_at is None:
+                segment.begin_at = now
+            end = segment.begin_at + segment.duration
+            if end > now:
+                break
+
+            self._planner.popleft()
+            self.position = dict(segment.target)
+            self.moves_completed += 1
+            self.busy_time += segment.duration
+            if segment.reply:
+                self._reply(end, segment.reply)
+            if self._planner:
+                self._planner[0].begin_at = end
+
+        while self._backlog and len(self._planner) < self.planner_depth:
+            words, completion_reply = self._backlog.popleft()
+            start = dict(self._planner[-1].target) if self._planner else dict(self.position)
+            target = {
+                "x": words.get("X", start["x"]),
+                "y": words.get("Y", start["y"]),
+                "z": words.get("Z", start["z"])
+            }
+            feedrate = words.get("F", 100)
+            duration = self.motion_model.estimate_move_time(start, target, feedrate) * self.time_scale
+
+            segment = _Segment(start, target, feedrate, duration)
+            if not self._planner:
+                segment.begin_at = now
+            segment.reply = completion_reply
+            self._planner.append(segment)
+
+            if completion_reply is None:
+                self._reply(now, "ok")  # accepted into planner
+
+    def _position_at(self, now: float) -> Dict[str, float]:
+        """Interpolate along the executing segment"""
+        self._advance(now)
+        if not self._planner or self._planner[0].begin_at is None:
+            return dict(self.position)
+
+        segment = self._planner[0]
+        if segment.distance <= 0:
+            return dict(segment.target)
+
+        elapsed = (now - segment.begin_at) / self.time_scale
+        covered = self.motion_model.distance_at(segment.distance, segment.feedrate, elapsed)
+        fraction = min(1.0, covered / segment.distance)
+        return {
+            axis: segment.start[axis] + (segment.target[axis] - segment.start[axis]) * fraction
+            for axis in ("x", "y", "z")
+        }
+
+
+def main():
+    """Run emulator until Ctrl+C"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ZKBot pseudo-terminal emulator")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Duration multiplier (0.1 = 10x faster)")
+    parser.add_argument("--latency", type=float, default=0.002, help="Reply latency in seconds")
+    parser.add_argument("--planner-depth", type=int, default=8, help="Planner buffer depth")
+    args = parser.parse_args()
+
+    emulator = ZKBotEmulator(reply_latency=args.latency, planner_depth=args.planner_depth,
+                             time_scale=args.time_scale)
+    port = emulator.start()
+    print(f"🤖 ZKBot emulator listening on {port}")
+    print("   Press Ctrl+C to stop")
+
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+        print(f"✓ Emulator stopped - {emulator.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
 from data.storage import DataStorage
+from utils.validators import Validators
 import json
 import time
 from datetime import datetime
@@ -27,6 +28,7 @@ class DeveloperPage(QWidget):
     
     # Signals
     back_to_user_mode = pyqtSignal()
+    position_updated = pyqtSignal(dict)  # from the position monitor thread
     
     def __init__(self, controller):
         super().__init__()
@@ -37,6 +39,8 @@ class DeveloperPage(QWidget):
         
         self.initUI()
         self.load_programs_list()
+        
+        self.position_updated.connect(self.show_position)
     
     def initUI(self):
         """Initialize developer UI - COMPACT VERSION"""
@@ -179,6 +183,11 @@ class DeveloperPage(QWidget):
         self.step_table.setMaximumHeight(200)
         layout.addWidget(self.step_table)
         
+        # Predicted run time of the program being edited
+        self.estimate_label = QLabel("Estimated time: --")
+        self.estimate_label.setStyleSheet("color: #8b949e; font-size: 11px;")
+        layout.addWidget(self.estimate_label)
+        
         # Step editor form - COMPACT GRID
         editor_group = QGroupBox("Add/Edit Step")
         editor_layout = QGridLayout()
@@ -440,6 +449,12 @@ class DeveloperPage(QWidget):
         update_pos_btn.clicked.connect(self.update_current_position)
         pos_btn_layout.addWidget(update_pos_btn, 0, 1)
         
+        self.live_pos_btn = QPushButton("📡 Live")
+        self.live_pos_btn.setToolTip("Stream the robot position continuously")
+        self.live_pos_btn.setCheckable(True)
+        self.live_pos_btn.toggled.connect(self.on_live_position_toggled)
+        pos_btn_layout.addWidget(self.live_pos_btn, 2, 0, 1, 2)
+        
         overwrite_btn = QPushButton("✏️ Overwrite")
         overwrite_btn.setToolTip("Overwrite selected position with current position")
         overwrite_btn.clicked.connect(self.on_overwrite_position)
@@ -510,6 +525,9 @@ class DeveloperPage(QWidget):
             QMessageBox.warning(self, "Warning", "Program has no steps!")
             return
         
+        if not self.confirm_program_valid("Save anyway?"):
+            return
+        
         program_data = {
             "name": program_name,
             "description": f"Program created on {datetime.now().strftime('%Y-%m-%d %H:%M')}",
@@ -518,6 +536,7 @@ class DeveloperPage(QWidget):
         }
         
         if DataStorage.save_program(program_name, program_data):
+            self.controller.program_cache.invalidate(program_name)
             self.current_program_name = program_name
             self.load_programs_list()
             print(f"✓ Program '{program_name}' saved")
@@ -525,6 +544,18 @@ class DeveloperPage(QWidget):
         else:
             QMessageBox.critical(self, "Error", "Failed to save program")
     
+    def confirm_program_valid(self, question: str) -> bool:
+        """Show validation problems of the current program; True to continue"""
+        valid, errors, warnings = Validators.validate_program(self.current_program, self.controller.positions)
+        if valid and not warnings:
+            return True
+        
+        problems = [f"❌ {e}" for e in errors] + [f"⚠ {w}" for w in warnings]
+        reply = QMessageBox.question(self, "Program Check",
+                                     "\n".join(problems[:15]) + f"\n\n{question}",
+                                     QMessageBox.Yes | QMessageBox.No)
+        return reply == QMessageBox.Yes
+    
     def on_load_program(self):
         """Load selected program"""
         selected = self.program_list.currentItem()
@@ -548,6 +579,7 @@ class DeveloperPage(QWidget):
         
         if reply == QMessageBox.Yes:
             if DataStorage.delete_program(program_name):
+                self.controller.program_cache.invalidate(program_name)
                 self.load_programs_list()
                 print(f"✓ Program '{program_name}' deleted")
                 QMessageBox.information(self, "Success", "Program deleted")
@@ -732,6 +764,14 @@ class DeveloperPage(QWidget):
             self.step_table.setItem(i, 5, QTableWidgetItem(str(step.get('feedrate', 100))))
             self.step_table.setItem(i, 6, QTableWidgetItem(f"{step.get('angle', 90)}°"))
             self.step_table.setItem(i, 7, QTableWidgetItem(f"{step.get('pause', 0):.1f}"))
+        
+        if self.current_program:
+            estimate = self.controller.duration_estimator.estimate_program(self.current_program)
+            self.estimate_label.setText(
+                f"Estimated time: {estimate['total']:.1f}s "
+                f"(motion {estimate['motion']:.1f}s, pauses {estimate['pauses']:.1f}s)")
+        else:
+            self.estimate_label.setText("Estimated time: --")
     
     def debug_show_program(self):
         """Debug: Show current program in console"""
@@ -751,6 +791,12 @@ class DeveloperPage(QWidget):
             QMessageBox.warning(self, "Warning", "No steps to execute")
             return
         
+        valid, errors, _ = Validators.validate_program(self.current_program, self.controller.positions)
+        if not valid:
+            QMessageBox.critical(self, "Invalid Program",
+                                 "Program cannot run:\n\n" + "\n".join(errors[:15]))
+            return
+        
         reply = QMessageBox.question(self, "Confirm",
                                     f"Execute program with {len(self.current_program)} steps?\n\n"
                                     "Make sure the robot has clear workspace!",
@@ -762,77 +808,11 @@ class DeveloperPage(QWidget):
                 print(f"🧪 TESTING PROGRAM: {len(self.current_program)} steps")
                 print("="*60)
                 
-                for i, step in enumerate(self.current_program):
-                    print(f"\n--- Step {i+1}/{len(self.current_program)} ---")
-                    print(f"Command: {step}")
-                    
-                    cmd = step.get("cmd", "G01")
-                    
-                    if cmd in ["G00", "G01"]:
-                        # Movement command
-                        x = step.get("x", 0.0)
-                        y = step.get("y", 0.0)
-                        z = step.get("z", 0.0)
-                        feedrate = step.get("feedrate", 100)
-                        
-                        print(f"Moving to: X={x:.2f}, Y={y:.2f}, Z={z:.2f}, F={feedrate}")
-                        
-                        if cmd == "G00":
-                            success, response = self.controller.robot.move_point_to_point(
-                                x, y, z, feedrate
-                            )
-                        else:
-                            success, response = self.controller.robot.move_linear(
-                                x, y, z, feedrate
-                            )
-                        
-                        if not success:
-                            error_msg = f"Step {i+1} movement failed: {response}"
-                            print(f"❌ {error_msg}")
-                            QMessageBox.critical(self, "Error", error_msg)
-                            return
-                        
-                        print(f"✓ Movement complete")
-                        time.sleep(1.0)
-                        
-                    elif cmd == "GRIPPER":
-                        # Gripper with angle control
-                        angle = step.get("angle", 90)
-                        print(f"Setting gripper to {angle}°...")
-    
-                        cmd_str = f"0x550xAA G06 D7 S1 A{angle} 0xAA0x55"
-                        success, response = self.controller.robot.send_command(cmd_str)
-    
-                        # FIXED: Accept both "ok" and successful send
-                        if success or "ok" in response.lower():
-                            print(f"✓ Gripper set to {angle}°")
-                            time.sleep(0.5)
-                        else:
-                            # Don't fail on gripper - just warn
-                            print(f"⚠ Gripper response: {response}")
-                            time.sleep(0.5)
-
-                        
-                    elif cmd == "PUMP_ON":
-                        print("Activating pump...")
-                        self.controller.robot.pump_on()
-                        time.sleep(0.5)
-                        
-                    elif cmd == "PUMP_OFF":
-                        print("Deactivating pump...")
-                        self.controller.robot.pump_off()
-                        time.sleep(0.5)
-                    
-                    elif cmd == "WAIT":
-                        pause = step.get("pause", 1.0)
-                        print(f"Waiting for {pause}s...")
-                        time.sleep(pause)
-                    
-                    # Step pause (additional delay after command)
-                    pause = step.get("pause", 0.0)
-                    if pause > 0 and cmd != "WAIT":
-                        print(f"Pausing for {pause}s...")
-                        time.sleep(pause)
+                if not self.controller.test_program(self.current_program):
+                    error_msg = self.controller.error_log[-1] if self.controller.error_log else "Test failed"
+                    print(f"❌ {error_msg}")
+                    QMessageBox.critical(self, "Error", error_msg)
+                    return
                 
                 print("\n" + "="*60)
                 print("✅ PROGRAM TEST COMPLETE!")
@@ -867,7 +847,7 @@ class DeveloperPage(QWidget):
             elif axis == "z":
                 success, _ = self.controller.robot.move_offset(0, 0, distance, feedrate=50)
             
-            time.sleep(0.3)
+            self.controller.robot.wait_motion_done()
             self.update_current_position()
         except Exception as e:
             print(f"❌ Jog error: {e}")
@@ -879,8 +859,7 @@ class DeveloperPage(QWidget):
         print(f"Setting gripper to {angle}°...")
         
         try:
-            cmd_str = f"0x550xAA G06 D7 S1 A{angle} 0xAA0x55"
-            success, response = self.controller.robot.send_command(cmd_str)
+            success, response = self.controller.robot.set_gripper_angle(angle)
             
             if "ok" in response.lower():
                 print(f"✓ Gripper set to {angle}°")
@@ -915,18 +894,36 @@ class DeveloperPage(QWidget):
         """Update current position display"""
         try:
             pos = self.controller.robot.get_position()
-            if pos:
-                self.current_pos_label.setText(
-                    f"X: {pos['x']:.2f}  Y: {pos['y']:.2f}  Z: {pos['z']:.2f}"
-                )
-            else:
-                pos = self.controller.robot.current_position
-                self.current_pos_label.setText(
-                    f"X: {pos['x']:.2f}  Y: {pos['y']:.2f}  Z: {pos['z']:.2f}"
-                )
+            self.show_position(pos or self.controller.robot.current_position)
         except Exception as e:
             print(f"⚠ Position update error: {e}")
     
+    def show_position(self, pos: dict):
+        """Show a position in the position display"""
+        self.current_pos_label.setText(
+            f"X: {pos['x']:.2f}  Y: {pos['y']:.2f}  Z: {pos['z']:.2f}"
+        )
+    
+    def on_live_position_toggled(self, enabled: bool):
+        """Start or stop live position updates"""
+        monitor = self.controller.position_monitor
+        if enabled:
+            monitor.add_callback(self._on_monitor_position)
+            monitor.start()
+            print(f"📡 Live position at {monitor.rate_hz:g} Hz")
+        else:
+            monitor.remove_callback(self._on_monitor_position)
+            monitor.stop()
+    
+    def _on_monitor_position(self, pos: dict):
+        """Monitor thread callback - hand the reading to the GUI thread"""
+        self.position_updated.emit(pos)
+    
+    def hideEvent(self, event):
+        """Stop live updates when leaving developer mode"""
+        self.live_pos_btn.setChecked(False)
+        super().hideEvent(event)
+    
     def on_save_position(self):
         """Save current position"""
         pos_name = self.position_name_input.text().strip()
@@ -999,7 +996,7 @@ class DeveloperPage(QWidget):
         try:
             success = self.controller.move_to(pos_name)
             if success:
-                time.sleep(0.5)
+                self.controller.robot.wait_motion_done()
                 self.update_current_position()
                 print(f"✓ Moved to '{pos_name}'")
             else:
@@ -12,7 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QSpinBox, QComboBox, QSlider,
                              QProgressBar, QGroupBox, QGridLayout, QTextEdit,
-                             QFrame, QMessageBox)
+                             QFrame, QMessageBox, QCheckBox)
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread
 from PyQt5.QtGui import QFont, QImage, QPixmap
 from config.constants import WashingMode
@@ -421,11 +421,18 @@ class UserInterface(QWidget):
         self.mode_combo.addItems([
             "Single Cycle (1 cup)",
             "Fixed Count (Custom)",
-            "Infinite (Continuous)"
+            "Infinite (Continuous)",
+            "Batch (cups per station cycle)"
         ])
         self.mode_combo.currentIndexChanged.connect(self.on_mode_changed)
         mode_layout.addWidget(self.mode_combo)
         
+        # Pipelined: built-in sequence with wash, rinse and arm moves overlapped (no program)
+        self.pipelined_check = QCheckBox("Pipelined (built-in sequence, overlaps wash/rinse)")
+        self.pipelined_check.setChecked(self.controller.pipelined)
+        self.pipelined_check.toggled.connect(self.on_pipelined_changed)
+        mode_layout.addWidget(self.pipelined_check)
+        
         # Target cups
         target_layout = QHBoxLayout()
         target_layout.addWidget(QLabel("Target Cups:"))
@@ -609,7 +616,11 @@ class UserInterface(QWidget):
     
     def on_mode_changed(self, index):
         """Handle mode change"""
-        self.target_cups_spin.setEnabled(index == 1)  # Enable only for Fixed Count
+        self.target_cups_spin.setEnabled(index in (1, 3))  # Fixed Count and Batch
+    
+    def on_pipelined_changed(self, checked):
+        """Handle pipelined toggle"""
+        self.controller.pipelined = checked
     
     def on_arm_speed_changed(self, value):
         """Handle arm speed change"""
@@ -628,33 +639,36 @@ class UserInterface(QWidget):
     
     def on_start_washing(self):
         """Start washing operation"""
-        # Check if program is selected
-        if not self.selected_program:
-            QMessageBox.warning(self, "No Program",
-                              "Please select a washing program first!\n\n"
-                              "Go to Developer Mode to create a program.")
-            return
-        
-        # Verify program exists
-        program_data = DataStorage.load_program(self.selected_program)
-        if not program_data:
-            QMessageBox.critical(self, "Error",
-                               f"Program '{self.selected_program}' not found!\n"
-                               "Please refresh the program list.")
-            return
-        
         # Get mode
         mode_index = self.mode_combo.currentIndex()
-        modes = [WashingMode.SINGLE_CYCLE, WashingMode.FIXED_COUNT, WashingMode.INFINITE]
+        modes = [WashingMode.SINGLE_CYCLE, WashingMode.FIXED_COUNT, WashingMode.INFINITE, WashingMode.BATCH]
         mode = modes[mode_index]
         
+        # Batches and pipelined runs use the built-in sequence; other runs use the selected program
+        builtin_sequence = mode == WashingMode.BATCH or self.controller.pipelined
+        program = None if builtin_sequence else self.selected_program
+        if not builtin_sequence:
+            # Check if program is selected
+            if not self.selected_program:
+                QMessageBox.warning(self, "No Program",
+                                  "Please select a washing program first!\n\n"
+                                  "Go to Developer Mode to create a program.")
+                return
+            
+            # Verify program exists
+            if not DataStorage.load_program(self.selected_program):
+                QMessageBox.critical(self, "Error",
+                                   f"Program '{self.selected_program}' not found!\n"
+                                   "Please refresh the program list.")
+                return
+        
         target = self.target_cups_spin.value()
         
         # Confirm
         if mode == WashingMode.INFINITE:
             reply = QMessageBox.question(self, "Confirm",
                                         f"Start infinite washing cycle?\n"
-                                        f"Using program: {self.selected_program}",
+                                        f"Using program: {program or 'built-in sequence (pipelined)'}",
                                         QMessageBox.Yes | QMessageBox.No)
             if reply == QMessageBox.No:
                 return
@@ -665,10 +679,13 @@ class UserInterface(QWidget):
         # Update UI
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
-        self.target_label.setText(str(target) if mode == WashingMode.FIXED_COUNT else "∞")
+        self.target_label.setText(str(target) if mode in (WashingMode.FIXED_COUNT, WashingMode.BATCH) else "∞")
         
-        # Start worker thread with program
-        self.worker = WashingWorkerWithProgram(self.controller, self.selected_program)
+        # Start worker thread - pipelined runs go through the PipelineScheduler
+        if self.controller.pipelined and mode != WashingMode.BATCH:
+            self.worker = WashingWorker(self.controller)
+        else:
+            self.worker = WashingWorkerWithProgram(self.controller, program)
         self.worker.status_updated.connect(self.on_status_update)
         self.worker.cup_washed.connect(self.on_cup_washed)
         self.worker.cycle_complete.connect(self.on_cycle_complete)
@@ -676,10 +693,16 @@ class UserInterface(QWidget):
         self.worker.progress_updated.connect(self.progress_bar.setValue)
         self.worker.start()
         
-        # Start time tracking
+        # Start time tracking - model estimate gives an ETA before the first cup is done
         self.time_tracker.start_cycle()
+        # The built-in sequence has no program - no estimate then
+        estimate = self.controller.estimate_cycle_time(program) if program else None
+        self.time_tracker.set_predicted_cycle_time(estimate["total"] if estimate else None)
         
-        self.add_log(f"✓ Washing started with program: {self.selected_program}")
+        if program:
+            self.add_log(f"✓ Washing started with program: {program}")
+        elif self.controller.pipelined and mode != WashingMode.BATCH:
+            self.add_log("✓ Washing started - pipelined built-in sequence")
     
     def on_stop_washing(self):
         """Stop washing operation"""
@@ -757,7 +780,7 @@ class UserInterface(QWidget):
         # Calculate remaining time
         if status["target_cups"] and status["washed_cups"] < status["target_cups"]:
             remaining_cups = status["target_cups"] - status["washed_cups"]
-            remaining_time = avg_cycle * remaining_cups
+            remaining_time = self.time_tracker.get_estimated_remaining_time(remaining_cups, avg_cycle)
             self.remaining_time_label.setText(f"Remaining: {self.time_tracker.format_time(remaining_time)}")
         else:
             self.remaining_time_label.setText("Remaining: --")
@@ -856,16 +879,24 @@ class WashingWorkerWithProgram(QThread):
         try:
             while self.running and self.controller.is_running:
                 # Check if target reached
-                if (self.controller.washing_mode == WashingMode.FIXED_COUNT and 
+                if (self.controller.target_cups and
                     self.controller.washed_cups >= self.controller.target_cups):
                     break
                 
-                # Execute program
-                success = self.controller.single_cup_cycle_with_program(self.program_name)
+                # Execute program (batches run the built-in slot sequence)
+                if self.controller.washing_mode == WashingMode.BATCH:
+                    success = self.controller.batch_cycle()
+                else:
+                    success = self.controller.single_cup_cycle_with_program(self.program_name)
                 
                 if not success:
                     self.error_occurred.emit("Cup cycle failed!")
-                    break
+                    # Only camera/robot/station/program faults end the run - and any failure left unclassified
+                    last_failure = self.controller.last_failure
+                    if last_failure is None or self.controller.retry_policy.is_fatal(last_failure):
+                        break
+                    time.sleep(0.5)  # back off, then carry on with the next cup
+                    continue
                 
                 # Update status
                 status = self.controller.get_status()
@@ -876,8 +907,6 @@ class WashingWorkerWithProgram(QThread):
                 if self.controller.target_cups:
                     progress = int((self.controller.washed_cups / self.controller.target_cups) * 100)
                     self.progress_updated.emit(progress)
-                
-                time.sleep(0.5)
             
             # Complete
             self.controller.is_running = False
@@ -3,7 +3,7 @@ Time tracking and statistics utilities
 """
 import time
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class TimeTracker:
     """Track cycle times and calculate statistics"""
@@ -12,6 +12,7 @@ class TimeTracker:
         self.cycle_start = None
         self.operation_times = {}
         self.cycle_times = []
+        self.predicted_cycle_time: Optional[float] = None  # model estimate, used until cycles are measured
         
     def start_cycle(self):
         """Start timing a cycle"""
@@ -47,9 +48,17 @@ class TimeTracker:
             return 0.0
         return sum(self.cycle_times) / len(self.cycle_times)
     
-    def get_estimated_remaining_time(self, remaining_cups: int) -> float:
-        """Estimate remaining time based on average"""
-        avg = self.get_average_cycle_time()
+    def set_predicted_cycle_time(self, seconds: Optional[float]):
+        """Model estimate for one cycle (e.g. CupWashingController.estimate_cycle_time)"""
+        self.predicted_cycle_time = seconds
+    
+    def get_estimated_remaining_time(self, remaining_cups: int, average: Optional[float] = None) -> float:
+        """
+        Estimate remaining time from the measured average cycle time
+        (`average` if given), or from the predicted cycle time before
+        any cycle has completed
+        """
+        avg = average or self.get_average_cycle_time() or self.predicted_cycle_time or 0.0
         return avg * remaining_cups
     
     def get_cups_per_hour(self) -> float:
@@ -0,0 +1,74 @@
+"""
+Level-gated trace ring buffer for hot paths
+"""
+import time
+from collections import deque
+from enum import IntEnum
+from typing import List, Tuple
+
+
+class TraceLevel(IntEnum):
+    """Trace verbosity (higher = more detail)"""
+    OFF = 0
+    ERROR = 1
+    INFO = 2
+    DEBUG = 3
+
+
+class TraceBuffer:
+    """
+    Keeps the last `capacity` diagnostic records in memory.
+    
+    Records below the current level cost one integer compare. Messages
+    are stored as (format, args) and only formatted when dumped, so
+    tracing never touches stdout on the hot path.
+    """
+    
+    def __init__(self, level: TraceLevel = TraceLevel.ERROR, capacity: int = 1000):
+        self.level = TraceLevel(level)
+        self.records = deque(maxlen=capacity)
+    
+    def set_level(self, level):
+        """Set level from a TraceLevel, int or name ("debug", "info", ...)"""
+        if isinstance(level, str):
+            level = TraceLevel[level.upper()]
+        self.level = TraceLevel(level)
+    
+    def enabled(self, level: TraceLevel) -> bool:
+        """Check if a level is currently recorded"""
+        return self.level >= level
+    
+    def error(self, fmt: str, *args):
+        """Record error"""
+        if self.level >= TraceLevel.ERROR:
+            self.records.append((time.monotonic(), TraceLevel.ERROR, fmt, args))
+    
+    def info(self, fmt: str, *args):
+        """Record info"""
+        if self.level >= TraceLevel.INFO:
+            self.records.append((time.monotonic(), TraceLevel.INFO, fmt, args))
+    
+    def debug(self, fmt: str, *args):
+        """Record debug detail"""
+        if self.level >= TraceLevel.DEBUG:
+            self.records.append((time.monotonic(), TraceLevel.DEBUG, fmt, args))
+    
+    def clear(self):
+        """Drop all records"""
+        self.records.clear()
+    
+    def formatted(self) -> List[Tuple[float, str, str]]:
+        """Records as (monotonic_time, level_name, message)"""
+        result = []
+        for timestamp, level, fmt, args in list(self.records):
+            try:
+                message = fmt % args if args else fmt
+            except (TypeError, ValueError):
+                message = f"{fmt} {args}"
+            result.append((timestamp, level.name, message))
+        return result
+    
+    def dump(self, last: int = 50):
+        """Print the most recent records"""
+        for timestamp, level, message in self.formatted()[-last:]:
+            print(f"[{timestamp:12.4f}] {level:5s} {message}")
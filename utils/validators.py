@@ -2,7 +2,10 @@
 Input validation utilities
 """
 import re
-from typing import Optional
+from typing import Dict, List, Optional
+import numpy as np
+
+PROGRAM_COMMANDS = ("G00", "G01", "GRIPPER", "PUMP_ON", "PUMP_OFF", "WAIT")
 
 class Validators:
     """Input validation methods"""
@@ -73,3 +76,83 @@ class Validators:
             return False, "Program name contains invalid characters"
         
         return True, "Valid"
+    
+    @staticmethod
+    def validate_program(steps: List[Dict], positions: Optional[Dict[str, Dict]] = None
+                         ) -> tuple[bool, List[str], List[str]]:
+        """
+        Check a whole program in one pass before the arm moves.
+        
+        Errors (program must not run): unknown commands, non-numeric or
+        out-of-workspace targets, gripper angles outside 0-180, negative
+        pauses. Warnings: feedrates the firmware will clamp to 1-500, and
+        targets more than CALIBRATED_REACH_MARGIN outside the box spanned
+        by the calibrated positions (never taught, maybe unreachable).
+        
+        Returns:
+            (valid, errors, warnings)
+        """
+        from config.constants import (WORKSPACE_LIMITS, MIN_ARM_SPEED, MAX_ARM_SPEED,
+                                      CALIBRATED_REACH_MARGIN, HOME_POSITION)
+        errors, warnings = [], []
+        if not steps:
+            return False, ["Program has no steps"], warnings
+        
+        def number(value) -> float:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return np.nan
+        
+        cmds = np.array([str(step.get("cmd", "G01")) for step in steps])
+        for i in np.flatnonzero(~np.isin(cmds, PROGRAM_COMMANDS)):
+            errors.append(f"Step {i+1}: unknown command '{cmds[i]}'")
+        
+        pauses = np.array([number(step.get("pause", 0.0)) for step in steps])
+        for i in np.flatnonzero(~(pauses >= 0)):
+            errors.append(f"Step {i+1}: invalid pause {steps[i].get('pause')!r}")
+        
+        grip = np.flatnonzero(cmds == "GRIPPER")
+        angles = np.array([number(steps[i].get("angle", 90)) for i in grip])
+        for i in grip[~((angles >= 0) & (angles <= 180))]:
+            errors.append(f"Step {i+1}: gripper angle {steps[i].get('angle')!r} outside 0-180")
+        
+        moves = np.flatnonzero(np.isin(cmds, ("G00", "G01")))
+        if len(moves):
+            axes = ("x", "y", "z")
+            targets = np.array([[number(steps[i].get(a, 0.0)) for a in axes] for i in moves])
+            lower = np.array([WORKSPACE_LIMITS[a.upper()]["min"] for a in axes])
+            upper = np.array([WORKSPACE_LIMITS[a.upper()]["max"] for a in axes])
+            
+            bad = np.isnan(targets)
+            for row, col in zip(*np.nonzero(bad)):
+                errors.append(f"Step {moves[row]+1}: {axes[col].upper()} is not a number")
+            
+            outside = ~bad & ((targets < lower) | (targets > upper))
+            for row, col in zip(*np.nonzero(outside)):
+                errors.append(f"Step {moves[row]+1}: {axes[col].upper()}={targets[row, col]:g} "
+                              f"outside workspace [{lower[col]:g}, {upper[col]:g}]")
+            
+            feeds = np.array([number(steps[i].get("feedrate", 100)) for i in moves])
+            for row in np.flatnonzero(~((feeds >= MIN_ARM_SPEED) & (feeds <= MAX_ARM_SPEED))):
+                warnings.append(f"Step {moves[row]+1}: feedrate {steps[moves[row]].get('feedrate')!r} "
+                                f"will be clamped to {MIN_ARM_SPEED}-{MAX_ARM_SPEED}")
+            
+            if positions:
+                taught = np.array([[p[a] for a in axes] for p in positions.values()] +
+                                  [[HOME_POSITION[a] for a in axes]], dtype=float)
+                low = taught.min(axis=0) - CALIBRATED_REACH_MARGIN
+                high = taught.max(axis=0) + CALIBRATED_REACH_MARGIN
+                untaught = ~bad.any(axis=1) & ((targets < low) | (targets > high)).any(axis=1)
+                for row in np.flatnonzero(untaught):
+                    x, y, z = targets[row]
+                    warnings.append(f"Step {moves[row]+1}: X={x:g} Y={y:g} Z={z:g} is far from "
+                                    f"every calibrated position - check reachability")
+        
+        # Report in step order
+        def step_number(message: str) -> int:
+            return int(re.match(r"Step (\d+)", message).group(1))
+        
+        errors.sort(key=step_number)
+        warnings.sort(key=step_number)
+        return not errors, errors, warnings
@@ -6,7 +6,11 @@ import time
 from config.constants import WashingMode
 
 class WashingWorker(QThread):
-    """Background thread for washing cycles"""
+    """
+    Background thread for washing cycles with the built-in sequence.
+    With "pipelined" on (GUI checkbox or setting), cups go through the
+    PipelineScheduler; program runs use WashingWorkerWithProgram.
+    """
     
     # Signals
     status_updated = pyqtSignal(dict)
@@ -24,10 +28,14 @@ class WashingWorker(QThread):
         """Main washing loop"""
         self.is_running = True
         
+        if self.controller.pipelined and self.controller.washing_mode != WashingMode.BATCH:
+            self.run_pipelined()
+            return
+        
         while self.is_running and self.controller.is_running:
             try:
-                # Execute single cup cycle
-                success = self.controller.single_cup_cycle()
+                # Execute one cycle (a single cup, or a batch)
+                success = self.controller.run_next_cycle()
                 
                 if success:
                     # Emit signals
@@ -40,7 +48,7 @@ class WashingWorker(QThread):
                         self.progress_updated.emit(progress)
                     
                     # Check if target reached
-                    if self.controller.washing_mode == WashingMode.FIXED_COUNT:
+                    if self.controller.washing_mode in (WashingMode.FIXED_COUNT, WashingMode.BATCH):
                         if self.controller.washed_cups >= self.controller.target_cups:
                             self.controller.is_running = False
                             self.cycle_complete.emit()
@@ -56,9 +64,16 @@ class WashingWorker(QThread):
                     error_msg = f"Cup {self.controller.washed_cups + self.controller.failed_cups} failed"
                     self.error_occurred.emit(error_msg)
                     self.status_updated.emit(self.controller.get_status())
-                
-                # Small delay between cycles
-                time.sleep(0.5)
+                    
+                    # Camera/robot/station faults stop the run; anything else
+                    # (a fumbled cup) is skipped
+                    if self.controller.retry_policy.is_fatal(self.controller.last_failure):
+                        self.controller.is_running = False
+                        break
+                    
+                    # Back off after a failure; successful cycles go straight
+                    # on - the next cup is already being detected
+                    time.sleep(0.5)
                 
             except Exception as e:
                 self.error_occurred.emit(str(e))
@@ -68,6 +83,34 @@ class WashingWorker(QThread):
         # Final status update
         self.status_updated.emit(self.controller.get_status())
     
+    def run_pipelined(self):
+        """Washing loop with wash, rinse and arm moves overlapped"""
+        mode = self.controller.washing_mode
+        max_cups = {WashingMode.SINGLE_CYCLE: 1,
+                    WashingMode.FIXED_COUNT: self.controller.target_cups}.get(mode)
+        
+        def on_cup_done(washed_cups: int):
+            self.cup_washed.emit(washed_cups)
+            self.status_updated.emit(self.controller.get_status())
+            if self.controller.target_cups:
+                self.progress_updated.emit(int((washed_cups / self.controller.target_cups) * 100))
+        
+        try:
+            if self.controller.run_pipelined(max_cups, on_cup_done):
+                if self.controller.is_running:
+                    self.controller.is_running = False
+                    self.cycle_complete.emit()
+            else:
+                self.error_occurred.emit(self.controller.error_log[-1] if self.controller.error_log
+                                         else "Pipelined run failed")
+                self.controller.is_running = False
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+            self.controller.is_running = False
+        
+        # Final status update
+        self.status_updated.emit(self.controller.get_status())
+    
     def stop(self):
         """Stop washing thread"""
         self.is_running = False